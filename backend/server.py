@@ -1,36 +1,202 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, status
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, String, DateTime, Boolean, Text, Integer, Float, ForeignKey
+from sqlalchemy import create_engine, Column, String, Date, DateTime, Boolean, Text, Integer, Float, ForeignKey, Index, UniqueConstraint, DDL, event, func, or_, and_, case, literal, null, select, text, union_all, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import UUID, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from dotenv import load_dotenv
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional
-from datetime import datetime, timedelta
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+from cryptography.fernet import Fernet, MultiFernet
+from typing import Callable, Dict, List, NamedTuple, Optional
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from datetime import date, datetime, timedelta, timezone
+from difflib import SequenceMatcher
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import hmac
+import ipaddress
 import os
+import queue
+import random
+import sys
+import traceback
+import re
+import json
+import itertools
+import math
+import threading
+import time
 import logging
+import logging.handlers
 import uuid
 import jwt
 import bcrypt
+import numpy as np
+
+# Optional binary encodings for sync and list payloads
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Optional Parquet support for cold-storage archival
+try:
+    import pyarrow
+    import pyarrow.fs
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Database setup
+# Worker data is sharded by User.place (district or PHC). DATABASE_URL is
+# the "default" shard; SHARD_DATABASE_URLS adds named shards as a JSON
+# object of name -> URL, and SHARD_PLACES maps places to shard names, e.g.
+# SHARD_PLACES='{"Mysuru": "south", "Belagavi": "north"}'. Unlisted places
+# stay on the default shard. Users live on their place's shard, so every
+# per-worker query touches exactly one database.
 DATABASE_URL = os.environ.get('DATABASE_URL')
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+DEFAULT_SHARD = "default"
+
+def normalize_place(place: Optional[str]) -> str:
+    return " ".join((place or "").lower().split())
+
+class ShardRouter:
+    """Engines and session factories per shard, and the place -> shard map."""
+
+    def __init__(self, urls: Dict[str, str], places: Dict[str, str]):
+        self.engines = {name: create_engine(url) for name, url in urls.items()}
+        self.sessions = {
+            name: sessionmaker(autocommit=False, autoflush=False, bind=bound_engine, info={"shard": name})
+            for name, bound_engine in self.engines.items()
+        }
+        self.names = sorted(self.engines)
+        self.places = {normalize_place(place): shard for place, shard in places.items()}
+        unknown = set(self.places.values()) - set(self.engines)
+        if unknown:
+            raise ValueError(f"SHARD_PLACES refers to unknown shards: {sorted(unknown)}")
+        # username -> shard, for tokens issued without a place claim
+        self._user_shards: Dict[str, str] = {}
+
+    def shard_for_place(self, place: Optional[str]) -> str:
+        return self.places.get(normalize_place(place), DEFAULT_SHARD)
+
+    def session(self, shard: str) -> Session:
+        return self.sessions[shard]()
+
+    def scatter(self, func, shards: Optional[List[str]] = None) -> Dict[str, object]:
+        """Run `func(db)` on each shard concurrently; results keyed by shard name."""
+        shards = shards or self.names
+
+        def run(name):
+            with self.session(name) as db:
+                return func(db)
+
+        if len(shards) == 1:
+            return {shards[0]: run(shards[0])}
+        # Each task runs in a copy of the caller's context, so the queries are
+        # still attributed to the request that fanned out
+        with ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="scatter") as pool:
+            return dict(zip(shards, pool.map(lambda name: copy_context().run(run, name), shards)))
+
+    def locate_user(self, username: str) -> Optional[str]:
+        """Shard holding `username`, found by asking every shard once."""
+        if len(self.names) == 1:
+            return DEFAULT_SHARD
+        shard = self._user_shards.get(username)
+        if shard is None:
+            found = self.scatter(lambda db: db.query(User.id).filter(User.username == username).first() is not None)
+            shard = next((name for name, present in found.items() if present), None)
+            if shard is not None:
+                self._user_shards[username] = shard
+        return shard
+
+shard_router = ShardRouter(
+    {**json.loads(os.environ.get('SHARD_DATABASE_URLS') or '{}'), DEFAULT_SHARD: DATABASE_URL},
+    json.loads(os.environ.get('SHARD_PLACES') or '{}'),
+)
+engine = shard_router.engines[DEFAULT_SHARD]
+SessionLocal = shard_router.sessions[DEFAULT_SHARD]
+
+# Optional read replica of the default shard; without one, reads go to the primary
+READ_DATABASE_URL = os.environ.get('READ_DATABASE_URL')
+read_engine = create_engine(READ_DATABASE_URL) if READ_DATABASE_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+# Seconds a user's reads stay on the primary after they write
+READ_AFTER_WRITE_WINDOW = float(os.environ.get('READ_AFTER_WRITE_WINDOW', 10))
 Base = declarative_base()
 
+# Trigram indexes back fuzzy patient search on Postgres (pg_trgm); other
+# dialects get a plain b-tree index on the same column.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+def trigram_index(name: str, column: str) -> Index:
+    return Index(
+        name,
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+# High-volume record tables are range-partitioned by month on Postgres, so
+# created_at joins id in their primary key. The ORM still identifies rows by
+# id alone (see __mapper_args__).
+MONTHLY_PARTITIONING = {"postgresql_partition_by": "RANGE (created_at)"}
+
 # JWT Configuration
 JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
 JWT_ALGORITHM = "HS256"
 security = HTTPBearer()
 
+# Aadhaar protection
+# Aadhaar numbers are never stored in plain text. users.aadhaar_index holds a
+# keyed HMAC-SHA256 of the number (a blind index) that backs the unique
+# constraint and equality lookups; users.aadhaar_encrypted holds the number
+# itself under Fernet. AADHAAR_ENCRYPTION_KEYS is a comma-separated list of
+# Fernet keys, newest first, so old keys can be kept for decryption during a
+# rotation. Without dedicated keys both are derived from JWT_SECRET_KEY, which
+# then must never be rotated; set them explicitly in production.
+def _derived_key(label: str) -> bytes:
+    return hmac.new((JWT_SECRET_KEY or "").encode(), label.encode(), hashlib.sha256).digest()
+
+AADHAAR_INDEX_KEY = os.environ.get('AADHAAR_INDEX_KEY', '').encode() or _derived_key("aadhaar-index")
+aadhaar_cipher = MultiFernet([
+    Fernet(key.strip()) for key in os.environ.get('AADHAAR_ENCRYPTION_KEYS', '').split(',') if key.strip()
+] or [Fernet(base64.urlsafe_b64encode(_derived_key("aadhaar-encryption")))])
+
+def normalize_aadhaar(aadhaar_number: str) -> str:
+    return re.sub(r"[\s-]", "", aadhaar_number or "")
+
+def aadhaar_blind_index(aadhaar_number: str) -> str:
+    return hmac.new(AADHAAR_INDEX_KEY, normalize_aadhaar(aadhaar_number).encode(), hashlib.sha256).hexdigest()
+
 # Database Models
 class User(Base):
     __tablename__ = "users"
@@ -40,7 +206,8 @@ class User(Base):
     name = Column(String)
     phone_number = Column(String, unique=True)
     place = Column(String)
-    aadhaar_number = Column(String, unique=True)
+    aadhaar_index = Column(String(64), unique=True)
+    aadhaar_encrypted = Column(Text)
     hashed_password = Column(String)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -48,7 +215,50 @@ class User(Base):
     family_surveys = relationship("FamilySurvey", back_populates="asha_worker")
     pregnancy_reports = relationship("PregnancyReport", back_populates="asha_worker")
 
+    __table_args__ = (
+        # Prefix matches (LIKE 'base%') at registration; the default btree
+        # can't serve them under a non-C collation
+        Index(
+            "ix_users_username_pattern", "username",
+            postgresql_ops={"username": "text_pattern_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
+
+    @property
+    def aadhaar_number(self) -> Optional[str]:
+        if self.aadhaar_encrypted is None:
+            return None
+        return aadhaar_cipher.decrypt(self.aadhaar_encrypted.encode()).decode()
+
+    @aadhaar_number.setter
+    def aadhaar_number(self, value: str):
+        value = normalize_aadhaar(value)
+        self.aadhaar_index = aadhaar_blind_index(value)
+        self.aadhaar_encrypted = aadhaar_cipher.encrypt(value.encode()).decode()
+
+class Beneficiary(Base):
+    __tablename__ = "beneficiaries"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    name = Column(String)
+    normalized_name = Column(String)
+    phone = Column(String)  # last 10 digits only
+    asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_beneficiaries_worker_phone", "asha_worker_id", "phone"),
+        # text_pattern_ops lets Postgres serve link_beneficiaries' prefix LIKEs from the index
+        Index("ix_beneficiaries_worker_name", "asha_worker_id", "normalized_name",
+              postgresql_ops={"normalized_name": "text_pattern_ops"}),
+    )
+
 class FamilySurvey(Base):
+    """Current state of a household, one row per (worker, household).
+
+    Resurveys update the row in place and bump `version`; what changed is
+    kept in family_survey_versions.
+    """
     __tablename__ = "family_surveys"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -57,11 +267,34 @@ class FamilySurvey(Base):
     sanitation = Column(String)
     chronic_illnesses = Column(Text)
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
     synced = Column(Boolean, default=False)
     
     asha_worker = relationship("User", back_populates="family_surveys")
 
+    __table_args__ = (
+        UniqueConstraint("asha_worker_id", "household_id", name="uq_family_surveys_worker_household"),
+        Index("ix_family_surveys_worker_updated", "asha_worker_id", "updated_at"),
+    )
+
+class FamilySurveyVersion(Base):
+    """Append-only survey history: the fields each version changed."""
+    __tablename__ = "family_survey_versions"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    survey_id = Column(UUID(as_uuid=True), ForeignKey("family_surveys.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    changes = Column(Text)  # JSON {field: [old, new]}
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        Index("ix_family_survey_versions_survey", "survey_id", "version"),
+        MONTHLY_PARTITIONING,
+    )
+
 class PregnancyReport(Base):
     __tablename__ = "pregnancy_reports"
     
@@ -74,12 +307,27 @@ class PregnancyReport(Base):
     risk_factors = Column(Text)
     patient_name = Column(String)
     patient_phone = Column(String)
+    beneficiary_id = Column(UUID(as_uuid=True), ForeignKey("beneficiaries.id"), index=True)
+    # Derived by the risk scoring stage
+    gestational_age_weeks = Column(Integer)
+    missed_anc_visits = Column(Integer)
+    risk_score = Column(Integer)
+    risk_scored_at = Column(DateTime)
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     synced = Column(Boolean, default=False)
     
     asha_worker = relationship("User", back_populates="pregnancy_reports")
 
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        trigram_index("ix_pregnancy_reports_patient_name_trgm", "patient_name"),
+        trigram_index("ix_pregnancy_reports_patient_phone_trgm", "patient_phone"),
+        Index("ix_pregnancy_reports_worker_risk", "asha_worker_id", "risk_score"),
+        Index("ix_pregnancy_reports_worker_created", "asha_worker_id", "created_at"),
+        MONTHLY_PARTITIONING,
+    )
+
 class ChildVaccination(Base):
     __tablename__ = "child_vaccinations"
     
@@ -87,14 +335,25 @@ class ChildVaccination(Base):
     child_name = Column(String)
     child_dob = Column(DateTime)
     vaccine_schedule = Column(Text)  # JSON string
-    missed_doses = Column(Text)
-    next_due = Column(DateTime)
+    missed_doses = Column(Text)  # JSON list of overdue dose codes, derived server-side when the schedule is recognised
+    next_due = Column(DateTime)  # derived server-side from child_dob and vaccine_schedule, else as entered
     parent_name = Column(String)
     parent_phone = Column(String)
+    beneficiary_id = Column(UUID(as_uuid=True), ForeignKey("beneficiaries.id"), index=True)  # the mother
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     synced = Column(Boolean, default=False)
 
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        trigram_index("ix_child_vaccinations_child_name_trgm", "child_name"),
+        trigram_index("ix_child_vaccinations_parent_name_trgm", "parent_name"),
+        trigram_index("ix_child_vaccinations_parent_phone_trgm", "parent_phone"),
+        Index("ix_child_vaccinations_worker_next_due", "asha_worker_id", "next_due"),
+        Index("ix_child_vaccinations_worker_created", "asha_worker_id", "created_at"),
+        MONTHLY_PARTITIONING,
+    )
+
 class PostnatalCare(Base):
     __tablename__ = "postnatal_care"
     
@@ -105,10 +364,18 @@ class PostnatalCare(Base):
     counselling = Column(Text)
     mother_name = Column(String)
     delivery_date = Column(DateTime)
+    beneficiary_id = Column(UUID(as_uuid=True), ForeignKey("beneficiaries.id"), index=True)
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     synced = Column(Boolean, default=False)
 
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        trigram_index("ix_postnatal_care_mother_name_trgm", "mother_name"),
+        Index("ix_postnatal_care_worker_created", "asha_worker_id", "created_at"),
+        MONTHLY_PARTITIONING,
+    )
+
 class LeprosyReport(Base):
     __tablename__ = "leprosy_reports"
     
@@ -119,9 +386,16 @@ class LeprosyReport(Base):
     follow_ups = Column(Text)  # JSON string
     household_contacts = Column(Text)
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
     synced = Column(Boolean, default=False)
 
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        trigram_index("ix_leprosy_reports_patient_name_trgm", "patient_name"),
+        Index("ix_leprosy_reports_worker_created", "asha_worker_id", "created_at"),
+        MONTHLY_PARTITIONING,
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
     
@@ -134,10 +408,201 @@ class Alert(Base):
     due_date = Column(DateTime)
     asha_worker_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     is_read = Column(Boolean, default=False)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        Index("ix_alerts_worker_created", "asha_worker_id", "created_at"),
+        MONTHLY_PARTITIONING,
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String)
+    payload = Column(Text)  # JSON string
+    priority = Column(Integer, default=0)  # higher runs first
+    status = Column(String, default="queued")  # 'queued', 'running', 'done', 'failed'
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=5)
+    run_at = Column(DateTime, default=datetime.utcnow)
+    locked_at = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_jobs_claim", "status", "priority", "run_at"),
+        Index("ix_jobs_status_finished", "status", "finished_at"),
+    )
+
+class AuditLog(Base):
+    """Append-only log of inserts and updates on the record tables."""
+    __tablename__ = "audit_log"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    table_name = Column(String, nullable=False)
+    record_id = Column(String, nullable=False)
+    action = Column(String, nullable=False)  # 'insert', 'update'
+    changes = Column(Text)  # JSON: column values on insert, {column: [old, new]} on update
+    asha_worker_id = Column(UUID(as_uuid=True))
+    beneficiary_id = Column(UUID(as_uuid=True))
+    actor = Column(String)  # username; NULL for background jobs
+    request_id = Column(String)
+    merged_count = Column(Integer, default=1)  # updates folded into this row by compaction
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+    __mapper_args__ = {"primary_key": [id]}
+    __table_args__ = (
+        Index("ix_audit_log_worker_created", "asha_worker_id", "created_at"),
+        Index("ix_audit_log_beneficiary_created", "beneficiary_id", "created_at"),
+        Index("ix_audit_log_record", "table_name", "record_id"),
+        MONTHLY_PARTITIONING,
+    )
+
+class DailyRollup(Base):
+    """Per-place daily counts, maintained incrementally on commit."""
+    __tablename__ = "daily_rollups"
+    
+    place = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    metric = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_rollups_metric_day", "metric", "day"),
+    )
+
+class ArchiveSegment(Base):
+    """One Parquet file of archived rows from a (table, month, place) partition."""
+    __tablename__ = "archive_segments"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    table_name = Column(String, nullable=False)
+    month = Column(Date, nullable=False)
+    place = Column(String, nullable=False)
+    path = Column(String, nullable=False)  # relative to ARCHIVE_STORAGE_URI
+    row_count = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        Index("ix_archive_segments_table_month", "table_name", "month", "place"),
+    )
+
+class ArchivedRecord(Base):
+    """Stub left behind for an archived row: enough to find it in its segment."""
+    __tablename__ = "archived_records"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True)  # the archived row's id
+    table_name = Column(String, nullable=False)
+    segment_id = Column(UUID(as_uuid=True), ForeignKey("archive_segments.id"), nullable=False)
+    asha_worker_id = Column(UUID(as_uuid=True))
+    beneficiary_id = Column(UUID(as_uuid=True))
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("ix_archived_records_worker_table", "asha_worker_id", "table_name", "created_at"),
+        Index("ix_archived_records_table_created", "table_name", "created_at"),
+        Index("ix_archived_records_beneficiary", "beneficiary_id"),
+    )
+
+# Monthly partition management (Postgres only)
+PARTITIONED_TABLES = [
+    "family_survey_versions", "pregnancy_reports", "child_vaccinations",
+    "postnatal_care", "leprosy_reports", "alerts", "audit_log",
+]
+PARTITION_MONTHS_AHEAD = int(os.environ.get('PARTITION_MONTHS_AHEAD', 3))
+PARTITION_RETENTION_MONTHS = int(os.environ.get('PARTITION_RETENTION_MONTHS', 24))
+ARCHIVE_SCHEMA = os.environ.get('PARTITION_ARCHIVE_SCHEMA', 'archive')
+
+def month_start(value: datetime, offset: int = 0) -> datetime:
+    months = value.year * 12 + value.month - 1 + offset
+    return datetime(months // 12, months % 12 + 1, 1)
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start:%Y%m}"
+
+PARTITION_CHECK_SECONDS = float(os.environ.get('PARTITION_CHECK_HOURS', 6)) * 3600
+
+def ensure_partitions(bind, months_ahead: int = PARTITION_MONTHS_AHEAD, now: Optional[datetime] = None) -> int:
+    """Create this month's and the next `months_ahead` monthly partitions.
+
+    Each table also gets a DEFAULT partition for rows dated before the first
+    monthly partition (e.g. back-dated offline records). If a month was
+    missed, its rows sit in DEFAULT, which would make CREATE ... PARTITION OF
+    fail. So new partitions are built standalone, filled with that month's
+    rows moved out of DEFAULT, then attached. Each table is its own
+    transaction; a failure is logged and the remaining tables still run.
+    """
+    if bind.dialect.name != "postgresql":
+        return 0
+    now = now or datetime.utcnow()
+    created = 0
+    for table in PARTITIONED_TABLES:
+        try:
+            with bind.begin() as conn:
+                # Serialise with other processes running the same check
+                conn.exec_driver_sql("SELECT pg_advisory_xact_lock(hashtext(%(table)s))", {"table": f"partitions:{table}"})
+                conn.exec_driver_sql(
+                    f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+                )
+                for offset in range(months_ahead + 1):
+                    start, end = month_start(now, offset), month_start(now, offset + 1)
+                    name = partition_name(table, start)
+                    exists = conn.exec_driver_sql("SELECT to_regclass(%(name)s)", {"name": name}).scalar()
+                    if exists is not None:
+                        continue
+                    bounds = {"start": start, "end": end}
+                    conn.exec_driver_sql(f"CREATE TABLE {name} (LIKE {table} INCLUDING ALL)")
+                    conn.exec_driver_sql(
+                        f"WITH moved AS (DELETE FROM {table}_default "
+                        f"WHERE created_at >= %(start)s AND created_at < %(end)s RETURNING *) "
+                        f"INSERT INTO {name} SELECT * FROM moved", bounds
+                    )
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                    )
+                    created += 1
+        except Exception:
+            logging.getLogger(__name__).exception("Could not create partitions for %s", table)
+    return created
+
+def archive_partitions(bind, retention_months: int = PARTITION_RETENTION_MONTHS, now: Optional[datetime] = None) -> List[str]:
+    """Detach monthly partitions older than the retention window.
+
+    Detached partitions are moved to ARCHIVE_SCHEMA as ordinary tables, where
+    they can be dumped and dropped, or re-attached for a one-off report.
+    """
+    if bind.dialect.name != "postgresql":
+        return []
+    cutoff = month_start(now or datetime.utcnow(), -retention_months)
+    archived = []
+    with bind.begin() as conn:
+        conn.exec_driver_sql(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        for table in PARTITIONED_TABLES:
+            partitions = conn.exec_driver_sql(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = %(table)s",
+                {"table": table},
+            ).scalars().all()
+            for name in sorted(partitions):
+                match = re.fullmatch(rf"{table}_p(\d{{4}})(\d{{2}})", name)
+                if match is None or datetime(int(match.group(1)), int(match.group(2)), 1) >= cutoff:
+                    continue
+                conn.exec_driver_sql(f"ALTER TABLE {table} DETACH PARTITION {name}")
+                conn.exec_driver_sql(f"ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}")
+                archived.append(name)
+    return archived
+
+# Create tables. Partitions are also kept ahead by the job runners, so a
+# failure here is logged rather than stopping the app from starting.
+for shard_engine in shard_router.engines.values():
+    Base.metadata.create_all(bind=shard_engine)
+    ensure_partitions(shard_engine)
 
 # Pydantic Models
 class UserCreate(BaseModel):
@@ -174,12 +639,19 @@ class FamilySurveyResponse(BaseModel):
     members_list: str
     sanitation: str
     chronic_illnesses: str
+    version: int = 1
     created_at: datetime
+    updated_at: Optional[datetime] = None
     synced: bool
 
     class Config:
         from_attributes = True
 
+class FamilySurveyVersionResponse(BaseModel):
+    version: int
+    changes: Dict[str, List[Optional[str]]]
+    created_at: datetime
+
 class PregnancyReportCreate(BaseModel):
     lmp: datetime
     edd: datetime
@@ -200,6 +672,9 @@ class PregnancyReportResponse(BaseModel):
     risk_factors: str
     patient_name: str
     patient_phone: str
+    gestational_age_weeks: Optional[int] = None
+    missed_anc_visits: Optional[int] = None
+    risk_score: Optional[int] = None
     created_at: datetime
     synced: bool
 
@@ -210,10 +685,29 @@ class ChildVaccinationCreate(BaseModel):
     child_name: str
     child_dob: datetime
     vaccine_schedule: str
-    missed_doses: str
-    next_due: datetime
+    # Only kept when vaccine_schedule names no recognised dose; otherwise derived
+    missed_doses: Optional[str] = None
+    next_due: Optional[datetime] = None
+    parent_name: str
+    parent_phone: str
+
+    @model_validator(mode="after")
+    def check_next_due(self):
+        if self.next_due is not None and self.next_due.date() < self.child_dob.date():
+            raise ValueError("next_due is before child_dob")
+        return self
+
+class ChildVaccinationResponse(BaseModel):
+    id: str
+    child_name: str
+    child_dob: datetime
+    vaccine_schedule: str
+    missed_doses: Optional[str] = None
+    next_due: Optional[datetime] = None
     parent_name: str
     parent_phone: str
+    created_at: datetime
+    synced: bool
 
 class PostnatalCareCreate(BaseModel):
     pnc_visits: str
@@ -223,6 +717,17 @@ class PostnatalCareCreate(BaseModel):
     mother_name: str
     delivery_date: datetime
 
+class PostnatalCareResponse(BaseModel):
+    id: str
+    pnc_visits: str
+    mother_health: str
+    baby_health: str
+    counselling: str
+    mother_name: str
+    delivery_date: datetime
+    created_at: datetime
+    synced: bool
+
 class LeprosyReportCreate(BaseModel):
     patient_name: str
     leprosy_type: str
@@ -230,6 +735,94 @@ class LeprosyReportCreate(BaseModel):
     follow_ups: str
     household_contacts: str
 
+class LeprosyReportResponse(BaseModel):
+    id: str
+    patient_name: str
+    leprosy_type: str
+    treatment: str
+    follow_ups: str
+    household_contacts: str
+    created_at: datetime
+    synced: bool
+
+class MarkAlertsRead(BaseModel):
+    alert_ids: List[str] = []
+    all: bool = False
+
+class SearchResult(BaseModel):
+    record_type: str
+    record_id: str
+    name: Optional[str] = None
+    secondary_name: Optional[str] = None
+    phone: Optional[str] = None
+    score: float
+    created_at: datetime
+
+class BeneficiaryLinkResult(BaseModel):
+    linked: int
+    created: int
+
+class TimelineEvent(BaseModel):
+    record_type: str
+    record_id: str
+    event_date: Optional[datetime] = None
+    summary: str
+
+class BeneficiaryTimeline(BaseModel):
+    id: str
+    name: str
+    phone: Optional[str] = None
+    events: List[TimelineEvent]
+
+class DueVaccinationResponse(BaseModel):
+    id: str
+    child_name: str
+    child_dob: datetime
+    parent_name: str
+    parent_phone: str
+    next_due: datetime
+    missed_doses: List[str]
+
+class ScheduleRefreshResult(BaseModel):
+    updated: int
+
+class ScoringResult(BaseModel):
+    scored: int
+
+class JobStats(BaseModel):
+    queue_depth: Dict[str, int]
+    oldest_queued_seconds: Optional[float] = None
+    avg_latency_seconds: Optional[float] = None
+    failed_last_hour: int
+
+class AuditEntry(BaseModel):
+    id: str
+    table_name: str
+    record_id: str
+    action: str
+    changes: dict
+    asha_worker_id: Optional[str] = None
+    beneficiary_id: Optional[str] = None
+    actor: Optional[str] = None
+    request_id: Optional[str] = None
+    merged_count: int = 1
+    created_at: datetime
+
+class TrendPoint(BaseModel):
+    place: str
+    day: date
+    metric: str
+    count: int
+
+class PlaceSummary(BaseModel):
+    place: str
+    shard: str
+    workers: int
+    family_surveys: int
+    pregnancy_reports: int
+    high_risk_pregnancies: int
+    child_vaccinations: int
+
 class AlertResponse(BaseModel):
     id: str
     title: str
@@ -243,14 +836,80 @@ class AlertResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class BootstrapSnapshot(BaseModel):
+    watermark: datetime  # pass as `since` to the list endpoints for later deltas
+    generated_at: datetime
+    family_surveys: List[FamilySurveyResponse]
+    pregnancy_reports: List[PregnancyReportResponse]
+    child_vaccinations: List[ChildVaccinationResponse]
+    postnatal_care: List[PostnatalCareResponse]
+    leprosy_reports: List[LeprosyReportResponse]
+    alerts: List[AlertResponse]
+
 # Dependency to get DB session
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    """Session on the shard of the authenticated user (default shard if anonymous)."""
+    db = shard_router.session(request_shard(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+# username -> monotonic time of their last write, for read-your-writes routing,
+# oldest first. This is per process: with several workers, a read that lands
+# on another process than the write can still see the replica's lag, so
+# deployments with a replica should keep users on one worker (sticky
+# sessions) or accept READ_AFTER_WRITE_WINDOW-sized staleness there.
+last_write_at: Dict[str, float] = OrderedDict()
+
+def note_write(username: str):
+    now = time.monotonic()
+    last_write_at[username] = now
+    last_write_at.move_to_end(username)
+    # Entries past the window no longer route anything; drop them from the front
+    while last_write_at:
+        oldest = next(iter(last_write_at))
+        if now - last_write_at[oldest] < READ_AFTER_WRITE_WINDOW:
+            break
+        del last_write_at[oldest]
+
+def reads_from_primary(request: Request, shard: str) -> bool:
+    if read_engine is engine or shard != DEFAULT_SHARD:
+        return True
+    username = token_subject(request)
+    written = last_write_at.get(username) if username else None
+    return written is not None and time.monotonic() - written < READ_AFTER_WRITE_WINDOW
+
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    """Session for read-only endpoints.
+
+    Uses the replica, except for users who wrote within the last
+    READ_AFTER_WRITE_WINDOW seconds, who stay on the primary so they see
+    their own writes despite replication lag. Primary reads reuse the
+    request's get_db session rather than checking out a second connection.
+    """
+    if reads_from_primary(request, primary.info.get("shard")):
+        yield primary
+        return
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+def read_session_factory(request: Request) -> Callable[[], Session]:
+    """Opens sessions on the database get_read_db would read from.
+
+    For work that can outlive the request, such as a RequestCoalescer
+    computation shared with other requests, so it never uses a session the
+    request's dependency teardown closes. Callers close the request's own
+    session before waiting, so a request never holds two pooled connections.
+    """
+    shard = request_shard(request)
+    if reads_from_primary(request, shard):
+        return lambda: shard_router.session(shard)
+    return ReadSessionLocal
+
 # Auth utilities
 def hash_password(password: str) -> str:
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -280,69 +939,811 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
-# Generate username from name
-def generate_username(name: str, db: Session) -> str:
-    base_username = name.lower().replace(" ", "")
+def token_claims(request: Request) -> Optional[dict]:
+    """Claims of a valid bearer token, without touching the database.
+
+    Cached in the ASGI scope, which every middleware's Request shares.
+    """
+    if "token_claims" in request.scope:
+        return request.scope["token_claims"]
+    claims = None
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            claims = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        except jwt.PyJWTError:
+            pass
+    request.scope["token_claims"] = claims
+    return claims
+
+def token_subject(request: Request) -> Optional[str]:
+    """Username from a valid bearer token."""
+    return (token_claims(request) or {}).get("sub")
+
+def shard_for_claims(claims: Optional[dict]) -> str:
+    claims = claims or {}
+    if "place" in claims:
+        return shard_router.shard_for_place(claims["place"])
+    # Tokens issued before sharding carry only the username
+    if claims.get("sub"):
+        return shard_router.locate_user(claims["sub"]) or DEFAULT_SHARD
+    return DEFAULT_SHARD
+
+def request_shard(request: Request) -> str:
+    return shard_for_claims(token_claims(request))
+
+# Generate username from name, unique across all shards
+def username_base(name: str) -> str:
+    return name.lower().replace(" ", "")
+
+def first_free_username(base_username: str, taken) -> str:
     username = base_username
     counter = 1
     
-    while db.query(User).filter(User.username == username).first():
+    while username in taken:
         username = f"{base_username}{counter}"
         counter += 1
     
     return username
 
+# Background jobs
+# Follow-up work is written to the jobs table in the same transaction as the
+# record that caused it, then picked up by a pool of worker threads that
+# claim rows with SELECT ... FOR UPDATE SKIP LOCKED.
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+JOB_POLL_SECONDS = float(os.environ.get('JOB_POLL_SECONDS', 2))
+JOB_LOCK_TIMEOUT = timedelta(seconds=int(os.environ.get('JOB_LOCK_TIMEOUT_SECONDS', 300)))
+JOB_RETRY_BASE_SECONDS = 5
+# Finished jobs are deleted after this long, so the table stays small
+JOB_RETENTION = timedelta(days=int(os.environ.get('JOB_RETENTION_DAYS', 7)))
+JOB_PRUNE_SECONDS = 3600
+JOB_HANDLERS = {}
+
+def job_handler(kind: str):
+    """Register `func(db, payload)` as the handler for jobs of `kind`."""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue_job(db: Session, kind: str, payload: dict, priority: int = 0, delay: float = 0) -> "Job":
+    """Add a job to the caller's transaction; it becomes visible on commit."""
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload, default=str),
+        priority=priority,
+        run_at=datetime.utcnow() + timedelta(seconds=delay)
+    )
+    db.add(job)
+    db.info["jobs_enqueued"] = True
+    return job
+
+def claim_job(db: Session) -> Optional["Job"]:
+    now = datetime.utcnow()
+    job = db.query(Job).filter(
+        or_(
+            and_(Job.status == "queued", Job.run_at <= now),
+            # Jobs whose worker died mid-run
+            and_(Job.status == "running", Job.locked_at < now - JOB_LOCK_TIMEOUT),
+        )
+    ).order_by(Job.priority.desc(), Job.run_at).limit(1).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.rollback()
+        return None
+    # Conditional update keeps the claim exclusive where SKIP LOCKED is unavailable
+    claimed = db.query(Job).filter(Job.id == job.id, Job.attempts == job.attempts).update(
+        {Job.status: "running", Job.locked_at: now, Job.attempts: (job.attempts or 0) + 1},
+        synchronize_session="fetch",
+    )
+    db.commit()
+    return job if claimed else None
+
+def run_job(db: Session, job: "Job") -> None:
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for job kind {job.kind!r}")
+        handler(db, json.loads(job.payload or "{}"))
+        job.status = "done"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    except Exception:
+        db.rollback()
+        job.last_error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = "queued"
+            job.run_at = datetime.utcnow() + timedelta(seconds=JOB_RETRY_BASE_SECONDS * 2 ** job.attempts)
+        db.commit()
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+
+def prune_jobs(db: Session, batch_size: int = 5000) -> int:
+    """Delete done and failed jobs that finished more than JOB_RETENTION ago."""
+    cutoff = datetime.utcnow() - JOB_RETENTION
+    deleted = 0
+    for job_status in ("done", "failed"):
+        while True:
+            job_ids = [job_id for (job_id,) in db.query(Job.id).filter(
+                Job.status == job_status, Job.finished_at < cutoff
+            ).limit(batch_size)]
+            if not job_ids:
+                break
+            db.query(Job).filter(Job.id.in_(job_ids)).delete(synchronize_session=False)
+            db.commit()
+            deleted += len(job_ids)
+    return deleted
+
+# Upkeep each shard's job runner does between jobs, as name: (interval seconds, func(db))
+RUNNER_MAINTENANCE = {
+    "create-partitions": (PARTITION_CHECK_SECONDS, lambda db: ensure_partitions(db.get_bind())),
+    "prune-jobs": (JOB_PRUNE_SECONDS, prune_jobs),
+}
+
+class JobRunner:
+    """Worker threads draining one shard's jobs table.
+
+    Between jobs they also run RUNNER_MAINTENANCE, such as keeping monthly
+    partitions created ahead, so this does not depend on cron.
+    """
+
+    def __init__(self, workers: int, shard: str = DEFAULT_SHARD):
+        self.workers = workers
+        self.shard = shard
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._maintenance_lock = threading.Lock()
+        # Startup has just created partitions; pruning can wait an interval too
+        self._next_maintenance = {
+            name: time.monotonic() + interval for name, (interval, _) in RUNNER_MAINTENANCE.items()
+        }
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{self.shard}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=JOB_POLL_SECONDS * 2)
+        self._threads = []
+
+    def wake(self):
+        self._wake.set()
+
+    def _maintain(self):
+        now = time.monotonic()
+        with self._maintenance_lock:
+            due = [name for name, next_run in self._next_maintenance.items() if now >= next_run]
+            for name in due:
+                self._next_maintenance[name] = now + RUNNER_MAINTENANCE[name][0]
+        for name in due:
+            try:
+                with shard_router.session(self.shard) as db:
+                    RUNNER_MAINTENANCE[name][1](db)
+            except Exception:
+                logger.exception("Job runner maintenance %s failed", name)
+
+    def _work(self):
+        while not self._stop.is_set():
+            self._maintain()
+            db = shard_router.session(self.shard)
+            try:
+                job = claim_job(db)
+                if job is not None:
+                    run_job(db, job)
+            except Exception:
+                logger.exception("Job worker error")
+                job = None
+            finally:
+                db.close()
+            if job is None:
+                self._wake.wait(JOB_POLL_SECONDS)
+                self._wake.clear()
+
+job_runners = {name: JobRunner(JOB_WORKERS, name) for name in shard_router.names}
+
+@event.listens_for(Session, "after_commit")
+def wake_job_runner(session):
+    if session.info.pop("jobs_enqueued", False):
+        job_runners[session.info.get("shard", DEFAULT_SHARD)].wake()
+
+# Rate limiting and admission control
+class TokenBucketStore:
+    """In-process token buckets keyed by an arbitrary string."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """Consume `cost` tokens; return 0 if allowed, else seconds until allowed."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now, rate, burst)
+                bucket = self._buckets[key] = [float(burst), now]
+            tokens = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                return 0.0
+            bucket[0] = tokens
+            return (cost - tokens) / rate
+
+    def _prune(self, now: float, rate: float, burst: int):
+        # Buckets that would be full again carry no state worth keeping
+        full = [key for key, (tokens, last) in self._buckets.items() if tokens + (now - last) * rate >= burst]
+        for key in full or list(self._buckets)[: self.max_keys // 10]:
+            del self._buckets[key]
+
+class RedisTokenBucketStore:
+    """Token buckets shared between processes through Redis."""
+
+    SCRIPT = """
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = math.min(burst, (tonumber(state[1]) or burst) + (now - (tonumber(state[2]) or now)) * rate)
+    local wait = 0
+    if tokens >= cost then tokens = tokens - cost else wait = (cost - tokens) / rate end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._script = redis.Redis.from_url(url).register_script(self.SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        return float(self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, cost, time.time()]))
+
+class AdmissionPolicy(NamedTuple):
+    ip_rate: float  # tokens per second
+    ip_burst: int
+    user_rate: float
+    user_burst: int
+    max_concurrency: int
+    max_body_bytes: Optional[int] = None
+
+def _per_minute(name: str, default: int) -> float:
+    return int(os.environ.get(name, default)) / 60.0
+
+# Expensive routes, keyed by (method, path)
+ADMISSION_POLICIES = {
+    ("POST", "/api/login"): AdmissionPolicy(
+        ip_rate=_per_minute("LOGIN_RATE_PER_IP_PER_MINUTE", 30), ip_burst=10,
+        user_rate=_per_minute("LOGIN_RATE_PER_USER_PER_MINUTE", 10), user_burst=5,
+        max_concurrency=int(os.environ.get("LOGIN_MAX_CONCURRENCY", 8)),
+    ),
+    ("POST", "/api/sync"): AdmissionPolicy(
+        ip_rate=_per_minute("SYNC_RATE_PER_IP_PER_MINUTE", 120), ip_burst=30,
+        user_rate=_per_minute("SYNC_RATE_PER_USER_PER_MINUTE", 20), user_burst=10,
+        max_concurrency=int(os.environ.get("SYNC_MAX_CONCURRENCY", 16)),
+        max_body_bytes=int(os.environ.get("SYNC_MAX_BODY_BYTES", 10 * 1024 * 1024)),
+    ),
+}
+
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+rate_limit_store = RedisTokenBucketStore(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_REDIS_URL else TokenBucketStore()
+# Requests currently in flight per admission-controlled route (per process)
+in_flight: Dict[tuple, int] = {key: 0 for key in ADMISSION_POLICIES}
+# Proxies (addresses or CIDRs, or "*") whose X-Forwarded-For is believed, so
+# per-IP limits apply to clients rather than to the ingress. Same variable
+# and default as uvicorn's --forwarded-allow-ips.
+FORWARDED_ALLOW_IPS = [value.strip() for value in os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1").split(",") if value.strip()]
+TRUSTED_PROXY_NETWORKS = [ipaddress.ip_network(value, strict=False) for value in FORWARDED_ALLOW_IPS if value != "*"]
+
+def is_trusted_proxy(address: str) -> bool:
+    if "*" in FORWARDED_ALLOW_IPS:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXY_NETWORKS)
+
+def client_ip(request: Request) -> str:
+    """The client address, looking through X-Forwarded-For set by trusted proxies."""
+    host = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get("x-forwarded-for")
+    if not forwarded or not is_trusted_proxy(host):
+        return host
+    # Walk back from the nearest hop; the first untrusted address is the client
+    hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else host
+
+def too_many_requests(retry_after: float, detail: str = "Too many requests") -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+def check_user_rate_limit(route_key: tuple, username: str):
+    """Per-user limit for routes where the user is only known after parsing the body."""
+    policy = ADMISSION_POLICIES[route_key]
+    retry_after = rate_limit_store.take(f"user:{route_key[1]}:{username}", policy.user_rate, policy.user_burst)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+# Profiling and slow-query log
+# Comma-separated usernames allowed to profile requests and read diagnostics
+ADMIN_USERNAMES = {name.strip() for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name.strip()}
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_MS', 5)) / 1000
+SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_MS', 200)) / 1000
+SERVER_FILE = os.path.abspath(__file__)
+
+current_route: ContextVar[Optional[str]] = ContextVar("current_route", default=None)
+# The sampler profiling the current request, if any
+active_profile: ContextVar[Optional["StackSampler"]] = ContextVar("active_profile", default=None)
+recent_profiles: deque = deque(maxlen=50)
+recent_slow_queries: deque = deque(maxlen=200)
+
+def get_admin_user(current_user: User = Depends(get_current_user)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+class StackSampler:
+    """Samples the stacks of one request's code while it runs.
+
+    Other requests share the event loop and the threadpool, so only this
+    request's work is sampled: the event loop while one of its tasks (see
+    profile_scope) is running, and pool threads while they execute one of
+    its SQL statements. Python work the request does on a pool thread
+    between statements is not sampled. Of those stacks, only ones passing
+    through this module are kept.
+
+    Output is in collapsed-stack format ("outer;inner count" per line), as
+    consumed by flamegraph.pl and speedscope. Create it on the event loop.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.tasks: set = {asyncio.current_task()}
+        # thread id -> statements of this request it is executing
+        self.threads: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        self._thread.join()
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            serving = {thread_id for thread_id, statements in list(self.threads.items()) if statements > 0}
+            if asyncio.current_task(self.loop) in self.tasks:
+                serving.add(self.loop_thread)
+            frames = sys._current_frames()
+            for thread_id in serving:
+                frame = frames.get(thread_id)
+                stack, in_server = [], False
+                while frame is not None:
+                    code = frame.f_code
+                    in_server = in_server or code.co_filename == SERVER_FILE
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if in_server:
+                    self.counts[";".join(reversed(stack))] += 1
+
+async def profile_scope():
+    """Router dependency marking the handler's task as part of a profiled request."""
+    sampler = active_profile.get()
+    if sampler is not None:
+        sampler.tasks.add(asyncio.current_task())
+
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((context, time.perf_counter()))
+    sampler = active_profile.get()
+    if sampler is not None:
+        sampler.threads[threading.get_ident()] += 1
+
+def end_query_timer(conn) -> float:
+    sampler = active_profile.get()
+    if sampler is not None:
+        sampler.threads[threading.get_ident()] -= 1
+    _, started = conn.info["query_start"].pop()
+    return time.perf_counter() - started
+
+def log_slow_query(conn, cursor, statement, parameters, context, executemany):
+    duration = end_query_timer(conn)
+    if duration >= SLOW_QUERY_SECONDS:
+        entry = {
+            "route": current_route.get(),
+            "duration_ms": round(duration * 1000, 2),
+            "statement": statement,
+            "parameters": repr(parameters)[:2000],
+            "at": datetime.utcnow(),
+        }
+        recent_slow_queries.append(entry)
+        logger.warning("Slow query on %s (%.1f ms): %s %s", entry["route"], entry["duration_ms"], statement, entry["parameters"])
+
+def discard_failed_query_timer(exception_context):
+    # A statement that raises never reaches after_cursor_execute. Errors
+    # raised before the cursor ran (e.g. binding parameters) pushed nothing.
+    conn = exception_context.connection
+    pending = conn.info.get("query_start") if conn is not None else None
+    if pending and pending[-1][0] is exception_context.execution_context:
+        end_query_timer(conn)
+
+for bound_engine in {read_engine, *shard_router.engines.values()}:
+    event.listen(bound_engine, "before_cursor_execute", start_query_timer)
+    event.listen(bound_engine, "after_cursor_execute", log_slow_query)
+    event.listen(bound_engine, "handle_error", discard_failed_query_timer)
+
+# Query budgets
+# Every api_router route declares how many SQL statements and result rows a
+# request may cost, keyed by (method, route path) like ADMISSION_POLICIES;
+# the app refuses to start with an undeclared route. Statements are counted
+# per cursor execution (an executemany counts once), rows as ORM results are
+# fetched. Endpoints whose cost grows with their input also get `per_item`
+# statements for each item their handler reports through count_items().
+# Metering buffers every ORM result, so it only runs with QUERY_STATS_HEADER=1:
+# requests over budget then log a warning and usage and budget are returned
+# in X-Query-Stats, which tests/test_query_budgets.py and backend_test.py check.
+QUERY_STATS_HEADER = os.environ.get('QUERY_STATS_HEADER', '').lower() in ('1', 'true', 'yes')
+
+class QueryBudget(NamedTuple):
+    statements: int
+    rows: Optional[int] = None  # None for lists that return every row they read
+    per_item: float = 0  # a fraction for work done in batches
+    per_shard: bool = False  # fans out: statements and rows scale with the shard count
+
+class QueryUsage:
+    def __init__(self):
+        self.statements = 0
+        self.rows = 0
+        self.items = 0
+
+query_usage: ContextVar[Optional[QueryUsage]] = ContextVar("query_usage", default=None)
+
+# Without metering no QueryUsage is set, so the listeners below return at once
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    usage = query_usage.get()
+    if usage is not None:
+        usage.statements += 1
+
+for bound_engine in {read_engine, *shard_router.engines.values()}:
+    event.listen(bound_engine, "before_cursor_execute", count_statement)
+
+def count_items(count: int):
+    """Report units of work done by the current request, for its per_item budget."""
+    usage = query_usage.get()
+    if usage is not None:
+        usage.items += count
+
+@event.listens_for(Session, "do_orm_execute")
+def count_rows(orm_execute_state):
+    usage = query_usage.get()
+    if usage is None or not orm_execute_state.is_select:
+        return None
+    # Buffer the result so its rows can be counted, then hand back a replay
+    frozen = orm_execute_state.invoke_statement().freeze()
+    usage.rows += len(frozen.data)
+    return frozen()
+
+# Budgets are what tests/test_query_budgets.py measures on SQLite plus about a
+# quarter for headroom. Per-worker lists and searches read about as many rows
+# as they return, so they are only held to a statement budget.
+QUERY_BUDGETS = {
+    ("POST", "/api/register"): QueryBudget(statements=3, per_shard=True),
+    ("POST", "/api/login"): QueryBudget(statements=2, rows=2),
+    ("POST", "/api/family-surveys"): QueryBudget(statements=13, rows=4),
+    ("GET", "/api/family-surveys"): QueryBudget(statements=3),
+    ("GET", "/api/family-surveys/households/{household_id}"): QueryBudget(statements=3, rows=3),
+    ("GET", "/api/family-surveys/households/{household_id}/history"): QueryBudget(statements=4),
+    ("POST", "/api/pregnancy-reports"): QueryBudget(statements=9, rows=4),
+    ("GET", "/api/pregnancy-reports"): QueryBudget(statements=4),
+    ("GET", "/api/pregnancy-reports/high-risk"): QueryBudget(statements=3),
+    ("POST", "/api/pregnancy-reports/score"): QueryBudget(statements=5),
+    ("POST", "/api/child-vaccinations"): QueryBudget(statements=7, rows=3),
+    ("GET", "/api/child-vaccinations/due"): QueryBudget(statements=3),
+    ("POST", "/api/child-vaccinations/refresh-schedule"): QueryBudget(statements=5),
+    ("POST", "/api/postnatal-care"): QueryBudget(statements=7, rows=3),
+    ("POST", "/api/leprosy-reports"): QueryBudget(statements=4, rows=2),
+    ("GET", "/api/admin/audit"): QueryBudget(statements=7, per_shard=True),
+    ("GET", "/api/admin/trends"): QueryBudget(statements=3, per_shard=True),
+    ("POST", "/api/admin/trends/rebuild"): QueryBudget(statements=13, per_shard=True),
+    ("GET", "/api/alerts"): QueryBudget(statements=3),
+    ("PUT", "/api/alerts/read"): QueryBudget(statements=5),
+    ("GET", "/api/alerts/stream"): QueryBudget(statements=3, rows=3),
+    ("PUT", "/api/alerts/{alert_id}/read"): QueryBudget(statements=5, rows=3),
+    ("GET", "/api/search"): QueryBudget(statements=3),
+    # Items: surveys for sync, which upserts them one at a time; records
+    # linked, about 5 statements per batch of 500
+    ("POST", "/api/sync"): QueryBudget(statements=12, per_item=6),
+    ("POST", "/api/beneficiaries/link"): QueryBudget(statements=22, per_item=0.01),
+    ("GET", "/api/beneficiaries/{beneficiary_id}/timeline"): QueryBudget(statements=10),
+    ("GET", "/api/dashboard"): QueryBudget(statements=9, rows=10),
+    ("GET", "/api/bootstrap"): QueryBudget(statements=9),
+    ("GET", "/api/jobs/stats"): QueryBudget(statements=5, rows=20),
+    ("GET", "/api/admin/profiles"): QueryBudget(statements=2, rows=2),
+    ("GET", "/api/admin/profiles/{profile_id}"): QueryBudget(statements=2, rows=2),
+    ("GET", "/api/admin/slow-queries"): QueryBudget(statements=2, rows=2),
+    ("GET", "/api/admin/places"): QueryBudget(statements=9, per_shard=True),
+}
+
+# Content negotiation
+# Clients on slow links can ask for MessagePack or CBOR (Accept /
+# Content-Type) and zstd compression (Accept-Encoding / Content-Encoding).
+# Payloads use the same Pydantic schemas; datetimes travel as native
+# timestamps instead of ISO strings.
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+CBOR_TYPE = "application/cbor"
+ZSTD_LEVEL = int(os.environ.get('ZSTD_LEVEL', 3))
+MAX_DECOMPRESSED_BYTES = int(os.environ.get('SYNC_MAX_DECOMPRESSED_BYTES', 64 * 1024 * 1024))
+_type_adapters: Dict[object, TypeAdapter] = {}
+
+def _msgpack_default(value):
+    if isinstance(value, datetime):
+        # Naive datetimes are UTC; packb(datetime=True) only accepts aware ones
+        return value.replace(tzinfo=timezone.utc)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+def _naive_utc(value):
+    """Decoded timestamps come back tz-aware; the models store naive UTC."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if isinstance(value, dict):
+        return {key: _naive_utc(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_naive_utc(item) for item in value]
+    return value
+
+def negotiated_media_type(accept: str) -> str:
+    accept = accept.lower()
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK_TYPES):
+        return MSGPACK_TYPES[0]
+    if cbor2 is not None and CBOR_TYPE in accept:
+        return CBOR_TYPE
+    return "application/json"
+
+def encode_payload(content, schema, media_type: str) -> bytes:
+    adapter = _type_adapters.get(schema)
+    if adapter is None:
+        adapter = _type_adapters[schema] = TypeAdapter(schema)
+    if media_type == "application/json":
+        return adapter.dump_json(content)
+    data = adapter.dump_python(content)
+    if media_type == CBOR_TYPE:
+        return cbor2.dumps(data, timezone=timezone.utc, default=lambda encoder, value: encoder.encode(str(value)))
+    return msgpack.packb(data, datetime=True, default=_msgpack_default)
+
+def negotiate_response(request: Request, content, schema):
+    """Return `content` encoded as the client asked; plain JSON falls through to FastAPI."""
+    media_type = negotiated_media_type(request.headers.get("accept", ""))
+    compress = zstandard is not None and "zstd" in request.headers.get("accept-encoding", "").lower()
+    if media_type == "application/json" and not compress:
+        return content
+    
+    body = encode_payload(content, schema, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if compress:
+        body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        headers["Content-Encoding"] = "zstd"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+async def read_body(request: Request) -> bytes:
+    """The request body, cut off with a 413 past the route's max_body_bytes.
+
+    admission_control rejects a declared Content-Length over the limit
+    before reading; a chunked upload declares none, so it is counted here.
+    """
+    limit = request.scope.get("max_body_bytes")
+    if limit is None:
+        return await request.body()
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail="Request body too large")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+async def negotiated_body(request: Request) -> dict:
+    """Request body decoded from JSON, MessagePack or CBOR, optionally zstd-compressed."""
+    body = await read_body(request)
+    if request.headers.get("content-encoding", "").lower() == "zstd":
+        if zstandard is None:
+            raise HTTPException(status_code=415, detail="zstd encoding not supported")
+        try:
+            body = zstandard.ZstdDecompressor().decompress(body, max_output_size=MAX_DECOMPRESSED_BYTES)
+        except zstandard.ZstdError:
+            raise HTTPException(status_code=400, detail="Invalid zstd body")
+    
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    try:
+        if content_type in MSGPACK_TYPES and msgpack is not None:
+            data = _naive_utc(msgpack.unpackb(body, timestamp=3))
+        elif content_type == CBOR_TYPE and cbor2 is not None:
+            data = _naive_utc(cbor2.loads(body))
+        elif content_type == "application/json":
+            data = json.loads(body or b"{}")
+        else:
+            raise HTTPException(status_code=415, detail=f"Unsupported content type {content_type}")
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed request body")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Request body must be an object")
+    return data
+
+SYNC_SCHEMAS = {
+    'family_surveys': FamilySurveyCreate,
+    'pregnancy_reports': PregnancyReportCreate,
+    'child_vaccinations': ChildVaccinationCreate,
+    'postnatal_care': PostnatalCareCreate,
+    'leprosy_reports': LeprosyReportCreate,
+}
+
 # FastAPI app setup
 app = FastAPI(title="AASHAKIRANA Healthcare API", version="1.0.0")
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", dependencies=[Depends(profile_scope)])
 
 # Auth endpoints
+# Registration runs one query per shard (concurrently) and one INSERT. The
+# query finds taken usernames and any existing phone or Aadhaar; the unique
+# constraints on the home shard catch whatever races past it.
+REGISTER_ATTEMPTS = 3
+REGISTRATION_CONFLICTS = (
+    ("phone_number", "Phone number already registered"),
+    ("aadhaar_index", "Aadhaar number already registered"),
+)
+
+def registration_conflicts(db: Session, base_username: str, phone_number: str, aadhaar_index: str):
+    """Taken usernames of the form `base_username` + digits, and whether the phone or Aadhaar is taken."""
+    rows = db.query(User.username, User.phone_number == phone_number, User.aadhaar_index == aadhaar_index).filter(or_(
+        # The prefix match uses ix_users_username_pattern; the regex drops other names sharing the prefix
+        and_(
+            User.username.startswith(base_username, autoescape=True),
+            User.username.regexp_match(f"^{re.escape(base_username)}[0-9]*$"),
+        ),
+        User.phone_number == phone_number,
+        User.aadhaar_index == aadhaar_index,
+    )).all()
+    return {username for username, _, _ in rows}, any(row[1] for row in rows), any(row[2] for row in rows)
+
 @api_router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    # Check if phone or aadhaar already exists
-    if db.query(User).filter(User.phone_number == user_data.phone_number).first():
-        raise HTTPException(status_code=400, detail="Phone number already registered")
-    
-    if db.query(User).filter(User.aadhaar_number == user_data.aadhaar_number).first():
-        raise HTTPException(status_code=400, detail="Aadhaar number already registered")
-    
-    # Generate unique username
-    username = generate_username(user_data.name, db)
+async def register(user_data: UserCreate):
+    base_username = username_base(user_data.name)
+    aadhaar_index = aadhaar_blind_index(user_data.aadhaar_number)
+    shard = shard_router.shard_for_place(user_data.place)
     
     # Hash password
     hashed_password = hash_password(user_data.password)
     
-    # Create user
-    db_user = User(
-        username=username,
-        name=user_data.name,
-        phone_number=user_data.phone_number,
-        place=user_data.place,
-        aadhaar_number=user_data.aadhaar_number,
-        hashed_password=hashed_password
-    )
+    for attempt in range(REGISTER_ATTEMPTS):
+        # Check if phone or aadhaar already exists on any shard
+        existing = shard_router.scatter(lambda db: registration_conflicts(
+            db, base_username, user_data.phone_number, aadhaar_index
+        )).values()
+        if any(phone for _, phone, _ in existing):
+            raise HTTPException(status_code=400, detail="Phone number already registered")
+        
+        if any(aadhaar for _, _, aadhaar in existing):
+            raise HTTPException(status_code=400, detail="Aadhaar number already registered")
+        
+        # Create user
+        db_user = User(
+            id=uuid.uuid4(),
+            username=first_free_username(base_username, set().union(*(taken for taken, _, _ in existing))),
+            name=user_data.name,
+            phone_number=user_data.phone_number,
+            place=user_data.place,
+            aadhaar_number=user_data.aadhaar_number,
+            hashed_password=hashed_password,
+            created_at=datetime.utcnow()
+        )
+        response = UserResponse(
+            id=str(db_user.id),
+            username=db_user.username,
+            name=db_user.name,
+            phone_number=db_user.phone_number,
+            place=db_user.place,
+            created_at=db_user.created_at
+        )
+        
+        db = shard_router.session(shard)
+        try:
+            db.add(db_user)
+            db.commit()
+            return response
+        except IntegrityError as e:
+            db.rollback()
+            violation = str(e.orig)
+            for column, detail in REGISTRATION_CONFLICTS:
+                if column in violation:
+                    raise HTTPException(status_code=400, detail=detail)
+            # Only the username can be left: someone took it since the check
+        finally:
+            db.close()
     
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    raise HTTPException(status_code=409, detail="Could not allocate a username, please retry")
+
+def protect_aadhaar(db: Session, batch_size: int = 500) -> int:
+    """Encrypt plain-text Aadhaar numbers left by older releases and rotate ciphertexts to the newest key.
+
+    Legacy values are read from the old users.aadhaar_number column, if it is
+    still there, and cleared once moved. Returns the number of rows rewritten.
+    """
+    rewritten = 0
+    if "aadhaar_number" in {column["name"] for column in sa_inspect(db.get_bind()).get_columns("users")}:
+        while True:
+            rows = db.execute(text(
+                "SELECT id, aadhaar_number FROM users WHERE aadhaar_number IS NOT NULL LIMIT :limit"
+            ), {"limit": batch_size}).all()
+            if not rows:
+                break
+            db.execute(text(
+                "UPDATE users SET aadhaar_index = :aadhaar_index, aadhaar_encrypted = :aadhaar_encrypted, "
+                "aadhaar_number = NULL WHERE id = :id"
+            ), [{
+                "id": user_id,
+                "aadhaar_index": aadhaar_blind_index(number),
+                "aadhaar_encrypted": aadhaar_cipher.encrypt(normalize_aadhaar(number).encode()).decode(),
+            } for user_id, number in rows])
+            db.commit()
+            rewritten += len(rows)
     
-    return UserResponse(
-        id=str(db_user.id),
-        username=db_user.username,
-        name=db_user.name,
-        phone_number=db_user.phone_number,
-        place=db_user.place,
-        created_at=db_user.created_at
-    )
+    last_id = None
+    while True:
+        query = db.query(User.id, User.aadhaar_encrypted).filter(User.aadhaar_encrypted.isnot(None))
+        if last_id is not None:
+            query = query.filter(User.id > last_id)
+        rows = query.order_by(User.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        db.execute(update(User), [
+            {"id": user_id, "aadhaar_encrypted": aadhaar_cipher.rotate(ciphertext.encode()).decode()}
+            for user_id, ciphertext in rows
+        ])
+        db.commit()
+        rewritten += len(rows)
+    return rewritten
 
 @api_router.post("/login")
-async def login(login_data: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == login_data.username).first()
+async def login(login_data: UserLogin):
+    check_user_rate_limit(("POST", "/api/login"), login_data.username)
+    user = None
+    shard = shard_router.locate_user(login_data.username)
+    if shard is not None:
+        with shard_router.session(shard) as db:
+            user = db.query(User).filter(User.username == login_data.username).first()
     
     if not user or not verify_password(login_data.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Incorrect username or password")
     
-    access_token = create_access_token(data={"sub": user.username})
+    # The place claim routes later requests to the user's shard
+    access_token = create_access_token(data={"sub": user.username, "place": user.place})
     
     return {
         "access_token": access_token,
@@ -357,49 +1758,284 @@ async def login(login_data: UserLogin, db: Session = Depends(get_db)):
         )
     }
 
-# Family Survey endpoints
+# Family survey versioning
+# Surveys are upserted per (worker, household). Each version that changes
+# something appends its diff to family_survey_versions.
+SURVEY_FIELDS = ("members_list", "sanitation", "chronic_illnesses")
+
+def household_survey_query(db: Session, worker_id, household_id: str):
+    return db.query(FamilySurvey).filter(
+        FamilySurvey.asha_worker_id == worker_id,
+        FamilySurvey.household_id == household_id
+    )
+
+def upsert_family_survey(db: Session, worker_id, data: dict) -> FamilySurvey:
+    """Insert or update the worker's survey of data["household_id"].
+
+    A resurvey that changes nothing leaves the row and its version alone.
+    """
+    query = household_survey_query(db, worker_id, data["household_id"])
+    survey = query.with_for_update().first()
+    if survey is None:
+        survey = FamilySurvey(
+            asha_worker_id=worker_id,
+            household_id=data["household_id"],
+            **{field: data.get(field) for field in SURVEY_FIELDS}
+        )
+        try:
+            with db.begin_nested():
+                db.add(survey)
+        except IntegrityError:
+            # A concurrent request created the household first; update its row
+            survey = query.with_for_update().one()
+        else:
+            db.add(FamilySurveyVersion(
+                survey_id=survey.id,
+                version=survey.version,
+                changes=json.dumps({field: [None, getattr(survey, field)] for field in SURVEY_FIELDS})
+            ))
+            return survey
+    
+    changes = {
+        field: [getattr(survey, field), data.get(field)]
+        for field in SURVEY_FIELDS
+        if data.get(field) != getattr(survey, field)
+    }
+    if changes:
+        for field, (_, value) in changes.items():
+            setattr(survey, field, value)
+        survey.version += 1
+        survey.updated_at = datetime.utcnow()
+        db.add(FamilySurveyVersion(survey_id=survey.id, version=survey.version, changes=json.dumps(changes)))
+    return survey
+
+def family_survey_response(survey: FamilySurvey) -> FamilySurveyResponse:
+    return FamilySurveyResponse(
+        id=str(survey.id),
+        household_id=survey.household_id,
+        members_list=survey.members_list,
+        sanitation=survey.sanitation,
+        chronic_illnesses=survey.chronic_illnesses,
+        version=survey.version,
+        created_at=survey.created_at,
+        updated_at=survey.updated_at,
+        synced=survey.synced
+    )
+
+# Family Survey endpoints
 @api_router.post("/family-surveys", response_model=FamilySurveyResponse)
 async def create_family_survey(
     survey_data: FamilySurveyCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_survey = FamilySurvey(
-        **survey_data.dict(),
-        asha_worker_id=current_user.id
-    )
-    db.add(db_survey)
+    db_survey = upsert_family_survey(db, current_user.id, survey_data.dict())
     db.commit()
     db.refresh(db_survey)
     
-    return FamilySurveyResponse(
-        id=str(db_survey.id),
-        household_id=db_survey.household_id,
-        members_list=db_survey.members_list,
-        sanitation=db_survey.sanitation,
-        chronic_illnesses=db_survey.chronic_illnesses,
-        created_at=db_survey.created_at,
-        synced=db_survey.synced
-    )
+    return family_survey_response(db_survey)
 
 @api_router.get("/family-surveys", response_model=List[FamilySurveyResponse])
 async def get_family_surveys(
+    request: Request,
+    since: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
+):
+    query = db.query(FamilySurvey).filter(FamilySurvey.asha_worker_id == current_user.id)
+    if since is not None:
+        # Households created or resurveyed since the client's last fetch
+        query = query.filter(FamilySurvey.updated_at >= since)
+    surveys = query.all()
+    return negotiate_response(request, [
+        family_survey_response(survey) for survey in surveys
+    ], List[FamilySurveyResponse])
+
+@api_router.get("/family-surveys/households/{household_id}", response_model=FamilySurveyResponse)
+async def get_household_survey(
+    household_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
-    surveys = db.query(FamilySurvey).filter(FamilySurvey.asha_worker_id == current_user.id).all()
+    survey = household_survey_query(db, current_user.id, household_id).first()
+    if survey is None:
+        raise HTTPException(status_code=404, detail="Household not found")
+    return family_survey_response(survey)
+
+@api_router.get("/family-surveys/households/{household_id}/history", response_model=List[FamilySurveyVersionResponse])
+async def get_household_history(
+    household_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    survey = household_survey_query(db, current_user.id, household_id).first()
+    if survey is None:
+        raise HTTPException(status_code=404, detail="Household not found")
+    versions = db.query(FamilySurveyVersion).filter(
+        FamilySurveyVersion.survey_id == survey.id
+    ).order_by(FamilySurveyVersion.version).all()
     return [
-        FamilySurveyResponse(
-            id=str(survey.id),
-            household_id=survey.household_id,
-            members_list=survey.members_list,
-            sanitation=survey.sanitation,
-            chronic_illnesses=survey.chronic_illnesses,
-            created_at=survey.created_at,
-            synced=survey.synced
-        ) for survey in surveys
+        FamilySurveyVersionResponse(
+            version=version.version,
+            changes=json.loads(version.changes or "{}"),
+            created_at=version.created_at
+        ) for version in versions
     ]
 
+# High-risk pregnancy scoring
+# Gestational week by which each of the four recommended ANC visits is due
+ANC_VISIT_WEEKS = np.array([12, 26, 34, 36])
+# A pregnancy stays open until six weeks past its EDD
+OPEN_PREGNANCY_GRACE = timedelta(weeks=6)
+HIGH_RISK_SCORE = 8
+# Visits behind schedule implied by the form's single ANC status. 'scheduled'
+# means the next visit is booked; 'pending' that the one due now is not done.
+ANC_STATUS_BEHIND = {"completed": 0, "scheduled": 0, "pending": 1}
+
+class AncVisits(NamedTuple):
+    completed: Optional[int]  # None when the field only gives a status
+    behind: int = 0  # visits behind schedule, per the status
+
+def count_anc_visits(anc_checkups: Optional[str]) -> AncVisits:
+    """ANC visits recorded in the anc_checkups field.
+
+    Offline or older clients may send a JSON list of visits or a number, which
+    count directly. The form sends only a status, which says nothing about
+    earlier visits, only how many the mother is behind. Text that is neither
+    counts as up to date.
+    """
+    value = (anc_checkups or "").strip()
+    if value.lower() in ANC_STATUS_BEHIND:
+        return AncVisits(None, ANC_STATUS_BEHIND[value.lower()])
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return AncVisits(None)
+    if isinstance(parsed, list):
+        return AncVisits(sum(
+            1 for visit in parsed
+            if not isinstance(visit, dict) or visit.get("status", "completed") == "completed"
+        ))
+    if isinstance(parsed, (int, float)):
+        return AncVisits(max(int(parsed), 0))
+    return AncVisits(None)
+
+def count_risk_factors(risk_factors: Optional[str]) -> int:
+    value = (risk_factors or "").strip()
+    if value.lower() in ("", "none", "normalrisk", "normal"):
+        return 0
+    if value.lower() == "highrisk":
+        return 2
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        parsed = [item for item in re.split(r"[,;\n]", value) if item.strip()]
+    return len(parsed) if isinstance(parsed, list) else 1
+
+def compute_risk_scores(lmp, edd, gravida, para, anc_completed, anc_behind, risk_count, today):
+    """Vectorised risk scoring over parallel arrays for a batch of pregnancies.
+
+    lmp/edd are datetime64[D] arrays and anc_completed a float array, NaN
+    where only a status was given; there missed visits are anc_behind. The
+    rest are integer arrays. Returns (gestational_age_weeks,
+    missed_anc_visits, risk_score) as integer arrays.
+    """
+    ga_weeks = np.clip((today - lmp).astype("timedelta64[D]").astype(int) // 7, 0, 45)
+    expected = (ga_weeks[:, None] >= ANC_VISIT_WEEKS[None, :]).sum(axis=1)
+    missed = np.where(np.isnan(anc_completed), anc_behind, np.clip(expected - anc_completed, 0, None)).astype(int)
+    
+    score = (
+        missed * 2
+        + risk_count * 3
+        + (gravida >= 5) * 2  # grand multipara
+        + (gravida == 1)  # primigravida
+        + ((gravida - para) >= 3)  # repeated pregnancy loss
+        + (np.isnat(edd) | (edd < today)) * 3  # post-term or undated
+    )
+    return ga_weeks, missed, score.astype(int)
+
+def score_pregnancies(reports, today=None) -> List[dict]:
+    """Derived risk columns for a batch of reports or result rows."""
+    if not reports:
+        return []
+    today = np.datetime64(today or datetime.utcnow().date(), "D")
+    lmp = np.array([(r.lmp or datetime.utcnow()).date() for r in reports], dtype="datetime64[D]")
+    edd = np.array([r.edd.date() if r.edd else None for r in reports], dtype="datetime64[D]")
+    gravida = np.array([r.gravida or 0 for r in reports])
+    para = np.array([r.para or 0 for r in reports])
+    risk_count = np.array([count_risk_factors(r.risk_factors) for r in reports])
+    visits = [count_anc_visits(r.anc_checkups) for r in reports]
+    anc_completed = np.array([np.nan if v.completed is None else v.completed for v in visits], dtype=float)
+    anc_behind = np.array([v.behind for v in visits])
+    ga_weeks, missed, score = compute_risk_scores(lmp, edd, gravida, para, anc_completed, anc_behind, risk_count, today)
+    return [
+        {
+            "gestational_age_weeks": int(ga),
+            "missed_anc_visits": int(m),
+            "risk_score": int(sc),
+        } for ga, m, sc in zip(ga_weeks, missed, score)
+    ]
+
+@job_handler("score_pregnancies")
+def score_pregnancies_job(db: Session, payload: dict) -> None:
+    """Score newly written reports and raise an alert for high-risk ones."""
+    report_ids = [uuid.UUID(report_id) for report_id in payload["report_ids"]]
+    reports = db.query(PregnancyReport).filter(PregnancyReport.id.in_(report_ids)).all()
+    now = datetime.utcnow()
+    for report, fields in zip(reports, score_pregnancies(reports)):
+        for key, value in fields.items():
+            setattr(report, key, value)
+        report.risk_scored_at = now
+    
+    high_risk = [report for report in reports if report.risk_score >= HIGH_RISK_SCORE]
+    alerted = {
+        patient_id for (patient_id,) in db.query(Alert.patient_id).filter(
+            Alert.alert_type == "anc",
+            Alert.patient_id.in_([str(report.id) for report in high_risk])
+        )
+    } if high_risk else set()
+    for report in high_risk:
+        if str(report.id) not in alerted:
+            db.add(Alert(
+                title="High-risk pregnancy",
+                message=(
+                    f"{report.patient_name} has risk score {report.risk_score} "
+                    f"({report.missed_anc_visits} missed ANC visits). Please schedule a visit."
+                ),
+                alert_type="anc",
+                patient_id=str(report.id),
+                patient_name=report.patient_name,
+                due_date=now,
+                asha_worker_id=report.asha_worker_id
+            ))
+
+def score_open_pregnancies(db: Session, worker_id=None, batch_size: int = 20000) -> int:
+    """Nightly pass: rescore every open pregnancy in large vectorised batches."""
+    scored = 0
+    last_id = None
+    now = datetime.utcnow()
+    while True:
+        query = db.query(
+            PregnancyReport.id, PregnancyReport.created_at, PregnancyReport.lmp, PregnancyReport.edd, PregnancyReport.gravida,
+            PregnancyReport.para, PregnancyReport.anc_checkups, PregnancyReport.risk_factors
+        ).filter(or_(PregnancyReport.edd.is_(None), PregnancyReport.edd >= now - OPEN_PREGNANCY_GRACE))
+        if worker_id is not None:
+            query = query.filter(PregnancyReport.asha_worker_id == worker_id)
+        if last_id is not None:
+            query = query.filter(PregnancyReport.id > last_id)
+        rows = query.order_by(PregnancyReport.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        db.execute(update(PregnancyReport), [
+            {"id": row.id, "created_at": row.created_at, "risk_scored_at": now, **fields}
+            for row, fields in zip(rows, score_pregnancies(rows))
+        ])
+        db.commit()
+        scored += len(rows)
+        last_id = rows[-1].id
+    return scored
+
 # Pregnancy Report endpoints
 @api_router.post("/pregnancy-reports", response_model=PregnancyReportResponse)
 async def create_pregnancy_report(
@@ -412,6 +2048,8 @@ async def create_pregnancy_report(
         asha_worker_id=current_user.id
     )
     db.add(db_report)
+    db.flush()
+    enqueue_job(db, "score_pregnancies", {"report_ids": [str(db_report.id)]}, priority=10)
     db.commit()
     db.refresh(db_report)
     
@@ -425,16 +2063,59 @@ async def create_pregnancy_report(
         risk_factors=db_report.risk_factors,
         patient_name=db_report.patient_name,
         patient_phone=db_report.patient_phone,
+        gestational_age_weeks=db_report.gestational_age_weeks,
+        missed_anc_visits=db_report.missed_anc_visits,
+        risk_score=db_report.risk_score,
         created_at=db_report.created_at,
         synced=db_report.synced
     )
 
 @api_router.get("/pregnancy-reports", response_model=List[PregnancyReportResponse])
 async def get_pregnancy_reports(
+    request: Request,
+    since: Optional[datetime] = None,
+    include_archived: bool = False,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
+):
+    query = db.query(PregnancyReport).filter(PregnancyReport.asha_worker_id == current_user.id)
+    if since is not None:
+        query = query.filter(PregnancyReport.created_at >= since)
+    reports = query.all()
+    if include_archived:
+        criteria = [ArchivedRecord.asha_worker_id == current_user.id]
+        if since is not None:
+            criteria.append(ArchivedRecord.created_at >= since)
+        reports += await run_in_threadpool(load_archived, db, PregnancyReport, *criteria)
+    return negotiate_response(request, [
+        PregnancyReportResponse(
+            id=str(report.id),
+            lmp=report.lmp,
+            edd=report.edd,
+            gravida=report.gravida,
+            para=report.para,
+            anc_checkups=report.anc_checkups,
+            risk_factors=report.risk_factors,
+            patient_name=report.patient_name,
+            patient_phone=report.patient_phone,
+            gestational_age_weeks=report.gestational_age_weeks,
+            missed_anc_visits=report.missed_anc_visits,
+            risk_score=report.risk_score,
+            created_at=report.created_at,
+            synced=report.synced
+        ) for report in reports
+    ], List[PregnancyReportResponse])
+
+@api_router.get("/pregnancy-reports/high-risk", response_model=List[PregnancyReportResponse])
+async def get_high_risk_pregnancies(
+    min_score: int = Query(HIGH_RISK_SCORE, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
 ):
-    reports = db.query(PregnancyReport).filter(PregnancyReport.asha_worker_id == current_user.id).all()
+    reports = db.query(PregnancyReport).filter(
+        PregnancyReport.asha_worker_id == current_user.id,
+        PregnancyReport.risk_score >= min_score
+    ).order_by(PregnancyReport.risk_score.desc()).all()
     return [
         PregnancyReportResponse(
             id=str(report.id),
@@ -446,11 +2127,167 @@ async def get_pregnancy_reports(
             risk_factors=report.risk_factors,
             patient_name=report.patient_name,
             patient_phone=report.patient_phone,
+            gestational_age_weeks=report.gestational_age_weeks,
+            missed_anc_visits=report.missed_anc_visits,
+            risk_score=report.risk_score,
             created_at=report.created_at,
             synced=report.synced
         ) for report in reports
     ]
 
+@api_router.post("/pregnancy-reports/score", response_model=ScoringResult)
+async def rescore_pregnancy_reports(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return ScoringResult(scored=score_open_pregnancies(db, worker_id=current_user.id))
+
+# Immunisation schedule engine
+# National Immunisation Schedule as (dose code, days after birth).
+IMMUNISATION_SCHEDULE = [
+    ("BCG", 0), ("OPV-0", 0), ("HEPB-0", 0),
+    ("OPV-1", 42), ("PENTA-1", 42), ("RVV-1", 42), ("FIPV-1", 42), ("PCV-1", 42),
+    ("OPV-2", 70), ("PENTA-2", 70), ("RVV-2", 70),
+    ("OPV-3", 98), ("PENTA-3", 98), ("RVV-3", 98), ("FIPV-2", 98), ("PCV-2", 98),
+    ("MR-1", 270), ("JE-1", 270), ("PCV-B", 270), ("VITA-1", 270),
+    ("MR-2", 480), ("JE-2", 480), ("DPT-B1", 480), ("OPV-B", 480),
+    ("DPT-B2", 1825),
+    ("TD-10", 3650), ("TD-16", 5840),
+]
+SCHEDULE_CODES = [code for code, _ in IMMUNISATION_SCHEDULE]
+SCHEDULE_OFFSETS = np.array([days for _, days in IMMUNISATION_SCHEDULE], dtype="timedelta64[D]")
+# Spellings workers use besides the dose code itself
+SCHEDULE_ALIASES = {
+    "HEPB-0": ["HEP-B-0"], "FIPV-1": ["F-IPV-1"], "FIPV-2": ["F-IPV-2"], "VITA-1": ["VIT-A-1", "VITAMIN-A-1"],
+    "PCV-B": ["PCV-BOOSTER"], "DPT-B1": ["DPT-BOOSTER-1"], "DPT-B2": ["DPT-BOOSTER-2"], "OPV-B": ["OPV-BOOSTER"],
+}
+# "OPV-0" also matches "OPV 0", "opv_0" and "OPV0" inside free text
+SCHEDULE_PATTERNS = [
+    re.compile(r"\b(" + "|".join(
+        r"[\s\-_]*".join(map(re.escape, spelling.split("-"))) for spelling in [code, *SCHEDULE_ALIASES.get(code, [])]
+    ) + r")\b", re.IGNORECASE)
+    for code in SCHEDULE_CODES
+]
+# Free-text entries naming doses that are still owed, e.g. "OPV 1 due"
+PENDING_DOSE_WORDS = re.compile(r"\b(due|pending|missed|not\s+(given|done)|to\s+be\s+given)\b", re.IGNORECASE)
+
+def parse_given_doses(vaccine_schedule: Optional[str]) -> np.ndarray:
+    """Map the free-form vaccine_schedule field to a bool mask over the schedule.
+
+    Accepts a JSON list of dose codes (or of objects with a vaccine/code/name
+    key), or the form's free text, split on commas, semicolons and newlines.
+    Dose codes are found anywhere in an entry ("BCG given", "Penta 1 on 3/2"),
+    except in entries that say the dose is still due. Anything else is ignored.
+    """
+    given = np.zeros(len(SCHEDULE_CODES), dtype=bool)
+    if not vaccine_schedule:
+        return given
+    try:
+        entries = json.loads(vaccine_schedule)
+    except ValueError:
+        entries = re.split(r"[,;\n]", vaccine_schedule)
+    if not isinstance(entries, list):
+        entries = [entries]
+    for entry in entries:
+        if isinstance(entry, dict):
+            if PENDING_DOSE_WORDS.search(str(entry.get("status") or "")):
+                continue
+            entry = entry.get("vaccine") or entry.get("code") or entry.get("name")
+        if not isinstance(entry, str) or PENDING_DOSE_WORDS.search(entry):
+            continue
+        for index, pattern in enumerate(SCHEDULE_PATTERNS):
+            if pattern.search(entry):
+                given[index] = True
+    return given
+
+def compute_schedules(dobs: np.ndarray, given: np.ndarray, today: np.datetime64):
+    """Vectorised due-date computation for a cohort.
+
+    dobs is a datetime64[D] array of shape (n,), given a bool array of shape
+    (n, doses). Returns (next_due, overdue) where next_due is datetime64[D]
+    with NaT for children who have completed the schedule and overdue is a
+    bool mask of pending doses already past their due date.
+    """
+    due = dobs[:, None] + SCHEDULE_OFFSETS[None, :]
+    pending = ~given
+    overdue = pending & (due < today)
+    pending_due = np.where(pending, due, np.datetime64("NaT"))
+    has_pending = pending.any(axis=1)
+    next_due = np.full(len(dobs), np.datetime64("NaT"), dtype="datetime64[D]")
+    if has_pending.any():
+        next_due[has_pending] = np.nanmin(pending_due[has_pending], axis=1)
+    return next_due, overdue
+
+def _schedule_fields(dobs, schedules, today=None):
+    """Derived fields per record, or None where no dose in the text was recognised.
+
+    An unrecognised schedule would read as "nothing given" and mark every dose
+    since birth as missed, so those records keep what the worker entered.
+    """
+    today = np.datetime64(today or datetime.utcnow().date(), "D")
+    dob_array = np.array([dob.date() for dob in dobs], dtype="datetime64[D]")
+    given = np.array([parse_given_doses(schedule) for schedule in schedules]).reshape(len(dobs), len(SCHEDULE_CODES))
+    next_due, overdue = compute_schedules(dob_array, given, today)
+    return [
+        {
+            "next_due": None if np.isnat(due) else datetime.combine(due.astype(object), datetime.min.time()),
+            "missed_doses": json.dumps([code for code, missed in zip(SCHEDULE_CODES, row) if missed]),
+        } if recognised else None
+        for due, row, recognised in zip(next_due, overdue, given.any(axis=1))
+    ]
+
+def parse_missed_doses(missed_doses: Optional[str]) -> List[str]:
+    try:
+        codes = json.loads(missed_doses or "[]")
+    except ValueError:
+        # Rows written before the schedule engine hold free text
+        return [missed_doses]
+    return codes if isinstance(codes, list) else [str(codes)]
+
+def apply_immunisation_schedule(record: "ChildVaccination"):
+    """Derive next_due and missed_doses for a single record before insert.
+
+    Records whose schedule text names no known dose keep the worker's values.
+    """
+    if isinstance(record.child_dob, str):
+        record.child_dob = datetime.fromisoformat(record.child_dob)
+    if record.child_dob is None:
+        return
+    fields = _schedule_fields([record.child_dob], [record.vaccine_schedule])[0]
+    if fields is None:
+        return
+    record.next_due = fields["next_due"]
+    record.missed_doses = fields["missed_doses"]
+
+def refresh_immunisation_schedules(db: Session, worker_id=None, batch_size: int = 5000) -> int:
+    """Recompute next_due and missed_doses for whole cohorts, one batch per pass."""
+    updated = 0
+    last_id = None
+    while True:
+        query = db.query(
+            ChildVaccination.id, ChildVaccination.created_at, ChildVaccination.child_dob, ChildVaccination.vaccine_schedule
+        ).filter(ChildVaccination.child_dob.isnot(None))
+        if worker_id is not None:
+            query = query.filter(ChildVaccination.asha_worker_id == worker_id)
+        if last_id is not None:
+            query = query.filter(ChildVaccination.id > last_id)
+        rows = query.order_by(ChildVaccination.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        fields = _schedule_fields([row.child_dob for row in rows], [row.vaccine_schedule for row in rows])
+        changes = [
+            # created_at is part of the table's primary key (and lets Postgres prune partitions)
+            {"id": row.id, "created_at": row.created_at, **row_fields}
+            for row, row_fields in zip(rows, fields) if row_fields is not None
+        ]
+        if changes:
+            db.execute(update(ChildVaccination), changes)
+            db.commit()
+        updated += len(changes)
+        last_id = rows[-1].id
+    return updated
+
 # Child Vaccination endpoints
 @api_router.post("/child-vaccinations")
 async def create_child_vaccination(
@@ -462,10 +2299,47 @@ async def create_child_vaccination(
         **vaccination_data.dict(),
         asha_worker_id=current_user.id
     )
+    apply_immunisation_schedule(db_vaccination)
     db.add(db_vaccination)
     db.commit()
     return {"message": "Child vaccination record created successfully"}
 
+@api_router.get("/child-vaccinations/due", response_model=List[DueVaccinationResponse])
+async def get_due_vaccinations(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    # Defaults to the current week; overdue children are included via start=None
+    today = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+    end = end or today + timedelta(days=7 - today.weekday())
+    query = db.query(ChildVaccination).filter(
+        ChildVaccination.asha_worker_id == current_user.id,
+        ChildVaccination.next_due < end
+    )
+    if start is not None:
+        query = query.filter(ChildVaccination.next_due >= start)
+    vaccinations = query.order_by(ChildVaccination.next_due).all()
+    return [
+        DueVaccinationResponse(
+            id=str(vaccination.id),
+            child_name=vaccination.child_name,
+            child_dob=vaccination.child_dob,
+            parent_name=vaccination.parent_name,
+            parent_phone=vaccination.parent_phone,
+            next_due=vaccination.next_due,
+            missed_doses=parse_missed_doses(vaccination.missed_doses)
+        ) for vaccination in vaccinations
+    ]
+
+@api_router.post("/child-vaccinations/refresh-schedule", response_model=ScheduleRefreshResult)
+async def refresh_child_vaccination_schedules(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return ScheduleRefreshResult(updated=refresh_immunisation_schedules(db, worker_id=current_user.id))
+
 # Postnatal Care endpoints
 @api_router.post("/postnatal-care")
 async def create_postnatal_care(
@@ -496,29 +2370,742 @@ async def create_leprosy_report(
     db.commit()
     return {"message": "Leprosy report created successfully"}
 
+# Request coalescing
+class RequestCoalescer:
+    """Single-flight execution plus a short-lived result cache for reads.
+
+    Concurrent requests with the same key share one computation, run in the
+    threadpool on a session of its own; its result is then served for `ttl`
+    seconds. A write by the user (see invalidate) drops their cached results
+    and bumps their generation, so later requests start a fresh computation
+    instead of joining one that may have read the old data. Generations are
+    only kept while the user has a computation in flight.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = True
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._cache: Dict[tuple, tuple] = {}
+        self._generation: Dict[str, int] = {}
+
+    async def run(self, route: str, username: str, params: tuple, compute, open_session):
+        """compute(db) on a session from open_session(), shared by identical concurrent calls."""
+        def run_compute():
+            with open_session() as db:
+                return compute(db)
+        
+        if not self.enabled:
+            return await run_in_threadpool(run_compute)
+        cached = self._cache.get((route, username, params))
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        
+        key = (route, username, self._generation.get(username, 0), params)
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(run_in_threadpool(run_compute))
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        # Shielded so one client disconnecting does not cancel the others' result
+        return await asyncio.shield(future)
+
+    def _finish(self, key: tuple, future: asyncio.Future):
+        self._inflight.pop(key, None)
+        route, username, generation, params = key
+        # Started before a write by the user: serve it to its waiters, but don't cache it
+        stale = generation != self._generation.get(username, 0)
+        if not any(inflight[1] == username for inflight in self._inflight):
+            self._generation.pop(username, None)
+        if stale or self.ttl <= 0 or future.cancelled() or future.exception() is not None:
+            return
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            # Still full: evict the oldest entries (dicts keep insertion order)
+            while len(self._cache) >= self.max_entries:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[(route, username, params)] = (now + self.ttl, future.result())
+
+    def invalidate(self, username: str):
+        for key in [key for key in self._cache if key[1] == username]:
+            self._cache.pop(key, None)
+        if any(inflight[1] == username for inflight in self._inflight):
+            self._generation[username] = self._generation.get(username, 0) + 1
+
+request_coalescer = RequestCoalescer(ttl=float(os.environ.get('READ_CACHE_SECONDS', 2)))
+
+# Alert push
+SSE_HEARTBEAT_SECONDS = 15
+
+def sse_event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class AlertBroker:
+    """Fan-out of alert changes to connected SSE clients in this process.
+
+    Unread counts are tracked only for workers with an open stream: loaded
+    once on first connect and then adjusted from committed changes.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[uuid.UUID, set] = {}
+        self.unread: Dict[uuid.UUID, int] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def is_tracking(self, worker_id) -> bool:
+        return worker_id in self.unread
+
+    def subscribe(self, worker_id, unread: Optional[int]) -> asyncio.Queue:
+        self.loop = asyncio.get_running_loop()
+        if unread is not None and worker_id not in self.unread:
+            self.unread[worker_id] = unread
+        queue = asyncio.Queue(maxsize=100)
+        self.subscribers.setdefault(worker_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, worker_id, queue: asyncio.Queue):
+        queues = self.subscribers.get(worker_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[worker_id]
+                self.unread.pop(worker_id, None)
+
+    def alert_created(self, worker_id, alert: dict):
+        if worker_id in self.subscribers:
+            self._call(self._dispatch, worker_id, "alert", alert, 0 if alert["is_read"] else 1)
+
+    def unread_changed(self, worker_id, delta: int):
+        if worker_id in self.subscribers and delta:
+            self._call(self._dispatch, worker_id, None, None, delta)
+
+    def _call(self, func, *args):
+        # Commits may happen outside the event loop thread (e.g. batch jobs)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            func(*args)
+        elif self.loop is not None:
+            self.loop.call_soon_threadsafe(func, *args)
+
+    def _dispatch(self, worker_id, name, data, delta):
+        queues = self.subscribers.get(worker_id, ())
+        events = [(name, data)] if name else []
+        if delta and worker_id in self.unread:
+            self.unread[worker_id] = max(0, self.unread[worker_id] + delta)
+            events.append(("unread_count", {"unread_alerts": self.unread[worker_id]}))
+        for queue in queues:
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    pass  # slow client; the next unread_count resynchronises it
+
+alert_broker = AlertBroker()
+
+@event.listens_for(Session, "after_flush")
+def collect_alert_changes(session, flush_context):
+    pending = session.info.setdefault("alert_events", [])
+    for obj in session.new:
+        if isinstance(obj, Alert):
+            pending.append(("created", obj.asha_worker_id, {
+                "id": str(obj.id),
+                "title": obj.title,
+                "message": obj.message,
+                "alert_type": obj.alert_type,
+                "patient_name": obj.patient_name,
+                "due_date": obj.due_date,
+                "is_read": bool(obj.is_read),
+                "created_at": obj.created_at,
+            }))
+    for obj in session.dirty:
+        if isinstance(obj, Alert):
+            history = sa_inspect(obj).attrs.is_read.history
+            if history.has_changes():
+                was_read = bool(history.deleted and history.deleted[0])
+                pending.append(("unread", obj.asha_worker_id, (1 if was_read else 0) - (1 if obj.is_read else 0)))
+
+@event.listens_for(Session, "after_commit")
+def publish_alert_changes(session):
+    for kind, worker_id, payload in session.info.pop("alert_events", []):
+        if kind == "created":
+            alert_broker.alert_created(worker_id, payload)
+        else:
+            alert_broker.unread_changed(worker_id, payload)
+
+# Only when the whole transaction ends, not when a savepoint inside it rolls back
+@event.listens_for(Session, "after_transaction_end")
+def discard_alert_changes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("alert_events", None)
+
+# Audit log
+# Inserts and updates on the record tables are collected from each flush
+# and written in one batch just before the transaction commits, so the log
+# commits or rolls back with the change it describes. Bulk UPDATEs bypass
+# the flush: request handlers log them through audit_bulk_update, while the
+# nightly bulk recomputation of derived columns (risk scores, vaccine
+# schedules) is deliberately not logged.
+AUDITED_MODELS = (FamilySurvey, PregnancyReport, ChildVaccination, PostnatalCare, LeprosyReport, Alert)
+AUDIT_COMPACT_AFTER = timedelta(days=int(os.environ.get('AUDIT_COMPACT_AFTER_DAYS', 30)))
+AUDIT_COMPACT_WINDOW = timedelta(hours=int(os.environ.get('AUDIT_COMPACT_WINDOW_HOURS', 24)))
+AUDIT_COMPACT_LOOKBACK = timedelta(days=int(os.environ.get('AUDIT_COMPACT_LOOKBACK_DAYS', 7)))
+
+def audit_row(table_name: str, record_id, action: str, changes: dict, asha_worker_id=None, beneficiary_id=None) -> dict:
+    return {
+        "table_name": table_name,
+        "record_id": str(record_id),
+        "action": action,
+        "changes": json.dumps(changes, default=str),
+        "asha_worker_id": asha_worker_id,
+        "beneficiary_id": beneficiary_id,
+        "actor": request_user_var.get(),
+        "request_id": request_id_var.get(),
+        "created_at": datetime.utcnow(),
+    }
+
+def audit_bulk_update(db: Session, model, record_ids, changes: dict, asha_worker_id=None):
+    """Log a bulk UPDATE that changed `changes` on each of `record_ids`."""
+    db.info.setdefault("audit_rows", []).extend(
+        audit_row(model.__tablename__, record_id, "update", changes, asha_worker_id)
+        for record_id in record_ids
+    )
+
+@event.listens_for(Session, "after_flush")
+def collect_audit_rows(session, flush_context):
+    rows = session.info.setdefault("audit_rows", [])
+    for obj in session.new:
+        if isinstance(obj, AUDITED_MODELS):
+            state = sa_inspect(obj)
+            values = {attr.key: attr.value for attr in state.attrs if attr.key in state.mapper.column_attrs and attr.value is not None}
+            rows.append(audit_row(
+                obj.__tablename__, obj.id, "insert", values,
+                obj.asha_worker_id, getattr(obj, "beneficiary_id", None)
+            ))
+    for obj in session.dirty:
+        if isinstance(obj, AUDITED_MODELS):
+            state = sa_inspect(obj)
+            changes = {}
+            for key in state.mapper.column_attrs.keys():
+                history = state.attrs[key].history
+                if history.has_changes():
+                    changes[key] = [
+                        history.deleted[0] if history.deleted else None,
+                        history.added[0] if history.added else None,
+                    ]
+            if changes:
+                rows.append(audit_row(
+                    obj.__tablename__, obj.id, "update", changes,
+                    obj.asha_worker_id, getattr(obj, "beneficiary_id", None)
+                ))
+
+@event.listens_for(Session, "before_commit")
+def write_audit_rows(session):
+    # Releasing a savepoint also lands here; the outer commit writes the batch
+    if session.in_nested_transaction():
+        return
+    # Flush first so changes made since the last flush are collected too
+    session.flush()
+    rows = session.info.pop("audit_rows", None)
+    if rows:
+        session.connection().execute(AuditLog.__table__.insert(), rows)
+
+# Only when the whole transaction ends: a savepoint rolled back inside it
+# (upsert_family_survey's household race) leaves the rest of it to commit
+@event.listens_for(Session, "after_transaction_end")
+def discard_audit_rows(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("audit_rows", None)
+
+def compact_audit_log(db: Session, now: Optional[datetime] = None) -> int:
+    """Fold each record's updates within a window into a single row.
+
+    Only updates older than AUDIT_COMPACT_AFTER are merged, and only the
+    last AUDIT_COMPACT_LOOKBACK of those are scanned, so a nightly run
+    touches a bounded slice. Returns the number of rows removed.
+    """
+    cutoff = (now or datetime.utcnow()) - AUDIT_COMPACT_AFTER
+    rows = db.query(AuditLog).filter(
+        AuditLog.action == "update",
+        AuditLog.created_at < cutoff,
+        AuditLog.created_at >= cutoff - AUDIT_COMPACT_LOOKBACK
+    ).order_by(AuditLog.table_name, AuditLog.record_id, AuditLog.created_at).all()
+    
+    def window(row):
+        return (row.table_name, row.record_id, (row.created_at - datetime.min) // AUDIT_COMPACT_WINDOW)
+    
+    removed = 0
+    for _, group in itertools.groupby(rows, key=window):
+        group = list(group)
+        if len(group) < 2:
+            continue
+        merged = {}
+        for row in group:
+            for key, (old, new) in json.loads(row.changes or "{}").items():
+                merged[key] = [merged[key][0] if key in merged else old, new]
+        keep = group[-1]
+        keep.changes = json.dumps({key: change for key, change in merged.items() if change[0] != change[1]})
+        keep.merged_count = sum(row.merged_count or 1 for row in group)
+        for row in group[:-1]:
+            db.delete(row)
+            removed += 1
+    db.commit()
+    return removed
+
+@api_router.get("/admin/audit", response_model=List[AuditEntry])
+async def get_audit_log(
+    worker_id: Optional[str] = None,
+    beneficiary_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    admin: User = Depends(get_admin_user)
+):
+    """Changes to one worker's or one beneficiary's records, newest first, across all shards."""
+    if not worker_id and not beneficiary_id:
+        raise HTTPException(status_code=400, detail="worker_id or beneficiary_id is required")
+    try:
+        worker_uuid = uuid.UUID(worker_id) if worker_id else None
+        beneficiary_uuid = uuid.UUID(beneficiary_id) if beneficiary_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid id")
+    criteria = []
+    if worker_uuid is not None:
+        criteria.append(AuditLog.asha_worker_id == worker_uuid)
+    if since is not None:
+        criteria.append(AuditLog.created_at >= since)
+    if until is not None:
+        criteria.append(AuditLog.created_at < until)
+    
+    def load(db):
+        shard_criteria = list(criteria)
+        if beneficiary_uuid is not None:
+            # Rows logged before a record was linked carry no beneficiary_id
+            linked = [
+                and_(AuditLog.table_name == model.__tablename__, AuditLog.record_id.in_(
+                    [str(record_id) for (record_id,) in db.query(model.id).filter(model.beneficiary_id == beneficiary_uuid)]
+                ))
+                for model in (PregnancyReport, ChildVaccination, PostnatalCare)
+            ]
+            shard_criteria.append(or_(AuditLog.beneficiary_id == beneficiary_uuid, *linked))
+        return [
+            AuditEntry(
+                id=str(entry.id),
+                table_name=entry.table_name,
+                record_id=entry.record_id,
+                action=entry.action,
+                changes=json.loads(entry.changes or "{}"),
+                asha_worker_id=str(entry.asha_worker_id) if entry.asha_worker_id else None,
+                beneficiary_id=str(entry.beneficiary_id) if entry.beneficiary_id else None,
+                actor=entry.actor,
+                request_id=entry.request_id,
+                merged_count=entry.merged_count or 1,
+                created_at=entry.created_at
+            )
+            for entry in db.query(AuditLog).filter(*shard_criteria).order_by(AuditLog.created_at.desc()).limit(limit)
+        ]
+    
+    results = await run_in_threadpool(shard_router.scatter, load)
+    entries = [entry for shard_entries in results.values() for entry in shard_entries]
+    return sorted(entries, key=lambda entry: entry.created_at, reverse=True)[:limit]
+
+# Place-level daily rollups
+# Inserts on the record tables add to (place, day, metric) counters in the
+# same transaction, so trend queries never scan the record tables. Surveys
+# count survey visits: a new household or a resurvey that changed it.
+ROLLUP_METRICS = {
+    "surveys": FamilySurveyVersion,
+    "pregnancies": PregnancyReport,
+    "vaccinations": ChildVaccination,
+    "pnc_visits": PostnatalCare,
+}
+# Record models counted directly on insert; surveys are counted from FamilySurvey versions
+ROLLUP_INSERT_METRICS = {model: metric for metric, model in ROLLUP_METRICS.items() if model is not FamilySurveyVersion}
+ROLLUP_RECONCILE_DAYS = int(os.environ.get('ROLLUP_RECONCILE_DAYS', 2))
+
+@event.listens_for(Session, "after_flush")
+def collect_rollup_deltas(session, flush_context):
+    deltas = session.info.setdefault("rollup_deltas", Counter())
+    for obj in session.new:
+        metric = ROLLUP_INSERT_METRICS.get(type(obj))
+        if metric is not None:
+            deltas[(obj.asha_worker_id, obj.created_at.date(), metric)] += 1
+        elif isinstance(obj, FamilySurvey):
+            deltas[(obj.asha_worker_id, obj.created_at.date(), "surveys")] += 1
+    for obj in session.dirty:
+        if isinstance(obj, FamilySurvey) and sa_inspect(obj).attrs.version.history.has_changes():
+            deltas[(obj.asha_worker_id, obj.updated_at.date(), "surveys")] += 1
+
+def upsert_rollups(connection, counts: Dict[tuple, int]):
+    """Add `counts` ({(place, day, metric): n}) to the rollup rows."""
+    insert_for = postgresql_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    statement = insert_for(DailyRollup.__table__)
+    statement = statement.on_conflict_do_update(
+        index_elements=["place", "day", "metric"],
+        set_={"count": DailyRollup.__table__.c.count + statement.excluded["count"]}
+    )
+    connection.execute(statement, [
+        {"place": place, "day": day, "metric": metric, "count": count}
+        for (place, day, metric), count in counts.items()
+    ])
+
+@event.listens_for(Session, "before_commit")
+def write_rollup_deltas(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    deltas = session.info.pop("rollup_deltas", None)
+    if not deltas:
+        return
+    places = dict(session.query(User.id, User.place).filter(User.id.in_({key[0] for key in deltas})).all())
+    counts = Counter()
+    for (worker_id, day, metric), count in deltas.items():
+        counts[(places.get(worker_id) or "", day, metric)] += count
+    upsert_rollups(session.connection(), counts)
+
+# Only when the whole transaction ends, as for the audit log
+@event.listens_for(Session, "after_transaction_end")
+def discard_rollup_deltas(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("rollup_deltas", None)
+
+def rollup_source_query(db: Session, metric: str, start: datetime, end: datetime):
+    """(place, count) per place for `metric` between `start` and `end`, from the record tables."""
+    model = ROLLUP_METRICS[metric]
+    query = db.query(User.place, func.count(model.id))
+    if model is FamilySurveyVersion:
+        query = query.join(FamilySurvey, FamilySurvey.asha_worker_id == User.id).join(
+            FamilySurveyVersion, FamilySurveyVersion.survey_id == FamilySurvey.id
+        )
+    else:
+        query = query.join(model, model.asha_worker_id == User.id)
+    return query.filter(model.created_at >= start, model.created_at < end).group_by(User.place)
+
+def rebuild_rollups(db: Session, day: date) -> int:
+    """Recompute one day's rollups from the record tables; returns rows written."""
+    start = datetime(day.year, day.month, day.day)
+    end = start + timedelta(days=1)
+    db.query(DailyRollup).filter(DailyRollup.day == day).delete(synchronize_session=False)
+    written = 0
+    for metric in ROLLUP_METRICS:
+        counts = Counter()
+        for place, count in rollup_source_query(db, metric, start, end):
+            counts[place or ""] += count
+        # Rows moved to cold storage still count, through their stubs
+        table_name = ROLLUP_METRICS[metric].__tablename__
+        if table_name in ARCHIVED_MODELS:
+            for place, count in db.query(User.place, func.count(ArchivedRecord.id)).join(
+                ArchivedRecord, ArchivedRecord.asha_worker_id == User.id
+            ).filter(
+                ArchivedRecord.table_name == table_name,
+                ArchivedRecord.created_at >= start,
+                ArchivedRecord.created_at < end
+            ).group_by(User.place):
+                counts[place or ""] += count
+        for place, count in counts.items():
+            db.add(DailyRollup(place=place, day=day, metric=metric, count=count))
+            written += 1
+    db.commit()
+    return written
+
+def reconcile_rollups(db: Session, days: int = ROLLUP_RECONCILE_DAYS) -> Dict[str, int]:
+    today = datetime.utcnow().date()
+    return {
+        str(day): rebuild_rollups(db, day)
+        for day in (today - timedelta(days=offset) for offset in range(days))
+    }
+
+@api_router.get("/admin/trends", response_model=List[TrendPoint])
+async def get_trends(
+    metric: Optional[List[str]] = Query(None),
+    place: Optional[List[str]] = Query(None),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    admin: User = Depends(get_admin_user)
+):
+    """Daily counts per place from the rollup tables; defaults to the last 30 days."""
+    unknown = set(metric or []) - set(ROLLUP_METRICS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {sorted(unknown)[0]}")
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    criteria = [DailyRollup.day >= start, DailyRollup.day <= end]
+    if metric:
+        criteria.append(DailyRollup.metric.in_(metric))
+    if place:
+        criteria.append(DailyRollup.place.in_(place))
+    shards = sorted({shard_router.shard_for_place(name) for name in place}) if place else None
+    
+    def load(db):
+        return [
+            TrendPoint(place=row.place, day=row.day, metric=row.metric, count=row.count)
+            for row in db.query(DailyRollup).filter(*criteria)
+        ]
+    
+    results = await run_in_threadpool(shard_router.scatter, load, shards)
+    return sorted(
+        (point for points in results.values() for point in points),
+        key=lambda point: (point.day, point.place, point.metric)
+    )
+
+@api_router.post("/admin/trends/rebuild")
+async def rebuild_trends(day: date, admin: User = Depends(get_admin_user)):
+    """Recompute a day's rollups from the record tables on every shard."""
+    results = await run_in_threadpool(shard_router.scatter, lambda db: rebuild_rollups(db, day))
+    return {"day": day, "rows": sum(results.values())}
+
+# Cold storage archival
+# Records older than ARCHIVE_AFTER_DAYS move in batches to zstd
+# compressed Parquet files under ARCHIVE_STORAGE_URI (a local directory or
+# an s3:// URI), one file per batch and partition, laid out as
+# <table>/month=YYYY-MM/place=<place>/<segment id>.parquet. Each file gets an
+# archive_segments row and each archived row a stub in archived_records; both
+# are written in the transaction that deletes the hot rows, after the file is
+# in place, so a crash at worst leaves an unreferenced file behind.
+# Family surveys hold the current state of a household and are never
+# archived; a vaccination record stays hot while its next dose is recent.
+# Every row here has reached the server, so the client-side `synced` flag
+# (which server inserts leave False) plays no part.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 400))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 5000))
+ARCHIVE_STORAGE_URI = os.environ.get('ARCHIVE_STORAGE_URI', str(ROOT_DIR / 'cold-archive'))
+ARCHIVED_MODELS = {
+    model.__tablename__: model
+    for model in (PregnancyReport, ChildVaccination, PostnatalCare, LeprosyReport)
+}
+
+def archive_filesystem():
+    """(filesystem, root path) for ARCHIVE_STORAGE_URI."""
+    if pyarrow is None:
+        raise RuntimeError("pyarrow is required to read or write archived records")
+    if "://" in ARCHIVE_STORAGE_URI:
+        return pyarrow.fs.FileSystem.from_uri(ARCHIVE_STORAGE_URI)
+    return pyarrow.fs.LocalFileSystem(), os.path.abspath(ARCHIVE_STORAGE_URI)
+
+def archive_schema(model):
+    def arrow_type(column):
+        if isinstance(column.type, DateTime):
+            return pyarrow.timestamp("us")
+        if isinstance(column.type, Boolean):
+            return pyarrow.bool_()
+        if isinstance(column.type, Integer):
+            return pyarrow.int64()
+        if isinstance(column.type, Float):
+            return pyarrow.float64()
+        return pyarrow.string()
+    
+    return pyarrow.schema([(column.name, arrow_type(column)) for column in model.__table__.columns])
+
+def archive_place_slug(place: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", normalize_place(place)).strip("-") or "unknown"
+
+def archivable(model, cutoff: datetime) -> list:
+    criteria = [model.created_at < cutoff]
+    if model is ChildVaccination:
+        criteria.append(or_(ChildVaccination.next_due.is_(None), ChildVaccination.next_due < cutoff))
+    return criteria
+
+def archive_cold_records(db: Session, now: Optional[datetime] = None, batch_size: int = ARCHIVE_BATCH_SIZE) -> Dict[str, int]:
+    """Move archivable rows to Parquet; returns rows archived per table."""
+    filesystem, root = archive_filesystem()
+    cutoff = (now or datetime.utcnow()) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = {}
+    for table_name, model in ARCHIVED_MODELS.items():
+        schema = archive_schema(model)
+        archived[table_name] = 0
+        while True:
+            rows = db.execute(
+                select(*model.__table__.columns, User.place)
+                .outerjoin(User, model.asha_worker_id == User.id)
+                .where(*archivable(model, cutoff))
+                .order_by(model.created_at)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            
+            partitions = {}
+            for row in rows:
+                partitions.setdefault((month_start(row.created_at), row.place or ""), []).append(row)
+            for (month, place), group in partitions.items():
+                segment = ArchiveSegment(
+                    id=uuid.uuid4(), table_name=table_name, month=month.date(), place=place, row_count=len(group)
+                )
+                segment.path = f"{table_name}/month={month:%Y-%m}/place={archive_place_slug(place)}/{segment.id}.parquet"
+                filesystem.create_dir(f"{root}/{os.path.dirname(segment.path)}", recursive=True)
+                pyarrow.parquet.write_table(pyarrow.Table.from_pylist([
+                    {name: str(row._mapping[name]) if isinstance(row._mapping[name], uuid.UUID) else row._mapping[name]
+                     for name in schema.names}
+                    for row in group
+                ], schema=schema), f"{root}/{segment.path}", filesystem=filesystem, compression="zstd")
+                db.add(segment)
+                db.add_all(ArchivedRecord(
+                    id=row.id,
+                    table_name=table_name,
+                    segment_id=segment.id,
+                    asha_worker_id=row.asha_worker_id,
+                    beneficiary_id=getattr(row, "beneficiary_id", None),
+                    created_at=row.created_at
+                ) for row in group)
+            
+            db.query(model).filter(
+                model.id.in_([row.id for row in rows]), model.created_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+            archived[table_name] += len(rows)
+    return archived
+
+def load_archived(db: Session, model, *criteria) -> list:
+    """Archived `model` rows whose stubs match `criteria`, as detached instances."""
+    stubs = db.query(ArchivedRecord.id, ArchiveSegment.path).join(
+        ArchiveSegment, ArchiveSegment.id == ArchivedRecord.segment_id
+    ).filter(ArchivedRecord.table_name == model.__tablename__, *criteria).all()
+    if not stubs:
+        return []
+    
+    filesystem, root = archive_filesystem()
+    ids_by_path = {}
+    for record_id, path in stubs:
+        ids_by_path.setdefault(path, []).append(str(record_id))
+    uuid_columns = {column.name for column in model.__table__.columns if isinstance(column.type, UUID)}
+    records = []
+    for path, ids in ids_by_path.items():
+        table = pyarrow.parquet.read_table(
+            f"{root}/{path}", filesystem=filesystem, filters=[("id", "in", ids)], partitioning=None
+        )
+        records.extend(
+            model(**{
+                name: uuid.UUID(value) if name in uuid_columns and value else value
+                for name, value in row.items()
+            }) for row in table.to_pylist()
+        )
+    return records
+
+def archived_counts(db: Session, worker_id) -> Dict[str, int]:
+    return dict(db.query(ArchivedRecord.table_name, func.count(ArchivedRecord.id)).filter(
+        ArchivedRecord.asha_worker_id == worker_id
+    ).group_by(ArchivedRecord.table_name).all())
+
 # Alerts endpoints
 @api_router.get("/alerts", response_model=List[AlertResponse])
 async def get_alerts(
+    request: Request,
+    since: Optional[datetime] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    alerts = db.query(Alert).filter(Alert.asha_worker_id == current_user.id).order_by(Alert.created_at.desc()).all()
-    return [
-        AlertResponse(
-            id=str(alert.id),
-            title=alert.title,
-            message=alert.message,
-            alert_type=alert.alert_type,
-            patient_name=alert.patient_name,
-            due_date=alert.due_date,
-            is_read=alert.is_read,
-            created_at=alert.created_at
-        ) for alert in alerts
+    worker_id = current_user.id
+    db.close()  # see read_session_factory
+    
+    def load_alerts(db: Session):
+        query = db.query(Alert).filter(Alert.asha_worker_id == worker_id)
+        if since is not None:
+            query = query.filter(Alert.created_at >= since)
+        alerts = query.order_by(Alert.created_at.desc()).all()
+        return [
+            AlertResponse(
+                id=str(alert.id),
+                title=alert.title,
+                message=alert.message,
+                alert_type=alert.alert_type,
+                patient_name=alert.patient_name,
+                due_date=alert.due_date,
+                is_read=alert.is_read,
+                created_at=alert.created_at
+            ) for alert in alerts
+        ]
+    
+    alerts = await request_coalescer.run(
+        "alerts", current_user.username, (since,), load_alerts, read_session_factory(request)
+    )
+    return negotiate_response(request, alerts, List[AlertResponse])
+
+@api_router.put("/alerts/read")
+async def mark_alerts_read(
+    request_data: MarkAlertsRead,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    criteria = [
+        Alert.asha_worker_id == current_user.id,
+        Alert.is_read == False
     ]
+    if not request_data.all:
+        try:
+            alert_ids = [uuid.UUID(alert_id) for alert_id in request_data.alert_ids]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid alert id")
+        criteria.append(Alert.id.in_(alert_ids))
+    
+    # RETURNING gives the ids for the audit log without a second query
+    marked = db.execute(
+        update(Alert).where(*criteria).values(is_read=True).returning(Alert.id),
+        execution_options={"synchronize_session": False}
+    ).scalars().all()
+    audit_bulk_update(db, Alert, marked, {"is_read": [False, True]}, asha_worker_id=current_user.id)
+    db.commit()
+    updated = len(marked)
+    alert_broker.unread_changed(current_user.id, -updated)
+    bootstrap_cache.invalidate(str(current_user.id))
+    return {"message": f"Marked {updated} alerts as read", "updated": updated}
+
+@api_router.get("/alerts/stream")
+async def stream_alerts(request: Request, token: Optional[str] = None):
+    """Server-Sent Events feed of new alerts and unread counts.
+
+    EventSource cannot send headers, so the token may be passed as a query
+    parameter. The database is queried once at connect time; after that the
+    stream is fed by commits in this process and heartbeats.
+    """
+    scheme, _, header_token = request.headers.get("authorization", "").partition(" ")
+    token = token or (header_token if scheme.lower() == "bearer" else None)
+    try:
+        claims = jwt.decode(token or "", JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except jwt.PyJWTError:
+        claims = {}
+    username = claims.get("sub")
+    if username is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    
+    db = shard_router.session(shard_for_claims(claims))
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        worker_id = user.id
+        unread = None
+        if not alert_broker.is_tracking(worker_id):
+            unread = db.query(Alert).filter(Alert.asha_worker_id == worker_id, Alert.is_read == False).count()
+    finally:
+        db.close()
+    
+    queue = alert_broker.subscribe(worker_id, unread)
+    
+    async def events():
+        try:
+            yield sse_event("unread_count", {"unread_alerts": alert_broker.unread[worker_id]})
+            while not await request.is_disconnected():
+                try:
+                    name, data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                    yield sse_event(name, data)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+        finally:
+            alert_broker.unsubscribe(worker_id, queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @api_router.put("/alerts/{alert_id}/read")
 async def mark_alert_read(
-    alert_id: str,
+    alert_id: uuid.UUID,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -534,50 +3121,355 @@ async def mark_alert_read(
     db.commit()
     return {"message": "Alert marked as read"}
 
+# Search endpoint
+# (record_type, model, name columns, phone column) searched by /api/search
+SEARCH_TARGETS = [
+    ("pregnancy_report", PregnancyReport, [PregnancyReport.patient_name], PregnancyReport.patient_phone),
+    ("child_vaccination", ChildVaccination, [ChildVaccination.child_name, ChildVaccination.parent_name], ChildVaccination.parent_phone),
+    ("postnatal_care", PostnatalCare, [PostnatalCare.mother_name], None),
+    ("leprosy_report", LeprosyReport, [LeprosyReport.patient_name], None),
+]
+
+def _match_score(column, term: str, dialect: str):
+    """Return (filter, score) for one searchable column."""
+    if dialect == "postgresql":
+        # `%` and ILIKE '%term%' are both served by the gin_trgm_ops index
+        return (
+            or_(column.op("%")(term), column.icontains(term, autoescape=True)),
+            func.similarity(column, term),
+        )
+    lowered, term = func.lower(column), term.lower()
+    contains = lowered.contains(term, autoescape=True)
+    return (
+        contains,
+        case((lowered.startswith(term, autoescape=True), 1.0), (contains, 0.5), else_=0.0),
+    )
+
+def build_search_query(term: str, worker_id, dialect: str, limit: int):
+    selects = []
+    for record_type, model, name_columns, phone_column in SEARCH_TARGETS:
+        columns = name_columns + ([phone_column] if phone_column is not None else [])
+        matches = [_match_score(column, term, dialect) for column in columns]
+        scores = [score for _, score in matches]
+        best_score = scores[0] if len(scores) == 1 else (
+            func.greatest(*scores) if dialect == "postgresql" else func.max(*scores)
+        )
+        selects.append(
+            select(
+                literal(record_type).label("record_type"),
+                model.id.label("record_id"),
+                name_columns[0].label("name"),
+                (name_columns[1] if len(name_columns) > 1 else null()).label("secondary_name"),
+                (phone_column if phone_column is not None else null()).label("phone"),
+                best_score.label("score"),
+                model.created_at.label("created_at"),
+            ).where(
+                model.asha_worker_id == worker_id,
+                or_(*[match for match, _ in matches]),
+            )
+        )
+    combined = union_all(*selects).subquery()
+    return (
+        select(combined)
+        .order_by(combined.c.score.desc(), combined.c.created_at.desc())
+        .limit(limit)
+    )
+
+@api_router.get("/search", response_model=List[SearchResult])
+async def search_patients(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    term = q.strip()
+    if len(term) < 2:
+        raise HTTPException(status_code=400, detail="Search term too short")
+    
+    query = build_search_query(term, current_user.id, db.bind.dialect.name, limit)
+    rows = db.execute(query).all()
+    return [
+        SearchResult(
+            record_type=row.record_type,
+            record_id=str(row.record_id),
+            name=row.name,
+            secondary_name=row.secondary_name,
+            phone=row.phone,
+            score=float(row.score),
+            created_at=row.created_at
+        ) for row in rows
+    ]
+
+# Beneficiary linking
+# Mothers are identified through (record model, name column, phone column).
+# Pregnancy reports go first so later PNC/vaccination records attach to the
+# beneficiary created from the pregnancy.
+BENEFICIARY_SOURCES = [
+    (PregnancyReport, PregnancyReport.patient_name, PregnancyReport.patient_phone),
+    (PostnatalCare, PostnatalCare.mother_name, None),
+    (ChildVaccination, ChildVaccination.parent_name, ChildVaccination.parent_phone),
+]
+PHONE_MATCH_NAME_THRESHOLD = 0.6
+NAME_ONLY_MATCH_THRESHOLD = 0.8
+# Name-only matches are looked for among beneficiaries whose normalized name
+# starts with the same letters; prefixes are fetched this many per query.
+NAME_PREFIX_LENGTH = 3
+NAME_PREFIX_CHUNK = 200
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join(re.sub(r"[^a-z ]", " ", (name or "").lower()).split())
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else None
+
+def name_similarity(a: str, b: str) -> float:
+    return SequenceMatcher(None, a, b).ratio()
+
+def _best_candidate(candidates, normalized, threshold):
+    best, best_score = None, threshold
+    for candidate in candidates:
+        score = name_similarity(normalized, candidate.normalized_name or "")
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+def name_prefix(normalized: str) -> str:
+    return normalized[:NAME_PREFIX_LENGTH]
+
+def load_link_candidates(db: Session, worker_ids, phones, prefixes):
+    """Beneficiaries of `worker_ids` with one of `phones` or a name starting with one of `prefixes`.
+
+    Served by the (worker, phone) and (worker, normalized_name) indexes, so
+    the cost follows the batch, not the size of each worker's register.
+    """
+    prefixes = sorted(prefixes)
+    chunks = [prefixes[i:i + NAME_PREFIX_CHUNK] for i in range(0, len(prefixes), NAME_PREFIX_CHUNK)] or [[]]
+    found = {}
+    for index, chunk in enumerate(chunks):
+        criteria = [Beneficiary.normalized_name.startswith(prefix, autoescape=True) for prefix in chunk]
+        if index == 0 and phones:
+            criteria.append(Beneficiary.phone.in_(phones))
+        if not criteria:
+            continue
+        for beneficiary in db.query(Beneficiary).filter(Beneficiary.asha_worker_id.in_(worker_ids), or_(*criteria)):
+            found[beneficiary.id] = beneficiary
+    return found.values()
+
+def link_beneficiaries(db: Session, worker_id=None, batch_size: int = 500) -> dict:
+    """Attach unlinked records to beneficiaries, one committed batch at a time.
+
+    Records are matched within the same ASHA worker, first by phone (with a
+    loose name check), then by close name similarity among beneficiaries
+    whose name shares its first NAME_PREFIX_LENGTH letters. Anything
+    unmatched becomes a new beneficiary, so each batch always makes progress
+    and the job can be re-run incrementally as new records arrive.
+    """
+    linked = created = 0
+    for model, name_column, phone_column in BENEFICIARY_SOURCES:
+        while True:
+            query = db.query(model).filter(model.beneficiary_id.is_(None))
+            if worker_id is not None:
+                query = query.filter(model.asha_worker_id == worker_id)
+            batch = query.order_by(model.created_at).limit(batch_size).all()
+            if not batch:
+                break
+            
+            records = []
+            for record in batch:
+                normalized = normalize_name(getattr(record, name_column.key))
+                phone = normalize_phone(getattr(record, phone_column.key)) if phone_column is not None else None
+                records.append((record, normalized, phone))
+            
+            # Only beneficiaries sharing a phone or a name prefix with the batch
+            # are loaded, and each record is scored against its own buckets
+            by_phone, by_prefix = {}, {}
+            def remember(beneficiary):
+                if beneficiary.phone:
+                    by_phone.setdefault((beneficiary.asha_worker_id, beneficiary.phone), []).append(beneficiary)
+                if beneficiary.normalized_name:
+                    key = (beneficiary.asha_worker_id, name_prefix(beneficiary.normalized_name))
+                    by_prefix.setdefault(key, []).append(beneficiary)
+            
+            for beneficiary in load_link_candidates(
+                db,
+                {record.asha_worker_id for record, _, _ in records},
+                {phone for _, _, phone in records if phone},
+                {name_prefix(normalized) for _, normalized, _ in records if normalized},
+            ):
+                remember(beneficiary)
+            
+            for record, normalized, phone in records:
+                worker = record.asha_worker_id
+                match = None
+                if phone:
+                    match = _best_candidate(by_phone.get((worker, phone), []), normalized, PHONE_MATCH_NAME_THRESHOLD)
+                if match is None and normalized:
+                    match = _best_candidate(
+                        [b for b in by_prefix.get((worker, name_prefix(normalized)), []) if not (phone and b.phone and b.phone != phone)],
+                        normalized,
+                        NAME_ONLY_MATCH_THRESHOLD,
+                    )
+                
+                if match is None:
+                    match = Beneficiary(
+                        id=uuid.uuid4(),
+                        name=getattr(record, name_column.key),
+                        normalized_name=normalized,
+                        phone=phone,
+                        asha_worker_id=worker
+                    )
+                    db.add(match)
+                    remember(match)
+                    created += 1
+                elif phone and not match.phone:
+                    match.phone = phone
+                    by_phone.setdefault((worker, phone), []).append(match)
+                
+                record.beneficiary_id = match.id
+                linked += 1
+            
+            db.commit()
+    return {"linked": linked, "created": created}
+
+@job_handler("link_beneficiaries")
+def link_beneficiaries_job(db: Session, payload: dict) -> None:
+    link_beneficiaries(db, worker_id=uuid.UUID(payload["worker_id"]))
+
+# A plain def, so FastAPI runs the matching and its commits in the threadpool
+@api_router.post("/beneficiaries/link", response_model=BeneficiaryLinkResult)
+def run_beneficiary_linking(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    result = link_beneficiaries(db, worker_id=current_user.id)
+    count_items(result["linked"])
+    return BeneficiaryLinkResult(**result)
+
+@api_router.get("/beneficiaries/{beneficiary_id}/timeline", response_model=BeneficiaryTimeline)
+async def get_beneficiary_timeline(
+    beneficiary_id: uuid.UUID,
+    include_archived: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    beneficiary = db.query(Beneficiary).filter(
+        Beneficiary.id == beneficiary_id,
+        Beneficiary.asha_worker_id == current_user.id
+    ).first()
+    
+    if not beneficiary:
+        raise HTTPException(status_code=404, detail="Beneficiary not found")
+    
+    def records(model):
+        found = db.query(model).filter(model.beneficiary_id == beneficiary.id).all()
+        if include_archived:
+            found += load_archived(db, model, ArchivedRecord.beneficiary_id == beneficiary.id)
+        return found
+    
+    events = [
+        TimelineEvent(
+            record_type="pregnancy_report",
+            record_id=str(report.id),
+            event_date=report.lmp,
+            summary=f"Pregnancy registered (EDD {report.edd.date() if report.edd else 'unknown'})"
+        ) for report in records(PregnancyReport)
+    ] + [
+        TimelineEvent(
+            record_type="postnatal_care",
+            record_id=str(pnc.id),
+            event_date=pnc.delivery_date,
+            summary="Delivery and postnatal care"
+        ) for pnc in records(PostnatalCare)
+    ] + [
+        TimelineEvent(
+            record_type="child_vaccination",
+            record_id=str(vaccination.id),
+            event_date=vaccination.child_dob,
+            summary=f"Child {vaccination.child_name} vaccination record"
+        ) for vaccination in records(ChildVaccination)
+    ]
+    events.sort(key=lambda event: event.event_date or datetime.min)
+    
+    return BeneficiaryTimeline(
+        id=str(beneficiary.id),
+        name=beneficiary.name,
+        phone=beneficiary.phone,
+        events=events
+    )
+
 # Dashboard endpoint
 @api_router.get("/dashboard")
 async def get_dashboard_stats(
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    total_surveys = db.query(FamilySurvey).filter(FamilySurvey.asha_worker_id == current_user.id).count()
-    total_pregnancies = db.query(PregnancyReport).filter(PregnancyReport.asha_worker_id == current_user.id).count()
-    total_vaccinations = db.query(ChildVaccination).filter(ChildVaccination.asha_worker_id == current_user.id).count()
-    total_pnc = db.query(PostnatalCare).filter(PostnatalCare.asha_worker_id == current_user.id).count()
-    unread_alerts = db.query(Alert).filter(
-        Alert.asha_worker_id == current_user.id,
-        Alert.is_read == False
-    ).count()
+    worker_id = current_user.id
+    db.close()  # see read_session_factory
     
-    return {
-        "total_surveys": total_surveys,
-        "total_pregnancies": total_pregnancies,
-        "total_vaccinations": total_vaccinations,
-        "total_pnc": total_pnc,
-        "unread_alerts": unread_alerts,
-        "incentives_earned": total_surveys * 50 + total_pregnancies * 100  # Mock calculation
-    }
+    def load_stats(db: Session):
+        archived = archived_counts(db, worker_id)
+        total_surveys = db.query(FamilySurvey).filter(FamilySurvey.asha_worker_id == worker_id).count()
+        total_pregnancies = db.query(PregnancyReport).filter(PregnancyReport.asha_worker_id == worker_id).count() + archived.get("pregnancy_reports", 0)
+        total_vaccinations = db.query(ChildVaccination).filter(ChildVaccination.asha_worker_id == worker_id).count() + archived.get("child_vaccinations", 0)
+        total_pnc = db.query(PostnatalCare).filter(PostnatalCare.asha_worker_id == worker_id).count() + archived.get("postnatal_care", 0)
+        unread_alerts = db.query(Alert).filter(
+            Alert.asha_worker_id == worker_id,
+            Alert.is_read == False
+        ).count()
+        
+        return {
+            "total_surveys": total_surveys,
+            "total_pregnancies": total_pregnancies,
+            "total_vaccinations": total_vaccinations,
+            "total_pnc": total_pnc,
+            "unread_alerts": unread_alerts,
+            "incentives_earned": total_surveys * 50 + total_pregnancies * 100  # Mock calculation
+        }
+    
+    return await request_coalescer.run(
+        "dashboard", current_user.username, (), load_stats, read_session_factory(request)
+    )
 
 # Sync endpoint for offline data
 @api_router.post("/sync")
 async def sync_offline_data(
-    sync_data: dict,
+    sync_data: dict = Depends(negotiated_body),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     # Process each type of form data from offline storage
     synced_count = 0
+    pregnancy_reports = []
     
     for form_type, records in sync_data.items():
+        schema = SYNC_SCHEMAS.get(form_type)
+        if schema is None:
+            continue
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail=f"{form_type} must be a list of records")
+        if form_type == 'family_surveys':
+            count_items(len(records))
         for record in records:
+            # Rows are built only from the create schema's fields, coerced to its types, so
+            # every encoding lands the same values and clients cannot set id, created_at etc.
+            if not isinstance(record, dict):
+                raise HTTPException(status_code=400, detail=f"Invalid {form_type} record")
+            try:
+                record = schema.model_validate(record).model_dump()
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid {form_type} record")
             record['asha_worker_id'] = current_user.id
             
             if form_type == 'family_surveys':
-                db_record = FamilySurvey(**record)
+                db_record = upsert_family_survey(db, current_user.id, record)
             elif form_type == 'pregnancy_reports':
                 db_record = PregnancyReport(**record)
+                pregnancy_reports.append(db_record)
             elif form_type == 'child_vaccinations':
                 db_record = ChildVaccination(**record)
+                apply_immunisation_schedule(db_record)
             elif form_type == 'postnatal_care':
                 db_record = PostnatalCare(**record)
             elif form_type == 'leprosy_reports':
@@ -588,12 +3480,383 @@ async def sync_offline_data(
             db.add(db_record)
             synced_count += 1
     
+    # Derived work runs after the response, in the job queue
+    db.flush()
+    if pregnancy_reports:
+        enqueue_job(db, "score_pregnancies", {"report_ids": [str(r.id) for r in pregnancy_reports]}, priority=5)
+    if synced_count:
+        enqueue_job(db, "link_beneficiaries", {"worker_id": str(current_user.id)})
     db.commit()
     return {"message": f"Synced {synced_count} records successfully"}
 
+# Device bootstrap
+# A new or reset device restores its offline store from one compressed
+# snapshot of the worker's records and alerts. Snapshots are built on first
+# request and cached per worker until a commit in this process touches one
+# of the worker's records or alerts. BOOTSTRAP_CACHE_SECONDS bounds how long
+# writes from other processes or bulk jobs can go unnoticed.
+BOOTSTRAP_CACHE_SECONDS = float(os.environ.get('BOOTSTRAP_CACHE_SECONDS', 600))
+BOOTSTRAP_CACHE_ENTRIES = int(os.environ.get('BOOTSTRAP_CACHE_ENTRIES', 200))
+# Rows stamped just before a snapshot can commit just after it; the
+# watermark trails by this much and clients de-duplicate by id
+BOOTSTRAP_WATERMARK_SLACK = timedelta(seconds=int(os.environ.get('BOOTSTRAP_WATERMARK_SLACK_SECONDS', 30)))
+bootstrap_cache = RequestCoalescer(ttl=BOOTSTRAP_CACHE_SECONDS, max_entries=BOOTSTRAP_CACHE_ENTRIES)
+
+@event.listens_for(Session, "after_flush")
+def collect_bootstrap_invalidations(session, flush_context):
+    workers = session.info.setdefault("bootstrap_workers", set())
+    for obj in itertools.chain(session.new, session.dirty):
+        if isinstance(obj, AUDITED_MODELS + (ArchivedRecord,)):
+            workers.add(str(obj.asha_worker_id))
+
+@event.listens_for(Session, "after_commit")
+def invalidate_bootstraps(session):
+    for worker_id in session.info.pop("bootstrap_workers", ()):
+        bootstrap_cache.invalidate(worker_id)
+
+# Only when the whole transaction ends, not when a savepoint inside it rolls back
+@event.listens_for(Session, "after_transaction_end")
+def discard_bootstrap_invalidations(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("bootstrap_workers", None)
+
+def build_bootstrap_snapshot(db: Session, worker_id) -> BootstrapSnapshot:
+    generated_at = datetime.utcnow()
+    
+    def records(model):
+        return db.query(model).filter(model.asha_worker_id == worker_id).order_by(model.created_at).all()
+    
+    return BootstrapSnapshot(
+        watermark=generated_at - BOOTSTRAP_WATERMARK_SLACK,
+        generated_at=generated_at,
+        family_surveys=[family_survey_response(survey) for survey in records(FamilySurvey)],
+        pregnancy_reports=[
+            PregnancyReportResponse(
+                id=str(report.id),
+                lmp=report.lmp,
+                edd=report.edd,
+                gravida=report.gravida,
+                para=report.para,
+                anc_checkups=report.anc_checkups,
+                risk_factors=report.risk_factors,
+                patient_name=report.patient_name,
+                patient_phone=report.patient_phone,
+                gestational_age_weeks=report.gestational_age_weeks,
+                missed_anc_visits=report.missed_anc_visits,
+                risk_score=report.risk_score,
+                created_at=report.created_at,
+                synced=report.synced
+            ) for report in records(PregnancyReport)
+        ],
+        child_vaccinations=[
+            ChildVaccinationResponse(
+                id=str(vaccination.id),
+                child_name=vaccination.child_name,
+                child_dob=vaccination.child_dob,
+                vaccine_schedule=vaccination.vaccine_schedule,
+                missed_doses=vaccination.missed_doses,
+                next_due=vaccination.next_due,
+                parent_name=vaccination.parent_name,
+                parent_phone=vaccination.parent_phone,
+                created_at=vaccination.created_at,
+                synced=vaccination.synced
+            ) for vaccination in records(ChildVaccination)
+        ],
+        postnatal_care=[
+            PostnatalCareResponse(
+                id=str(pnc.id),
+                pnc_visits=pnc.pnc_visits,
+                mother_health=pnc.mother_health,
+                baby_health=pnc.baby_health,
+                counselling=pnc.counselling,
+                mother_name=pnc.mother_name,
+                delivery_date=pnc.delivery_date,
+                created_at=pnc.created_at,
+                synced=pnc.synced
+            ) for pnc in records(PostnatalCare)
+        ],
+        leprosy_reports=[
+            LeprosyReportResponse(
+                id=str(report.id),
+                patient_name=report.patient_name,
+                leprosy_type=report.leprosy_type,
+                treatment=report.treatment,
+                follow_ups=report.follow_ups,
+                household_contacts=report.household_contacts,
+                created_at=report.created_at,
+                synced=report.synced
+            ) for report in records(LeprosyReport)
+        ],
+        alerts=[
+            AlertResponse(
+                id=str(alert.id),
+                title=alert.title,
+                message=alert.message,
+                alert_type=alert.alert_type,
+                patient_name=alert.patient_name,
+                due_date=alert.due_date,
+                is_read=alert.is_read,
+                created_at=alert.created_at
+            ) for alert in records(Alert)
+        ]
+    )
+
+@api_router.get("/bootstrap", response_model=BootstrapSnapshot)
+async def get_bootstrap(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """All of the worker's records and alerts in one compressed download.
+
+    Encoded per Accept (JSON, MessagePack, CBOR) and compressed with zstd or
+    gzip per Accept-Encoding. Supports If-None-Match.
+    """
+    media_type = negotiated_media_type(request.headers.get("accept", ""))
+    accept_encoding = request.headers.get("accept-encoding", "").lower()
+    if zstandard is not None and "zstd" in accept_encoding:
+        encoding = "zstd"
+    elif "gzip" in accept_encoding:
+        encoding = "gzip"
+    else:
+        encoding = None
+    worker_id = current_user.id
+    db.close()  # see read_session_factory
+    
+    def build(db: Session):
+        body = encode_payload(build_bootstrap_snapshot(db, worker_id), BootstrapSnapshot, media_type)
+        if encoding == "zstd":
+            body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        elif encoding == "gzip":
+            # mtime=0 keeps the bytes, and so the ETag, stable across rebuilds
+            body = gzip.compress(body, compresslevel=6, mtime=0)
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body
+    
+    etag, body = await bootstrap_cache.run(
+        "bootstrap", str(worker_id), (media_type, encoding), build, read_session_factory(request)
+    )
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+# Background job monitoring
+@api_router.get("/jobs/stats", response_model=JobStats)
+async def get_job_stats(
+    admin: User = Depends(get_admin_user),
+    db: Session = Depends(get_db)
+):
+    now = datetime.utcnow()
+    depth = dict(db.query(Job.status, func.count(Job.id)).filter(Job.status.in_(["queued", "running"])).group_by(Job.status).all())
+    oldest = db.query(func.min(Job.created_at)).filter(Job.status == "queued").scalar()
+    recent = db.query(Job.created_at, Job.finished_at, Job.status).filter(
+        Job.status.in_(["done", "failed"]),
+        Job.finished_at >= now - timedelta(hours=1)
+    ).all()
+    latencies = [(job.finished_at - job.created_at).total_seconds() for job in recent if job.status == "done"]
+    return JobStats(
+        queue_depth={"queued": depth.get("queued", 0), "running": depth.get("running", 0)},
+        oldest_queued_seconds=(now - oldest).total_seconds() if oldest else None,
+        avg_latency_seconds=sum(latencies) / len(latencies) if latencies else None,
+        failed_last_hour=sum(1 for job in recent if job.status == "failed")
+    )
+
+# Admin diagnostics
+@api_router.get("/admin/profiles")
+async def list_profiles(admin: User = Depends(get_admin_user)):
+    return [
+        {key: value for key, value in profile.items() if key != "collapsed"}
+        for profile in reversed(recent_profiles)
+    ]
+
+@api_router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, admin: User = Depends(get_admin_user)):
+    for profile in recent_profiles:
+        if profile["id"] == profile_id:
+            return profile["collapsed"]
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+@api_router.get("/admin/slow-queries")
+async def get_slow_queries(admin: User = Depends(get_admin_user)):
+    return list(reversed(recent_slow_queries))
+
+# Cross-district supervisor reports
+def summarise_places(db: Session) -> List[dict]:
+    """Per-place worker and record counts on one shard."""
+    def counts(model, *criteria):
+        return dict(
+            db.query(User.place, func.count(model.id))
+            .join(model, model.asha_worker_id == User.id)
+            .filter(*criteria)
+            .group_by(User.place)
+            .all()
+        )
+    
+    surveys = counts(FamilySurvey)
+    pregnancies = counts(PregnancyReport)
+    # Archived pregnancies ended long ago, so high-risk counts need only hot rows
+    high_risk = counts(PregnancyReport, PregnancyReport.risk_score >= HIGH_RISK_SCORE)
+    vaccinations = counts(ChildVaccination)
+    # Archived rows count too, as on the dashboard
+    archived = Counter({
+        (place, table_name): count for place, table_name, count in
+        db.query(User.place, ArchivedRecord.table_name, func.count(ArchivedRecord.id))
+        .join(ArchivedRecord, ArchivedRecord.asha_worker_id == User.id)
+        .group_by(User.place, ArchivedRecord.table_name)
+        .all()
+    })
+    return [
+        {
+            "place": place,
+            "workers": workers,
+            "family_surveys": surveys.get(place, 0),
+            "pregnancy_reports": pregnancies.get(place, 0) + archived[place, "pregnancy_reports"],
+            "high_risk_pregnancies": high_risk.get(place, 0),
+            "child_vaccinations": vaccinations.get(place, 0) + archived[place, "child_vaccinations"],
+        }
+        for place, workers in db.query(User.place, func.count(User.id)).group_by(User.place).all()
+    ]
+
+@api_router.get("/admin/places", response_model=List[PlaceSummary])
+async def get_place_summaries(
+    place: Optional[List[str]] = Query(None),
+    admin: User = Depends(get_admin_user)
+):
+    """Scatter-gather across shards; `place` narrows the query to the shards holding those places."""
+    shards = sorted({shard_router.shard_for_place(name) for name in place}) if place else None
+    wanted = {normalize_place(name) for name in place or []}
+    results = await run_in_threadpool(shard_router.scatter, summarise_places, shards)
+    return sorted(
+        (
+            PlaceSummary(shard=shard, **summary)
+            for shard, summaries in results.items()
+            for summary in summaries
+            if not wanted or normalize_place(summary["place"]) in wanted
+        ),
+        key=lambda summary: summary.place
+    )
+
 # Include router in app
+unbudgeted = sorted(
+    (method, route.path) for route in api_router.routes for method in route.methods
+    if (method, route.path) not in QUERY_BUDGETS
+)
+if unbudgeted:
+    raise RuntimeError(f"Routes without a query budget in QUERY_BUDGETS: {unbudgeted}")
 app.include_router(api_router)
 
+# Tags queries with their route and profiles requests when an admin sends
+# X-Profile: 1 (or true/yes/on), or for a PROFILE_SAMPLE_RATE fraction of all requests.
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    current_route.set(f"{request.method} {request.url.path}")
+    sampled = PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE
+    requested = request.headers.get("x-profile", "").strip().lower() in ("1", "true", "yes", "on")
+    if not sampled and not (requested and token_subject(request) in ADMIN_USERNAMES):
+        return await call_next(request)
+    
+    sampler = StackSampler(PROFILE_INTERVAL_SECONDS)
+    active_profile.set(sampler)
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        response = await call_next(request)
+    finally:
+        collapsed = sampler.stop()
+        profile_id = str(uuid.uuid4())
+        recent_profiles.append({
+            "id": profile_id,
+            "route": current_route.get(),
+            "user": token_subject(request),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "samples": sum(sampler.counts.values()),
+            "created_at": datetime.utcnow(),
+            "collapsed": collapsed,
+        })
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+# Meters each request's queries against its route's QueryBudget
+@app.middleware("http")
+async def meter_queries(request: Request, call_next):
+    if not QUERY_STATS_HEADER:
+        return await call_next(request)
+    usage = QueryUsage()
+    query_usage.set(usage)
+    response = await call_next(request)
+    route = request.scope.get("route")
+    budget = QUERY_BUDGETS.get((request.method, getattr(route, "path", None)))
+    if budget is None:
+        return response
+    
+    shards = len(shard_router.names) if budget.per_shard else 1
+    statement_budget = int(budget.statements * shards + budget.per_item * usage.items)
+    row_budget = None if budget.rows is None else budget.rows * shards
+    if usage.statements > statement_budget or (row_budget is not None and usage.rows > row_budget):
+        logger.warning(
+            "Query budget exceeded on %s %s: %d statements (budget %d), %d rows (budget %s)",
+            request.method, route.path, usage.statements, statement_budget, usage.rows, row_budget
+        )
+    response.headers["X-Query-Stats"] = (
+        f"statements={usage.statements}/{statement_budget}, "
+        f"rows={usage.rows}/{'*' if row_budget is None else row_budget}"
+    )
+    return response
+
+# Remember who just wrote so get_read_db keeps them on the primary and
+# cached reads are recomputed
+@app.middleware("http")
+async def track_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        username = token_subject(request)
+        if username is not None:
+            note_write(username)
+            request_coalescer.invalidate(username)
+    return response
+
+# Admission control runs before the body is read, so oversized or excess
+# requests are shed without parsing, hashing or touching the database.
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    route_key = (request.method, request.url.path)
+    policy = ADMISSION_POLICIES.get(route_key)
+    if policy is None:
+        return await call_next(request)
+    
+    content_length = request.headers.get("content-length")
+    if policy.max_body_bytes and content_length:
+        try:
+            body_bytes = int(content_length)
+        except ValueError:
+            return JSONResponse(status_code=400, content={"detail": "Invalid Content-Length"})
+        if body_bytes > policy.max_body_bytes:
+            return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    if policy.max_body_bytes:
+        # For read_body, which also holds bodies sent without a Content-Length to it
+        request.scope["max_body_bytes"] = policy.max_body_bytes
+    
+    retry_after = rate_limit_store.take(f"ip:{route_key[1]}:{client_ip(request)}", policy.ip_rate, policy.ip_burst)
+    if retry_after:
+        return too_many_requests(retry_after)
+    
+    # Login users are limited in the handler, once the username is parsed
+    username = token_subject(request)
+    if username is not None:
+        retry_after = rate_limit_store.take(f"user:{route_key[1]}:{username}", policy.user_rate, policy.user_burst)
+        if retry_after:
+            return too_many_requests(retry_after)
+    
+    if in_flight[route_key] >= policy.max_concurrency:
+        return too_many_requests(1, "Server busy, retry shortly")
+    in_flight[route_key] += 1
+    try:
+        return await call_next(request)
+    finally:
+        in_flight[route_key] -= 1
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -603,13 +3866,154 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request logging
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    request_user_var.set(token_subject(request))
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        access_logger.info(
+            "%s %s %s", request.method, request.url.path, status_code,
+            extra={
+                "route": f"{request.method} {request.url.path}",
+                "status": status_code,
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            },
+        )
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Request paths only enqueue records; a listener thread formats them as JSON
+# and does the blocking write.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_INFO_SAMPLE_RATE = float(os.environ.get('LOG_INFO_SAMPLE_RATE', 1.0))
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_user_var: ContextVar[Optional[str]] = ContextVar("request_user", default=None)
+
+class RequestContextFilter(logging.Filter):
+    """Attach request context and sample INFO-and-below records."""
+
+    def filter(self, record):
+        if record.levelno <= logging.INFO and LOG_INFO_SAMPLE_RATE < 1 and random.random() >= LOG_INFO_SAMPLE_RATE:
+            return False
+        record.request_id = request_id_var.get()
+        record.user = request_user_var.get()
+        if not hasattr(record, "route"):
+            record.route = current_route.get()
+        return True
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: records are dropped when the queue is full."""
+
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+    def prepare(self, record):
+        # Resolve message and traceback now, while the arguments are still valid
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+class JSONFormatter(logging.Formatter):
+    FIELDS = ("request_id", "user", "route", "status", "duration_ms")
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+def route_uvicorn_logs():
+    """Send uvicorn's own loggers through the root queue handler.
+
+    uvicorn configures them with synchronous stdout handlers before the app
+    is imported. Its plain-text access log is dropped: log_requests already
+    writes a JSON access record, and with no handler left uvicorn skips
+    formatting access lines altogether.
+    """
+    for name in ("uvicorn", "uvicorn.error"):
+        logging.getLogger(name).handlers = []
+        logging.getLogger(name).propagate = True
+    access = logging.getLogger("uvicorn.access")
+    access.handlers = []
+    access.propagate = False
+
+def configure_logging():
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(LOG_LEVEL)
+    route_uvicorn_logs()
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger(f"{__name__}.access")
+
+@app.on_event("startup")
+def start_job_runner():
+    for runner in job_runners.values():
+        runner.start()
+
+@app.on_event("shutdown")
+def stop_job_runner():
+    for runner in job_runners.values():
+        runner.stop()
+
+# Batch jobs runnable from cron, e.g. `python server.py score-pregnancies`
+MAINTENANCE_JOBS = {
+    "create-partitions": lambda db: ensure_partitions(db.get_bind()),
+    "archive-partitions": lambda db: archive_partitions(db.get_bind()),
+    "prune-jobs": prune_jobs,
+    "link-beneficiaries": link_beneficiaries,
+    "refresh-immunisation": refresh_immunisation_schedules,
+    "score-pregnancies": score_open_pregnancies,
+    "compact-audit-log": compact_audit_log,
+    "reconcile-rollups": reconcile_rollups,
+    "protect-aadhaar": protect_aadhaar,
+    "archive-cold-records": archive_cold_records,
+}
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] in MAINTENANCE_JOBS:
+        for shard in shard_router.names:
+            with shard_router.session(shard) as db:
+                logger.info("%s [%s]: %s", sys.argv[1], shard, MAINTENANCE_JOBS[sys.argv[1]](db))
+    else:
+        import uvicorn
+        # Logging is already configured above; keep uvicorn from adding its own handlers
+        uvicorn.run(app, host="0.0.0.0", port=8001, log_config=None, access_log=False)
\ No newline at end of file
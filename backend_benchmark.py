@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+AASHAKIRANA Backend Micro-benchmarks
+Runs in-process against the FastAPI app; uses a throwaway SQLite database
+unless DATABASE_URL is set.
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/benchmark.db")
+os.environ.setdefault('JWT_SECRET_KEY', uuid.uuid4().hex)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+import server  # noqa: E402
+
+
+def timed(func, iterations):
+    """Return mean nanoseconds per call"""
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def bench_rate_limiter(iterations=200000):
+    """Cost of the admission-control checks added to login and sync"""
+    store = server.TokenBucketStore()
+    policy = server.ADMISSION_POLICIES[("POST", "/api/sync")]
+    token = server.create_access_token({"sub": "benchuser"})
+
+    class FakeRequest:
+        headers = {"authorization": f"Bearer {token}"}
+
+        def __init__(self):
+            # A fresh scope per request, so the token is decoded rather than read from its cache
+            self.scope = {}
+
+    hot_key = timed(lambda: store.take("ip:/api/sync:10.0.0.1", 1e9, 10**9), iterations)
+    keys = [f"ip:/api/sync:10.0.{i // 256}.{i % 256}" for i in range(iterations)]
+    key_iter = iter(keys)
+    new_keys = timed(lambda: store.take(next(key_iter), policy.ip_rate, policy.ip_burst), iterations)
+    subject = timed(lambda: server.token_subject(FakeRequest()), iterations // 10)
+
+    print("Rate limiter")
+    print(f"  token bucket, existing key: {hot_key:8.0f} ns/op")
+    print(f"  token bucket, new key:      {new_keys:8.0f} ns/op")
+    print(f"  bearer token subject:       {subject:8.0f} ns/op")
+
+
+def bench_profiling_hooks(iterations=200000):
+    """Per-query cost of the slow-query timer when nothing is slow"""
+
+    class FakeConnection:
+        info = {}
+
+    conn = FakeConnection()
+
+    def hooks():
+        server.start_query_timer(conn, None, "SELECT 1", (), None, False)
+        server.log_slow_query(conn, None, "SELECT 1", (), None, False)
+
+    print("Profiling hooks (profiling disabled)")
+    print(f"  slow-query timer per query: {timed(hooks, iterations):8.0f} ns/op")
+
+
+def bench_payload_encoding(records=500, iterations=50):
+    """Bytes on the wire and encode CPU for the list/sync payload encodings"""
+    now = server.datetime.utcnow()
+    reports = [
+        server.PregnancyReportResponse(
+            id=str(uuid.uuid4()),
+            lmp=now - server.timedelta(days=120 + i % 90),
+            edd=now + server.timedelta(days=160 - i % 90),
+            gravida=1 + i % 4,
+            para=i % 3,
+            anc_checkups=("completed", "pending", "scheduled")[i % 3],
+            risk_factors="highRisk" if i % 7 == 0 else "normalRisk",
+            patient_name=f"Patient {i}",
+            patient_phone=f"98{i:08d}",
+            gestational_age_weeks=18 + i % 20,
+            missed_anc_visits=i % 3,
+            risk_score=i % 12,
+            created_at=now,
+            synced=True
+        ) for i in range(records)
+    ]
+    schema = server.List[server.PregnancyReportResponse]
+    compressor = server.zstandard.ZstdCompressor(level=server.ZSTD_LEVEL) if server.zstandard else None
+    media_types = ["application/json"]
+    if server.msgpack:
+        media_types.append(server.MSGPACK_TYPES[0])
+    if server.cbor2:
+        media_types.append(server.CBOR_TYPE)
+
+    print(f"Payload encoding ({records} pregnancy reports)")
+    baseline = None
+    for media_type in media_types:
+        body = server.encode_payload(reports, schema, media_type)
+        cost = timed(lambda: server.encode_payload(reports, schema, media_type), iterations)
+        baseline = baseline or (len(body), cost)
+        print(f"  {media_type:26s} {len(body):8d} bytes ({len(body) / baseline[0]:4.0%}), "
+              f"{cost / 1e6:6.2f} ms encode ({cost / baseline[1]:4.0%})")
+        if compressor is not None:
+            packed = compressor.compress(body)
+            zcost = timed(lambda: compressor.compress(server.encode_payload(reports, schema, media_type)), iterations)
+            print(f"  {media_type + ' +zstd':26s} {len(packed):8d} bytes ({len(packed) / baseline[0]:4.0%}), "
+                  f"{zcost / 1e6:6.2f} ms encode ({zcost / baseline[1]:4.0%})")
+
+
+def start_server():
+    """Serve the app with uvicorn on a free local port; return its base URL"""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, port=port, log_level="warning"))
+    threading.Thread(target=uvicorn_server.run, daemon=True).start()
+    while not uvicorn_server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/api"
+
+
+def register_worker(api_base):
+    """Create a worker and return auth headers"""
+    suffix = uuid.uuid4().hex[:8]
+    user = requests.post(f"{api_base}/register", json={
+        "name": f"Bench {suffix}",
+        "phone_number": f"9{suffix}",
+        "place": "Bangalore Rural",
+        "aadhaar_number": f"B{suffix}",
+        "password": "BenchPass123"
+    }).json()
+    token = requests.post(f"{api_base}/login", json={
+        "username": user["username"], "password": "BenchPass123"
+    }).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+class QueryCounter:
+    """Counts SQL statements executed on the primary engine"""
+
+    def __init__(self):
+        self.count = 0
+        server.event.listen(server.engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def bench_request_coalescing(api_base, headers, burst=50, rounds=5):
+    """DB statements under bursts of identical dashboard and alerts requests
+
+    Totals include the per-request user lookup done by get_current_user.
+    """
+    counter = QueryCounter()
+    paths = ["/dashboard", "/alerts"]
+
+    def fire():
+        with ThreadPoolExecutor(max_workers=burst) as pool:
+            for _ in range(rounds):
+                list(pool.map(
+                    lambda i: requests.get(f"{api_base}{paths[i % 2]}", headers=headers).status_code,
+                    range(burst)
+                ))
+
+    print(f"Request coalescing ({rounds} bursts of {burst} identical requests)")
+    for enabled in (False, True):
+        server.request_coalescer.enabled = enabled
+        server.request_coalescer.invalidate(server.jwt.decode(
+            headers["Authorization"].split()[1], server.JWT_SECRET_KEY, algorithms=[server.JWT_ALGORITHM]
+        )["sub"])
+        counter.count = 0
+        start = time.perf_counter()
+        fire()
+        elapsed = time.perf_counter() - start
+        label = "coalesced" if enabled else "uncoalesced"
+        print(f"  {label:12s} {counter.count:6d} SQL statements, {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    bench_rate_limiter()
+    bench_profiling_hooks()
+    bench_payload_encoding()
+    api_base = start_server()
+    bench_request_coalescing(api_base, register_worker(api_base))
@@ -6,6 +6,7 @@ Tests all backend endpoints including authentication, healthcare forms, and data
 
 import requests
 import json
+import msgpack
 import uuid
 from datetime import datetime, timedelta
 import os
@@ -17,6 +18,8 @@ load_dotenv('/app/frontend/.env')
 # Configuration
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://ashakirana-pwa.preview.emergentagent.com')
 API_BASE = f"{BASE_URL}/api"
+# Records of each form type synced before re-reading every endpoint against its query budget
+QUERY_BUDGET_SEED_RECORDS = int(os.environ.get('QUERY_BUDGET_SEED_RECORDS', 200))
 
 class BackendTester:
     def __init__(self):
@@ -30,6 +33,10 @@ class BackendTester:
             "password": "SecurePass123"
         }
         self.test_results = []
+        # Query budget usage reported by the server (X-Query-Stats) for every request made
+        self.query_budget_violations = {}
+        self.query_stats_seen = 0
+        self.session.hooks["response"].append(self.check_query_budget)
         
     def log_result(self, test_name, success, message, details=None):
         """Log test results"""
@@ -45,6 +52,19 @@ class BackendTester:
         if details and not success:
             print(f"   Details: {details}")
     
+    def check_query_budget(self, response, *args, **kwargs):
+        """Response hook recording requests that went over their query budget"""
+        header = response.headers.get("X-Query-Stats")
+        if not header:
+            return
+        self.query_stats_seen += 1
+        for part in header.split(","):
+            name, usage = part.strip().split("=")
+            used, budget = usage.split("/")
+            if budget != "*" and int(used) > int(budget):
+                route = f"{response.request.method} {response.request.path_url.split('?')[0]}"
+                self.query_budget_violations.setdefault(route, []).append(f"{name} {used} > {budget}")
+    
     def test_database_connectivity(self):
         """Test if backend server is running and database is accessible"""
         try:
@@ -90,6 +110,35 @@ class BackendTester:
             self.log_result("User Registration", False, f"Request failed: {str(e)}")
             return False
     
+    def test_duplicate_registration(self):
+        """Test that a reused phone or Aadhaar number is rejected"""
+        try:
+            aadhaar = self.test_user_data['aadhaar_number']
+            duplicates = {
+                "Phone number already registered": {
+                    **self.test_user_data, "aadhaar_number": f"5678{str(uuid.uuid4())[:8]}"
+                },
+                "Aadhaar number already registered": {
+                    **self.test_user_data, "phone_number": f"8765432{str(uuid.uuid4())[:3]}",
+                    "aadhaar_number": f"{aadhaar[:4]} {aadhaar[4:8]} {aadhaar[8:]}"
+                },
+            }
+            for expected, payload in duplicates.items():
+                response = self.session.post(f"{API_BASE}/register", json=payload, timeout=10)
+                if response.status_code != 400 or response.json().get('detail') != expected:
+                    self.log_result("Duplicate Registration", False, 
+                                  f"Expected 400 '{expected}', got {response.status_code}", 
+                                  response.text)
+                    return False
+            
+            self.log_result("Duplicate Registration", True, 
+                          "Reused phone and Aadhaar numbers rejected")
+            return True
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Duplicate Registration", False, f"Request failed: {str(e)}")
+            return False
+    
     def test_user_login(self):
         """Test user login and JWT token validation"""
         try:
@@ -264,6 +313,37 @@ class BackendTester:
             self.log_result("Pregnancy Report Retrieval", False, f"Request failed: {str(e)}")
             return False
     
+    def test_pregnancy_reports_with_archive(self):
+        """Test retrieving pregnancy reports including archived ones"""
+        try:
+            hot = self.session.get(f"{API_BASE}/pregnancy-reports", timeout=10)
+            response = self.session.get(
+                f"{API_BASE}/pregnancy-reports",
+                params={"include_archived": "true"},
+                timeout=30
+            )
+            
+            if response.status_code == 200 and hot.status_code == 200:
+                hot_ids = {report['id'] for report in hot.json()}
+                all_ids = {report['id'] for report in response.json()}
+                if hot_ids <= all_ids:
+                    self.log_result("Pregnancy Reports With Archive", True, 
+                                  f"Retrieved {len(all_ids)} reports, {len(all_ids - hot_ids)} from the archive")
+                    return True
+                else:
+                    self.log_result("Pregnancy Reports With Archive", False, 
+                                  "Archived listing is missing hot reports", sorted(hot_ids - all_ids))
+                    return False
+            else:
+                self.log_result("Pregnancy Reports With Archive", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Pregnancy Reports With Archive", False, f"Request failed: {str(e)}")
+            return False
+    
     def test_child_vaccination_creation(self):
         """Test creating child vaccination record"""
         try:
@@ -487,6 +567,397 @@ class BackendTester:
             self.log_result("Sync Endpoint", False, f"Request failed: {str(e)}")
             return False
     
+    def test_patient_search(self):
+        """Test fuzzy patient search across record types"""
+        try:
+            response = self.session.get(
+                f"{API_BASE}/search",
+                params={"q": "Meera"},
+                timeout=10
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, list) and all('record_type' in r and 'score' in r for r in data):
+                    self.log_result("Patient Search", True, 
+                                  f"Search returned {len(data)} matches")
+                    return True
+                else:
+                    self.log_result("Patient Search", False, 
+                                  "Unexpected response format", data)
+                    return False
+            else:
+                self.log_result("Patient Search", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Patient Search", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_beneficiary_linking(self):
+        """Test linking records to beneficiaries"""
+        try:
+            response = self.session.post(f"{API_BASE}/beneficiaries/link", timeout=30)
+            
+            if response.status_code == 200:
+                data = response.json()
+                if 'linked' in data and 'created' in data:
+                    self.log_result("Beneficiary Linking", True, 
+                                  f"Linked {data['linked']} records, created {data['created']} beneficiaries")
+                    return True
+                else:
+                    self.log_result("Beneficiary Linking", False, 
+                                  "Unexpected response format", data)
+                    return False
+            else:
+                self.log_result("Beneficiary Linking", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Beneficiary Linking", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_due_vaccinations(self):
+        """Test server-derived due vaccination list"""
+        try:
+            response = self.session.get(f"{API_BASE}/child-vaccinations/due", timeout=10)
+            
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, list) and all('next_due' in v and 'missed_doses' in v for v in data):
+                    self.log_result("Due Vaccinations", True, 
+                                  f"{len(data)} children due this week")
+                    return True
+                else:
+                    self.log_result("Due Vaccinations", False, 
+                                  "Unexpected response format", data)
+                    return False
+            else:
+                self.log_result("Due Vaccinations", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Due Vaccinations", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_high_risk_pregnancies(self):
+        """Test that only pregnancies scored high-risk are listed, highest first"""
+        try:
+            lmp_date = datetime.now() - timedelta(weeks=37)
+            created = {}
+            for label, risk_factors, anc_checkups in (
+                ("high", "Anaemia, Previous C-section, Hypertension", "completed"),
+                ("low", "None", "pending"),
+            ):
+                response = self.session.post(
+                    f"{API_BASE}/pregnancy-reports",
+                    json={
+                        "lmp": lmp_date.isoformat(),
+                        "edd": (lmp_date + timedelta(days=280)).isoformat(),
+                        "gravida": 2,
+                        "para": 1,
+                        "anc_checkups": anc_checkups,
+                        "risk_factors": risk_factors,
+                        "patient_name": f"Risk {label} {uuid.uuid4().hex[:6]}",
+                        "patient_phone": "9876543210"
+                    },
+                    timeout=10
+                )
+                if response.status_code != 200:
+                    self.log_result("High Risk Pregnancies", False, 
+                                  f"Creation failed with status {response.status_code}", response.text)
+                    return False
+                created[label] = response.json()['id']
+            
+            # Score now rather than waiting for the job queue
+            self.session.post(f"{API_BASE}/pregnancy-reports/score", timeout=30)
+            response = self.session.get(f"{API_BASE}/pregnancy-reports/high-risk", timeout=10)
+            
+            if response.status_code == 200:
+                data = response.json()
+                ids = [r['id'] for r in data]
+                scores = [r['risk_score'] for r in data]
+                if (created['high'] in ids and created['low'] not in ids
+                        and all(score >= 8 for score in scores) and scores == sorted(scores, reverse=True)):
+                    self.log_result("High Risk Pregnancies", True, 
+                                  f"Retrieved {len(data)} high-risk pregnancies")
+                    return True
+                else:
+                    self.log_result("High Risk Pregnancies", False, 
+                                  "High-risk list does not match the scores",
+                                  {"created": created, "listed": list(zip(ids, scores))})
+                    return False
+            else:
+                self.log_result("High Risk Pregnancies", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("High Risk Pregnancies", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_job_stats(self):
+        """Test background job queue statistics (admins only)"""
+        try:
+            response = self.session.get(f"{API_BASE}/jobs/stats", timeout=10)
+            
+            if response.status_code == 403:
+                self.log_result("Job Stats", True, 
+                              "Queue statistics restricted to admins")
+                return True
+            elif response.status_code == 200:
+                data = response.json()
+                if 'queue_depth' in data and 'avg_latency_seconds' in data:
+                    self.log_result("Job Stats", True, 
+                                  f"Queue depth: {data['queue_depth']}")
+                    return True
+                else:
+                    self.log_result("Job Stats", False, 
+                                  "Unexpected response format", data)
+                    return False
+            else:
+                self.log_result("Job Stats", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Job Stats", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_msgpack_sync_and_retrieval(self):
+        """Test MessagePack sync upload and list retrieval"""
+        try:
+            household_id = f"MSGPACK_HH_{uuid.uuid4().hex[:8]}"
+            sync_data = {
+                "family_surveys": [
+                    {
+                        "household_id": household_id,
+                        "members_list": json.dumps([{"name": "Packed Family", "age": 28}]),
+                        "sanitation": "Basic facility",
+                        "chronic_illnesses": "None"
+                    }
+                ]
+            }
+            
+            response = self.session.post(
+                f"{API_BASE}/sync",
+                data=msgpack.packb(sync_data),
+                headers={"Content-Type": "application/msgpack"},
+                timeout=10
+            )
+            if response.status_code != 200:
+                self.log_result("MessagePack Sync", False, 
+                              f"Sync failed with status {response.status_code}", 
+                              response.text)
+                return False
+            
+            response = self.session.get(
+                f"{API_BASE}/family-surveys",
+                headers={"Accept": "application/msgpack"},
+                timeout=10
+            )
+            
+            if response.status_code == 200 and response.headers.get('content-type', '').startswith('application/msgpack'):
+                surveys = msgpack.unpackb(response.content, timestamp=3)
+                if any(survey['household_id'] == household_id for survey in surveys):
+                    self.log_result("MessagePack Sync", True, 
+                                  f"Round-tripped {len(surveys)} surveys as MessagePack")
+                    return True
+                else:
+                    self.log_result("MessagePack Sync", False, 
+                                  "Synced survey missing from MessagePack listing")
+                    return False
+            else:
+                self.log_result("MessagePack Sync", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("MessagePack Sync", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_household_resurvey(self):
+        """Test household upsert, versioning and history"""
+        try:
+            survey = {
+                "household_id": f"RESURVEY_HH_{uuid.uuid4().hex[:8]}",
+                "members_list": json.dumps([{"name": "Lakshmi", "age": 32}]),
+                "sanitation": "Open defecation",
+                "chronic_illnesses": "None"
+            }
+            first = self.session.post(f"{API_BASE}/family-surveys", json=survey, timeout=10)
+            second = self.session.post(
+                f"{API_BASE}/family-surveys",
+                json={**survey, "sanitation": "Household toilet"},
+                timeout=10
+            )
+            if first.status_code != 200 or second.status_code != 200:
+                self.log_result("Household Resurvey", False, 
+                              f"Survey failed with status {first.status_code}/{second.status_code}", 
+                              second.text)
+                return False
+            
+            current = self.session.get(f"{API_BASE}/family-surveys/households/{survey['household_id']}", timeout=10)
+            history = self.session.get(f"{API_BASE}/family-surveys/households/{survey['household_id']}/history", timeout=10)
+            
+            if current.status_code == 200 and history.status_code == 200:
+                data = current.json()
+                versions = history.json()
+                if (data['version'] == 2 and data['id'] == first.json()['id'] and len(versions) == 2
+                        and versions[1]['changes'] == {"sanitation": ["Open defecation", "Household toilet"]}):
+                    self.log_result("Household Resurvey", True, 
+                                  f"Household at version {data['version']} with {len(versions)} history entries")
+                    return True
+                else:
+                    self.log_result("Household Resurvey", False, 
+                                  "Unexpected versioning", {"current": data, "history": versions})
+                    return False
+            else:
+                self.log_result("Household Resurvey", False, 
+                              f"Failed with status {current.status_code}/{history.status_code}", 
+                              history.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Household Resurvey", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_bootstrap_snapshot(self):
+        """Test device bootstrap snapshot"""
+        try:
+            response = self.session.get(
+                f"{API_BASE}/bootstrap",
+                headers={"Accept-Encoding": "gzip"},
+                timeout=30
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                expected = ['watermark', 'family_surveys', 'pregnancy_reports', 'child_vaccinations',
+                            'postnatal_care', 'leprosy_reports', 'alerts']
+                if all(field in data for field in expected):
+                    revalidated = self.session.get(
+                        f"{API_BASE}/bootstrap",
+                        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers.get('ETag', '')},
+                        timeout=30
+                    )
+                    self.log_result("Bootstrap Snapshot", revalidated.status_code == 304, 
+                                  f"Snapshot with {len(data['family_surveys'])} surveys, "
+                                  f"{len(data['pregnancy_reports'])} pregnancies; revalidation {revalidated.status_code}")
+                    return revalidated.status_code == 304
+                else:
+                    self.log_result("Bootstrap Snapshot", False, 
+                                  "Missing fields in snapshot", list(data))
+                    return False
+            else:
+                self.log_result("Bootstrap Snapshot", False, 
+                              f"Failed with status {response.status_code}", 
+                              response.text)
+                return False
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Bootstrap Snapshot", False, f"Request failed: {str(e)}")
+            return False
+    
+    def test_query_budgets(self):
+        """Test every endpoint hit in this run stayed within its query budget on seeded data"""
+        try:
+            now = datetime.now()
+            seed = QUERY_BUDGET_SEED_RECORDS
+            sync_data = {
+                "family_surveys": [{
+                    "household_id": f"BUDGET_HH_{i}_{uuid.uuid4().hex[:6]}",
+                    "members_list": json.dumps([{"name": f"Member {i}", "age": 20 + i % 50}]),
+                    "sanitation": "Basic facility",
+                    "chronic_illnesses": "None"
+                } for i in range(seed)],
+                "pregnancy_reports": [{
+                    "lmp": (now - timedelta(days=60 + i % 200)).isoformat(),
+                    "edd": (now + timedelta(days=220 - i % 200)).isoformat(),
+                    "gravida": 1 + i % 4,
+                    "para": i % 3,
+                    "anc_checkups": json.dumps([]),
+                    "risk_factors": "highRisk" if i % 7 == 0 else "normalRisk",
+                    "patient_name": f"Budget Patient {i}",
+                    "patient_phone": f"98{i:08d}"
+                } for i in range(seed)],
+                "child_vaccinations": [{
+                    "child_name": f"Budget Child {i}",
+                    "child_dob": (now - timedelta(days=30 + i)).isoformat(),
+                    "vaccine_schedule": json.dumps([{"vaccine": "BCG", "status": "completed"}]),
+                    "missed_doses": "None",
+                    "next_due": (now + timedelta(days=i % 60)).isoformat(),
+                    "parent_name": f"Budget Patient {i}",
+                    "parent_phone": f"98{i:08d}"
+                } for i in range(seed)],
+                "postnatal_care": [{
+                    "pnc_visits": json.dumps([]),
+                    "mother_health": "Stable",
+                    "baby_health": "Healthy",
+                    "counselling": "Breastfeeding",
+                    "mother_name": f"Budget Patient {i}",
+                    "delivery_date": (now - timedelta(days=i % 40)).isoformat()
+                } for i in range(seed)],
+                "leprosy_reports": [{
+                    "patient_name": f"Budget Leprosy {i}",
+                    "leprosy_type": "Paucibacillary",
+                    "treatment": "MDT",
+                    "follow_ups": json.dumps([]),
+                    "household_contacts": "2"
+                } for i in range(seed)],
+            }
+            response = self.session.post(f"{API_BASE}/sync", json=sync_data, timeout=120)
+            if response.status_code != 200:
+                self.log_result("Query Budgets", False, 
+                              f"Seeding failed with status {response.status_code}", 
+                              response.text)
+                return False
+            
+            household_id = sync_data["family_surveys"][0]["household_id"]
+            self.session.post(f"{API_BASE}/beneficiaries/link", timeout=60)
+            for path, params in [
+                ("/dashboard", None),
+                ("/family-surveys", None),
+                (f"/family-surveys/households/{household_id}", None),
+                (f"/family-surveys/households/{household_id}/history", None),
+                ("/pregnancy-reports", None),
+                ("/pregnancy-reports", {"include_archived": "true"}),
+                ("/pregnancy-reports/high-risk", None),
+                ("/child-vaccinations/due", None),
+                ("/alerts", None),
+                ("/search", {"q": "Budget Patient 1"}),
+                ("/bootstrap", None),
+                ("/jobs/stats", None),
+            ]:
+                self.session.get(f"{API_BASE}{path}", params=params, timeout=60)
+            
+            if not self.query_stats_seen:
+                self.log_result("Query Budgets", False, 
+                              "Server did not report X-Query-Stats; start it with QUERY_STATS_HEADER=1")
+                return False
+            if self.query_budget_violations:
+                self.log_result("Query Budgets", False, 
+                              f"{len(self.query_budget_violations)} endpoints over budget", 
+                              self.query_budget_violations)
+                return False
+            
+            self.log_result("Query Budgets", True, 
+                          f"{self.query_stats_seen} requests within budget with {seed} seeded records per form")
+            return True
+                
+        except requests.exceptions.RequestException as e:
+            self.log_result("Query Budgets", False, f"Request failed: {str(e)}")
+            return False
+    
     def run_all_tests(self):
         """Run all backend tests in sequence"""
         print("=" * 60)
@@ -499,17 +970,28 @@ class BackendTester:
         tests = [
             self.test_database_connectivity,
             self.test_user_registration,
+            self.test_duplicate_registration,
             self.test_user_login,
             self.test_family_survey_creation,
             self.test_family_survey_retrieval,
             self.test_pregnancy_report_creation,
             self.test_pregnancy_report_retrieval,
+            self.test_pregnancy_reports_with_archive,
             self.test_child_vaccination_creation,
             self.test_postnatal_care_creation,
             self.test_leprosy_report_creation,
             self.test_dashboard_stats,
             self.test_alerts_retrieval,
-            self.test_sync_endpoint
+            self.test_sync_endpoint,
+            self.test_patient_search,
+            self.test_beneficiary_linking,
+            self.test_due_vaccinations,
+            self.test_high_risk_pregnancies,
+            self.test_job_stats,
+            self.test_msgpack_sync_and_retrieval,
+            self.test_household_resurvey,
+            self.test_bootstrap_snapshot,
+            self.test_query_budgets
         ]
         
         passed = 0
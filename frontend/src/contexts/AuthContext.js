@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, useEffect } from 'react';
 import { authAPI } from '../services/api';
+import { syncManager } from '../services/syncManager';
 
 const AuthContext = createContext({});
 
@@ -44,6 +45,11 @@ export const AuthProvider = ({ children }) => {
       localStorage.setItem('token', access_token);
       localStorage.setItem('user', JSON.stringify(userData));
 
+      // New or reset device: restore offline data in the background
+      if (navigator.onLine) {
+        syncManager.restoreFromServer();
+      }
+
       return { success: true, user: userData };
     } catch (error) {
       console.error('Login error:', error);
@@ -75,6 +81,7 @@ export const AuthProvider = ({ children }) => {
     // Clear localStorage
     localStorage.removeItem('token');
     localStorage.removeItem('user');
+    localStorage.removeItem('syncWatermark');
   };
 
   const value = {
@@ -15,11 +15,15 @@ import {
   AppBar,
   Toolbar,
   Alert,
+  Badge,
+  Button,
 } from '@mui/material';
 import {
   ArrowBack as ArrowBackIcon,
+  Notifications as NotificationsIcon,
   NotificationsActive,
   CheckCircle,
+  DoneAll,
   Warning,
   Info,
 } from '@mui/icons-material';
@@ -33,12 +37,25 @@ const Alerts = () => {
   const navigate = useNavigate();
 
   const [alerts, setAlerts] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
     fetchAlerts();
   }, [isOnline]);
 
+  // New alerts and unread counts are pushed by the server instead of re-fetching the list
+  useEffect(() => {
+    if (!isOnline) {
+      setUnreadCount(null);
+      return undefined;
+    }
+    return alertsAPI.subscribe({
+      onAlert: (alert) => setAlerts((current) => [alert, ...current.filter((a) => a.id !== alert.id)]),
+      onUnreadCount: setUnreadCount,
+    });
+  }, [isOnline]);
+
   const fetchAlerts = async () => {
     try {
       if (isOnline) {
@@ -55,22 +72,38 @@ const Alerts = () => {
     }
   };
 
-  const markAsRead = async (alertId) => {
+  // One bulk request however many alerts are marked; the stream updates the unread count
+  const markAsRead = async (alertIds) => {
     try {
       if (isOnline) {
-        await alertsAPI.markAlertRead(alertId);
+        await alertsAPI.markAlertsRead(alertIds);
       } else {
-        await offlineStorage.markAlertRead(alertId);
+        await Promise.all(alertIds.map((alertId) => offlineStorage.markAlertRead(alertId)));
       }
       
-      setAlerts(alerts.map(alert => 
-        alert.id === alertId ? { ...alert, is_read: true } : alert
+      setAlerts((current) => current.map(alert => 
+        alertIds.includes(alert.id) ? { ...alert, is_read: true } : alert
       ));
     } catch (error) {
       console.error('Error marking alert as read:', error);
     }
   };
 
+  const markAllAsRead = async () => {
+    if (!isOnline) {
+      await markAsRead(alerts.filter((alert) => !alert.is_read).map((alert) => alert.id));
+      return;
+    }
+    try {
+      await alertsAPI.markAllAlertsRead();
+      setAlerts((current) => current.map((alert) => ({ ...alert, is_read: true })));
+    } catch (error) {
+      console.error('Error marking alerts as read:', error);
+    }
+  };
+
+  const unread = unreadCount ?? alerts.filter((alert) => !alert.is_read).length;
+
   const getAlertIcon = (type) => {
     switch (type) {
       case 'anc':
@@ -104,14 +137,24 @@ const Alerts = () => {
           <IconButton edge="start" color="inherit" onClick={() => navigate('/')}>
             <ArrowBackIcon />
           </IconButton>
-          <Typography variant="h6">{t('alerts.title')}</Typography>
+          <Typography variant="h6" sx={{ flexGrow: 1 }}>{t('alerts.title')}</Typography>
+          <Badge badgeContent={unread} color="error">
+            <NotificationsIcon />
+          </Badge>
         </Toolbar>
       </AppBar>
 
       <Container maxWidth="md" sx={{ mt: 4, mb: 4 }}>
-        <Typography variant="h4" gutterBottom>
-          {t('alerts.title')}
-        </Typography>
+        <Box sx={{ display: 'flex', alignItems: 'center', justifyContent: 'space-between' }}>
+          <Typography variant="h4" gutterBottom>
+            {t('alerts.title')}
+          </Typography>
+          {unread > 0 && (
+            <Button startIcon={<DoneAll />} onClick={markAllAsRead}>
+              {t('alerts.markAllAsRead')}
+            </Button>
+          )}
+        </Box>
 
         {!isOnline && (
           <Alert severity="info" sx={{ mb: 2 }}>
@@ -137,7 +180,7 @@ const Alerts = () => {
                     !alert.is_read && (
                       <IconButton
                         edge="end"
-                        onClick={() => markAsRead(alert.id)}
+                        onClick={() => markAsRead([alert.id])}
                         title={t('alerts.markAsRead')}
                       >
                         <CheckCircle />
@@ -15,7 +15,7 @@ import {
 } from '@mui/material';
 import { ArrowBack as ArrowBackIcon } from '@mui/icons-material';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
-import { dashboardAPI } from '../services/api';
+import { alertsAPI, dashboardAPI } from '../services/api';
 import { useOffline } from '../contexts/OfflineContext';
 import { offlineStorage } from '../services/offlineStorage';
 
@@ -39,6 +39,14 @@ const Dashboard = () => {
     fetchDashboardData();
   }, [isOnline]);
 
+  // The unread count is pushed as alerts arrive or are read, without re-fetching the stats
+  useEffect(() => {
+    if (!isOnline) return undefined;
+    return alertsAPI.subscribe({
+      onUnreadCount: (unreadAlerts) => setStats((current) => ({ ...current, unread_alerts: unreadAlerts })),
+    });
+  }, [isOnline]);
+
   const fetchDashboardData = async () => {
     try {
       if (isOnline) {
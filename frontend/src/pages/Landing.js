@@ -48,21 +48,11 @@ const Landing = () => {
   const [drawerOpen, setDrawerOpen] = useState(false);
   const [alertCount, setAlertCount] = useState(0);
 
+  // The server sends the unread count on connect and whenever it changes
   useEffect(() => {
-    fetchAlertCount();
-  }, []);
-
-  const fetchAlertCount = async () => {
-    try {
-      if (isOnline) {
-        const response = await alertsAPI.getAlerts();
-        const unreadCount = response.data.filter(alert => !alert.is_read).length;
-        setAlertCount(unreadCount);
-      }
-    } catch (error) {
-      console.error('Error fetching alerts:', error);
-    }
-  };
+    if (!isOnline) return undefined;
+    return alertsAPI.subscribe({ onUnreadCount: setAlertCount });
+  }, [isOnline]);
 
   const toggleLanguage = () => {
     const newLang = i18n.language === 'en' ? 'kn' : 'en';
@@ -85,8 +85,34 @@ export const alertsAPI = {
   getAlerts: () =>
     apiClient.get('/api/alerts'),
   
-  markAlertRead: (alertId) =>
-    apiClient.put(`/api/alerts/${alertId}/read`),
+  markAlertsRead: (alertIds) =>
+    apiClient.put('/api/alerts/read', { alert_ids: alertIds }),
+
+  markAllAlertsRead: () =>
+    apiClient.put('/api/alerts/read', { all: true }),
+
+  // EventSource cannot set headers, so the token goes in the query string
+  openStream: () =>
+    new EventSource(`${BASE_URL}/api/alerts/stream?token=${encodeURIComponent(localStorage.getItem('token') || '')}`),
+
+  // New alerts and unread counts pushed by the server; returns an unsubscribe function
+  subscribe: ({ onAlert, onUnreadCount }) => {
+    const stream = alertsAPI.openStream();
+    if (onAlert) {
+      stream.addEventListener('alert', (event) => onAlert(JSON.parse(event.data)));
+    }
+    if (onUnreadCount) {
+      stream.addEventListener('unread_count', (event) => onUnreadCount(JSON.parse(event.data).unread_alerts));
+    }
+    return () => stream.close();
+  },
+};
+
+// Bootstrap API
+export const bootstrapAPI = {
+  // Every record and alert for the worker in one compressed download
+  getSnapshot: () =>
+    apiClient.get('/api/bootstrap'),
 };
 
 export default apiClient;
\ No newline at end of file
@@ -125,6 +125,42 @@ export const offlineStorage = {
     }
   },
 
+  // Replace synced data with a server bootstrap snapshot; pending forms are kept
+  async restoreSnapshot(snapshot) {
+    const formTypes = {
+      family_surveys: 'family_survey',
+      pregnancy_reports: 'pregnancy_report',
+      child_vaccinations: 'child_vaccination',
+      postnatal_care: 'postnatal_care',
+      leprosy_reports: 'leprosy_report',
+    };
+    try {
+      await db.transaction('rw', db.forms, db.alerts, async () => {
+        await db.forms.filter(form => form.synced).delete();
+        for (const [key, formType] of Object.entries(formTypes)) {
+          await db.forms.bulkAdd(snapshot[key].map(record => ({
+            formType,
+            data: record,
+            timestamp: new Date(record.created_at),
+            synced: true,
+          })));
+        }
+        await db.alerts.clear();
+        await db.alerts.bulkAdd(snapshot.alerts.map(alert => ({
+          ...alert,
+          type: alert.alert_type,
+          timestamp: new Date(alert.created_at),
+          read: alert.is_read,
+        })));
+      });
+      localStorage.setItem('syncWatermark', snapshot.watermark);
+      console.log('Restored offline data from server snapshot');
+    } catch (error) {
+      console.error('Error restoring snapshot:', error);
+      throw error;
+    }
+  },
+
   // Get forms by type
   async getFormsByType(formType) {
     try {
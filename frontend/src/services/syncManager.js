@@ -1,4 +1,4 @@
-import { formsAPI } from './api';
+import { bootstrapAPI, formsAPI } from './api';
 import { offlineStorage } from './offlineStorage';
 
 export const syncManager = {
@@ -65,6 +65,21 @@ export const syncManager = {
     }
   },
 
+  // Rebuild local data on a new or reset device from one server snapshot
+  async restoreFromServer() {
+    if (localStorage.getItem('syncWatermark')) {
+      return false;
+    }
+    try {
+      const response = await bootstrapAPI.getSnapshot();
+      await offlineStorage.restoreSnapshot(response.data);
+      return true;
+    } catch (error) {
+      console.error('Restore from server failed:', error);
+      return false;
+    }
+  },
+
   async syncSingleForm(formType, formData) {
     switch (formType) {
       case 'family_survey':
@@ -0,0 +1,63 @@
+"""
+Unit tests import the backend in-process against a throwaway SQLite
+database, like backend_benchmark.py. backend_test.py covers the live API.
+"""
+
+import os
+import sys
+import tempfile
+import uuid
+
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{tempfile.mkdtemp()}/unit.db")
+os.environ.setdefault('JWT_SECRET_KEY', uuid.uuid4().hex)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    import server
+    from fastapi.testclient import TestClient
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def auth_headers(client):
+    """A freshly registered worker's bearer token"""
+    suffix = uuid.uuid4().int % 10 ** 8
+    response = client.post('/api/register', json={
+        "name": f"Asha {suffix}",
+        "phone_number": f"98{suffix:08d}",
+        "place": "Bangalore Rural",
+        "aadhaar_number": f"1234{suffix:08d}",
+        "password": "SecurePass123",
+    })
+    assert response.status_code == 200, response.text
+    response = client.post('/api/login', json={"username": response.json()["username"], "password": "SecurePass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def household_race(monkeypatch):
+    """Makes upsert_family_survey miss an existing household once, as when a
+    concurrent request creates it, so its savepoint insert rolls back."""
+    import server
+    lookup = server.household_survey_query
+
+    class Missed:
+        def first(self):
+            return None
+
+    class RacingQuery:
+        def __init__(self, query):
+            self.query = query
+            self.raced = False
+
+        def with_for_update(self):
+            if self.raced:
+                return self.query.with_for_update()
+            self.raced = True
+            return Missed()
+
+    monkeypatch.setattr(server, "household_survey_query", lambda *args: RacingQuery(lookup(*args)))
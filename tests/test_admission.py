@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import server
+
+
+def request_from(host, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "POST", "path": "/api/login", "headers": headers, "client": (host, 1234)})
+
+
+@pytest.fixture
+def trusted(monkeypatch):
+    def trust(*values):
+        monkeypatch.setattr(server, "FORWARDED_ALLOW_IPS", list(values))
+        monkeypatch.setattr(server, "TRUSTED_PROXY_NETWORKS", [
+            server.ipaddress.ip_network(value, strict=False) for value in values if value != "*"
+        ])
+    return trust
+
+
+def test_client_ip_ignores_forwarded_for_from_untrusted_peer(trusted):
+    trusted("127.0.0.1")
+    assert server.client_ip(request_from("203.0.113.9", "198.51.100.1")) == "203.0.113.9"
+
+
+def test_client_ip_uses_forwarded_for_from_trusted_proxy(trusted):
+    trusted("10.0.0.0/8")
+    assert server.client_ip(request_from("10.2.0.7", "198.51.100.1")) == "198.51.100.1"
+    # A spoofed leftmost entry is skipped; the ingress appended the real client
+    assert server.client_ip(request_from("10.2.0.7", "1.1.1.1, 198.51.100.1, 10.2.0.5")) == "198.51.100.1"
+    assert server.client_ip(request_from("10.2.0.7")) == "10.2.0.7"
+
+
+def test_malformed_content_length_is_rejected():
+    client = TestClient(server.app)
+    response = client.post("/api/sync", content=b"{}", headers={"content-length": "ten", "content-type": "application/json"})
+    assert response.status_code == 400
+
+
+def test_chunked_body_over_the_limit_is_rejected(client, auth_headers, monkeypatch):
+    route = ("POST", "/api/sync")
+    monkeypatch.setitem(server.ADMISSION_POLICIES, route, server.ADMISSION_POLICIES[route]._replace(max_body_bytes=1024))
+
+    def chunks(count):
+        yield b'{"leprosy_reports": ['
+        for _ in range(count):
+            yield b'{"patient_name": "Chunked", "leprosy_type": "Paucibacillary"}, '
+        yield b'{}]}'
+
+    headers = {**auth_headers, "content-type": "application/json"}
+    response = client.post("/api/sync", content=chunks(100), headers=headers)
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    # Small chunked bodies still get through to the handler
+    response = client.post("/api/sync", content=iter([b'{"leprosy_reports": []}']), headers=headers)
+    assert response.status_code == 200, response.text
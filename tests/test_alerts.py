@@ -0,0 +1,19 @@
+from datetime import datetime
+
+import server
+from tests.test_audit import SURVEY, worker_id
+
+
+def test_household_race_keeps_the_alert_events(client, auth_headers, household_race, monkeypatch):
+    assert client.post('/api/family-surveys', headers=auth_headers, json=SURVEY).status_code == 200
+    published = []
+    monkeypatch.setattr(server.alert_broker, "alert_created", lambda worker, alert: published.append(alert["title"]))
+
+    worker = worker_id(auth_headers)
+    with server.SessionLocal() as db:
+        db.add(server.Alert(title="Visit due", message="ANC visit due", alert_type="anc",
+                            patient_name="Meera Devi", due_date=datetime.utcnow(), asha_worker_id=worker))
+        # Flushes the alert, then rolls back the survey's savepoint
+        server.upsert_family_survey(db, worker, {**SURVEY, "sanitation": "Open defecation"})
+        db.commit()
+    assert published == ["Visit due"]
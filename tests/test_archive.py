@@ -0,0 +1,59 @@
+import tempfile
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+
+import server
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def worker(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(server, "ARCHIVE_STORAGE_URI", tempfile.mkdtemp())
+    username = jwt.decode(auth_headers["Authorization"].split()[1], options={"verify_signature": False})["sub"]
+    monkeypatch.setattr(server, "ADMIN_USERNAMES", {username})
+    with server.SessionLocal() as db:
+        return db.query(server.User).filter(server.User.username == username).one()
+
+
+def place_counts(client, auth_headers, place):
+    summaries = client.get('/api/admin/places', headers=auth_headers, params={"place": place}).json()
+    return [(s["pregnancy_reports"], s["child_vaccinations"]) for s in summaries if s["place"] == place]
+
+
+def test_backdated_records_are_archived_and_read_back(client, auth_headers, worker):
+    created_at = datetime.utcnow() - timedelta(days=server.ARCHIVE_AFTER_DAYS + 30)
+    with server.SessionLocal() as db:
+        old = server.PregnancyReport(
+            lmp=created_at - timedelta(weeks=10), edd=created_at + timedelta(weeks=30), gravida=2, para=1,
+            anc_checkups="completed", risk_factors="None", patient_name="Archived Mother",
+            patient_phone="9876543210", asha_worker_id=worker.id, created_at=created_at,
+        )
+        db.add(old)
+        db.commit()
+        old_id = str(old.id)
+    hot = client.post('/api/pregnancy-reports', headers=auth_headers, json={
+        "lmp": datetime.utcnow().isoformat(), "edd": (datetime.utcnow() + timedelta(weeks=40)).isoformat(),
+        "gravida": 1, "para": 0, "anc_checkups": "scheduled", "risk_factors": "None",
+        "patient_name": "Hot Mother", "patient_phone": "9876543211",
+    }).json()["id"]
+    before = place_counts(client, auth_headers, worker.place)
+    assert before
+
+    with server.SessionLocal() as db:
+        archived = server.archive_cold_records(db)
+    assert archived["pregnancy_reports"] >= 1
+
+    hot_ids = [r["id"] for r in client.get('/api/pregnancy-reports', headers=auth_headers).json()]
+    assert hot_ids == [hot]
+    reports = client.get('/api/pregnancy-reports', headers=auth_headers, params={"include_archived": True}).json()
+    assert sorted(r["id"] for r in reports) == sorted([hot, old_id])
+    restored = next(r for r in reports if r["id"] == old_id)
+    assert restored["patient_name"] == "Archived Mother"
+    assert restored["created_at"].startswith(created_at.isoformat()[:19])
+
+    # Totals still count the archived row
+    assert client.get('/api/dashboard', headers=auth_headers).json()["total_pregnancies"] == 2
+    assert place_counts(client, auth_headers, worker.place) == before
@@ -0,0 +1,47 @@
+import jwt
+
+import server
+
+SURVEY = {
+    "household_id": "HH_AUDIT",
+    "members_list": "[]",
+    "sanitation": "Improved toilet facility",
+    "chronic_illnesses": "None",
+}
+PREGNANCY = {
+    "lmp": "2026-05-01T00:00:00",
+    "edd": "2027-02-05T00:00:00",
+    "gravida": 1,
+    "para": 0,
+    "anc_checkups": "scheduled",
+    "risk_factors": "None",
+    "patient_name": "Audited Mother",
+    "patient_phone": "9876543210",
+}
+
+
+def worker_id(auth_headers):
+    username = jwt.decode(auth_headers["Authorization"].split()[1], options={"verify_signature": False})["sub"]
+    with server.SessionLocal() as db:
+        return db.query(server.User.id).filter(server.User.username == username).scalar()
+
+
+def test_household_race_keeps_the_batch_audit_rows(client, auth_headers, household_race):
+    assert client.post('/api/family-surveys', headers=auth_headers, json=SURVEY).status_code == 200
+    # The pregnancy report is flushed before the survey's savepoint rolls back
+    response = client.post('/api/sync', headers=auth_headers, json={
+        "pregnancy_reports": [PREGNANCY],
+        "family_surveys": [{**SURVEY, "sanitation": "Open defecation"}],
+    })
+    assert response.status_code == 200, response.text
+
+    worker = worker_id(auth_headers)
+    with server.SessionLocal() as db:
+        report_id = db.query(server.PregnancyReport.id).filter(server.PregnancyReport.asha_worker_id == worker).scalar()
+        logged = {
+            (row.table_name, row.action, row.record_id)
+            for row in db.query(server.AuditLog).filter(server.AuditLog.asha_worker_id == worker)
+        }
+        survey_id = db.query(server.FamilySurvey.id).filter(server.FamilySurvey.asha_worker_id == worker).scalar()
+    assert ("pregnancy_reports", "insert", str(report_id)) in logged
+    assert ("family_surveys", "update", str(survey_id)) in logged
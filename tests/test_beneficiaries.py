@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import server
+from tests.test_audit import worker_id
+
+
+def pregnancy(name, phone):
+    now = datetime.utcnow()
+    return server.PregnancyReport(
+        lmp=now - timedelta(weeks=10), edd=now + timedelta(weeks=30), gravida=1, para=0,
+        anc_checkups="scheduled", risk_factors="None", patient_name=name, patient_phone=phone,
+    )
+
+
+def pnc(name):
+    return server.PostnatalCare(
+        pnc_visits="[]", mother_health="Stable", baby_health="Healthy", counselling="Breastfeeding",
+        mother_name=name, delivery_date=datetime.utcnow(),
+    )
+
+
+def link(auth_headers, records):
+    worker = worker_id(auth_headers)
+    with server.SessionLocal() as db:
+        for record in records:
+            record.asha_worker_id = worker
+        db.add_all(records)
+        db.commit()
+        result = server.link_beneficiaries(db, worker_id=worker)
+        linked = [db.get(type(record), record.id).beneficiary_id for record in records]
+    return result, linked
+
+
+def test_records_are_matched_by_phone_then_by_similar_name(auth_headers):
+    result, (mother, same_phone, typo, other_phone, stranger) = link(auth_headers, [
+        pregnancy("Meera Devi", "+91 98765 43210"),
+        pregnancy("Meera D", "9876543210"),
+        pnc("Meera Devii"),
+        pregnancy("Meera Kumari", "9123456780"),
+        pnc("Lakshmi Bai"),
+    ])
+    assert result == {"linked": 5, "created": 3}
+    assert same_phone == mother and typo == mother
+    assert other_phone != mother
+    assert stranger not in (mother, other_phone)
+
+
+def test_only_beneficiaries_sharing_a_phone_or_name_prefix_are_loaded(auth_headers, monkeypatch):
+    link(auth_headers, [pnc(f"{initial}ita Kumari") for initial in "ABCDEFGHIJ"])
+
+    loaded = []
+    load = server.load_link_candidates
+
+    def spy(*args):
+        candidates = list(load(*args))
+        loaded.extend((beneficiary.name, beneficiary.id) for beneficiary in candidates)
+        return candidates
+    monkeypatch.setattr(server, "load_link_candidates", spy)
+    result, (linked,) = link(auth_headers, [pnc("Cita Kumary")])
+    assert result == {"linked": 1, "created": 0}
+    assert [name for name, _ in loaded] == ["Cita Kumari"]
+    assert linked == loaded[0][1]
+
+
+def test_linking_endpoint_runs_off_the_event_loop(client, auth_headers):
+    assert not asyncio.iscoroutinefunction(server.run_beneficiary_linking)
+    link(auth_headers, [pnc("Geeta Bai")])
+    with server.SessionLocal() as db:
+        db.query(server.PostnatalCare).filter(server.PostnatalCare.asha_worker_id == worker_id(auth_headers)).update(
+            {"beneficiary_id": None}, synchronize_session=False
+        )
+        db.commit()
+    response = client.post('/api/beneficiaries/link', headers=auth_headers)
+    assert response.json() == {"linked": 1, "created": 0}
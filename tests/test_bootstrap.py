@@ -0,0 +1,18 @@
+from tests.test_audit import PREGNANCY, SURVEY
+
+
+def test_household_race_still_invalidates_the_snapshot(client, auth_headers, household_race):
+    assert client.post('/api/family-surveys', headers=auth_headers, json=SURVEY).status_code == 200
+    etag = client.get('/api/bootstrap', headers=auth_headers).headers["ETag"]
+
+    # An unchanged resurvey, so nothing flushed after the savepoint names the worker again
+    response = client.post('/api/sync', headers=auth_headers, json={
+        "pregnancy_reports": [PREGNANCY],
+        "family_surveys": [SURVEY],
+    })
+    assert response.status_code == 200, response.text
+
+    response = client.get('/api/bootstrap', headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [report["patient_name"] for report in response.json()["pregnancy_reports"]] == [PREGNANCY["patient_name"]]
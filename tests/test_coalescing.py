@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import server
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+
+
+def test_shared_computation_outlives_the_first_caller():
+    async def scenario():
+        coalescer = server.RequestCoalescer(ttl=60)
+        started, release = threading.Event(), threading.Event()
+        sessions = []
+
+        def compute(db):
+            sessions.append(db)
+            started.set()
+            release.wait(5)
+            assert not db.closed
+            return "stats"
+
+        first = asyncio.ensure_future(coalescer.run("dashboard", "asha1", (), compute, FakeSession))
+        await asyncio.to_thread(started.wait, 5)
+        second = asyncio.ensure_future(coalescer.run("dashboard", "asha1", (), compute, FakeSession))
+        await asyncio.sleep(0)
+        first.cancel()  # the first client disconnects
+        release.set()
+        assert await second == "stats"
+        return sessions, coalescer
+    sessions, coalescer = asyncio.run(scenario())
+    assert len(sessions) == 1 and sessions[0].closed
+    assert coalescer._inflight == {} and coalescer._generation == {}
+
+
+def test_generations_are_dropped_once_nothing_is_in_flight():
+    async def scenario():
+        coalescer = server.RequestCoalescer(ttl=60)
+        release = threading.Event()
+        reads = iter(["before write", "after write"])
+
+        def compute(db):
+            release.wait(5)
+            return next(reads)
+
+        stale = asyncio.ensure_future(coalescer.run("alerts", "asha1", (), compute, FakeSession))
+        await asyncio.sleep(0.05)
+        coalescer.invalidate("asha1")  # a write lands while the read is in flight
+        assert coalescer._generation == {"asha1": 1}
+        fresh = asyncio.ensure_future(coalescer.run("alerts", "asha1", (), compute, FakeSession))
+        release.set()
+        results = [await stale, await fresh]
+        cached = await coalescer.run("alerts", "asha1", (), compute, FakeSession)
+        return results, cached, coalescer
+    results, cached, coalescer = asyncio.run(scenario())
+    assert results == ["before write", "after write"]
+    assert cached == "after write"
+    assert coalescer._inflight == {} and coalescer._generation == {}
+
+    coalescer.invalidate("asha2")  # nothing in flight for asha2: no generation kept
+    assert coalescer._generation == {}
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import server
+
+
+def given_codes(vaccine_schedule):
+    return [code for code, given in zip(server.SCHEDULE_CODES, server.parse_given_doses(vaccine_schedule)) if given]
+
+
+@pytest.mark.parametrize("vaccine_schedule, expected", [
+    ("BCG given, OPV 0 given", ["BCG", "OPV-0"]),
+    ("BCG, OPV-0, Hep B 0\nPenta 1 on 3 Feb; RVV1", ["BCG", "OPV-0", "HEPB-0", "PENTA-1", "RVV-1"]),
+    ('["BCG", "OPV-0", {"vaccine": "penta-1"}]', ["BCG", "OPV-0", "PENTA-1"]),
+    ('[{"vaccine": "BCG", "status": "completed"}, {"vaccine": "OPV-1", "status": "pending"}]', ["BCG"]),
+    ("Vitamin A 1, PCV booster, DPT booster 1", ["PCV-B", "VITA-1", "DPT-B1"]),
+    ("BCG given, OPV 1 due, Penta 1 not given", ["BCG"]),
+    ("OPV 10", []),
+    ("none yet", []),
+    ("", []),
+    (None, []),
+])
+def test_parse_given_doses(vaccine_schedule, expected):
+    assert given_codes(vaccine_schedule) == expected
+
+
+def test_compute_schedules_next_due_and_overdue():
+    dobs = np.array(["2026-01-01", "2026-01-01"], dtype="datetime64[D]")
+    given = np.array([
+        server.parse_given_doses("BCG, OPV 0, Hep B 0"),
+        server.parse_given_doses(", ".join(server.SCHEDULE_CODES)),
+    ])
+    next_due, overdue = server.compute_schedules(dobs, given, np.datetime64("2026-03-01"))
+
+    # Six-week doses are the first still pending, and already past due
+    assert next_due[0] == np.datetime64("2026-02-12")
+    assert [code for code, missed in zip(server.SCHEDULE_CODES, overdue[0]) if missed] == [
+        "OPV-1", "PENTA-1", "RVV-1", "FIPV-1", "PCV-1",
+    ]
+    # A completed schedule has nothing due
+    assert np.isnat(next_due[1])
+    assert not overdue[1].any()
+
+
+def test_unrecognised_schedule_keeps_worker_values():
+    record = server.ChildVaccination(
+        child_dob=datetime(2026, 1, 1),
+        vaccine_schedule="All birth doses done at PHC",
+        next_due=datetime(2026, 2, 12),
+        missed_doses="none",
+    )
+    server.apply_immunisation_schedule(record)
+    assert record.next_due == datetime(2026, 2, 12)
+    assert record.missed_doses == "none"
+
+
+def test_recognised_schedule_is_derived():
+    record = server.ChildVaccination(
+        child_dob=datetime(2026, 1, 1),
+        vaccine_schedule="BCG given, OPV 0 given, Hep B 0 given",
+        next_due=datetime(2026, 11, 1),
+    )
+    server.apply_immunisation_schedule(record)
+    # The worker's date is replaced by the six-week doses' due date
+    assert record.next_due == datetime(2026, 2, 12)
+    assert "PENTA-1" in record.missed_doses
+
+
+def test_next_due_before_birth_is_rejected():
+    with pytest.raises(ValueError):
+        server.ChildVaccinationCreate(
+            child_name="Anu", child_dob="2026-01-01T00:00:00", vaccine_schedule="none yet",
+            next_due="2025-12-01T00:00:00", parent_name="Lakshmi", parent_phone="9876543210",
+        )
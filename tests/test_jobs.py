@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+import server
+
+
+def test_prune_jobs_keeps_recent_and_pending_jobs():
+    now = datetime.utcnow()
+    old = now - server.JOB_RETENTION - timedelta(hours=1)
+    jobs = {
+        "old-done": server.Job(kind="test", status="done", finished_at=old),
+        "old-failed": server.Job(kind="test", status="failed", finished_at=old),
+        "recent-done": server.Job(kind="test", status="done", finished_at=now),
+        "queued": server.Job(kind="test", status="queued", created_at=old),
+    }
+    with server.SessionLocal() as db:
+        db.add_all(jobs.values())
+        db.commit()
+        ids = {name: job.id for name, job in jobs.items()}
+
+        assert server.prune_jobs(db, batch_size=1) >= 2
+        remaining = {job_id for (job_id,) in db.query(server.Job.id).filter(server.Job.id.in_(ids.values()))}
+    assert remaining == {ids["recent-done"], ids["queued"]}
+
+
+def test_job_stats_are_admin_only(client, auth_headers):
+    assert client.get('/api/jobs/stats', headers=auth_headers).status_code == 403
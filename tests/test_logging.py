@@ -0,0 +1,19 @@
+import logging
+import logging.config
+
+from uvicorn.config import LOGGING_CONFIG
+
+import server
+
+
+def test_uvicorn_loggers_write_through_the_queue():
+    # What `uvicorn server:app` sets up before importing the app
+    logging.config.dictConfig(LOGGING_CONFIG)
+    server.route_uvicorn_logs()
+
+    for name in ("uvicorn", "uvicorn.error"):
+        assert logging.getLogger(name).handlers == []
+    assert logging.getLogger("uvicorn.error").hasHandlers()
+    assert isinstance(logging.getLogger().handlers[0], server.DroppingQueueHandler)
+    # uvicorn only formats access lines when the access logger has a handler
+    assert not logging.getLogger("uvicorn.access").hasHandlers()
@@ -0,0 +1,19 @@
+import server
+
+
+def test_job_runner_keeps_partitions_ahead(monkeypatch):
+    checked = []
+    monkeypatch.setattr(server, "ensure_partitions", lambda bind: checked.append(bind))
+    runner = server.JobRunner(1)
+
+    runner._maintain()
+    assert checked == []  # startup already ran the check
+
+    runner._next_maintenance["create-partitions"] = 0
+    runner._maintain()
+    runner._maintain()
+    assert checked == [server.shard_router.engines[server.DEFAULT_SHARD]]
+
+
+def test_partition_check_is_a_no_op_off_postgres():
+    assert server.ensure_partitions(server.engine) == 0
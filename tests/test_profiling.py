@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+import jwt
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import server
+
+
+def run_sampler(register_busy_thread):
+    """Profile for 50 ms while another thread runs this module's code."""
+    async def profile():
+        sampler = server.StackSampler(0.001)
+        sampler.tasks.clear()  # only the busy thread is under test
+        stop = threading.Event()
+
+        def busy():
+            while not stop.is_set():
+                server.parse_given_doses("BCG given, OPV 0 given")
+
+        thread = threading.Thread(target=busy)
+        thread.start()
+        if register_busy_thread:
+            sampler.threads[thread.ident] += 1
+        sampler.start()
+        await asyncio.sleep(0.05)
+        sampler.stop()
+        stop.set()
+        thread.join()
+        return sampler.counts
+    return asyncio.run(profile())
+
+
+def test_sampler_ignores_threads_serving_other_requests():
+    assert not run_sampler(register_busy_thread=False)
+
+
+def test_sampler_records_threads_running_the_requests_queries():
+    counts = run_sampler(register_busy_thread=True)
+    assert any("parse_given_doses" in stack for stack in counts)
+
+
+@pytest.mark.parametrize("header, profiled", [("1", True), ("true", True), ("0", False), ("no", False)])
+def test_x_profile_header_value(client, auth_headers, monkeypatch, header, profiled):
+    token = auth_headers["Authorization"].split()[1]
+    username = jwt.decode(token, options={"verify_signature": False})["sub"]
+    monkeypatch.setattr(server, "ADMIN_USERNAMES", {username})
+    response = client.get('/api/family-surveys', headers={**auth_headers, "X-Profile": header})
+    assert response.status_code == 200
+    assert ("X-Profile-Id" in response.headers) is profiled
+
+
+def test_failed_statement_ends_its_query_timer():
+    async def run_failing_statement():
+        sampler = server.StackSampler(0.001)
+        server.active_profile.set(sampler)
+        with server.engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.exec_driver_sql("SELECT * FROM no_such_table")
+            assert conn.info["query_start"] == []
+            conn.exec_driver_sql("SELECT 1")
+            assert conn.info["query_start"] == []
+        return sampler.threads[threading.get_ident()]
+    assert asyncio.run(run_failing_statement()) == 0
@@ -0,0 +1,175 @@
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+
+
+def seed_records(count, now):
+    """One sync payload with `count` records of each form type"""
+    return {
+        "family_surveys": [{
+            "household_id": f"QB_HH_{i}_{uuid.uuid4().hex[:6]}",
+            "members_list": '[{"name": "Member", "age": 30}]',
+            "sanitation": "Basic facility",
+            "chronic_illnesses": "None",
+        } for i in range(count)],
+        "pregnancy_reports": [{
+            "lmp": (now - timedelta(days=60 + i)).isoformat(),
+            "edd": (now + timedelta(days=220 - i)).isoformat(),
+            "gravida": 1 + i % 4,
+            "para": i % 3,
+            "anc_checkups": "pending",
+            "risk_factors": "highRisk" if i % 3 == 0 else "normalRisk",
+            "patient_name": f"Budget Patient {i}",
+            "patient_phone": f"98{i:08d}",
+        } for i in range(count)],
+        "child_vaccinations": [{
+            "child_name": f"Budget Child {i}",
+            "child_dob": (now - timedelta(days=30 + i)).isoformat(),
+            "vaccine_schedule": "BCG, OPV-0",
+            "parent_name": f"Budget Patient {i}",
+            "parent_phone": f"98{i:08d}",
+        } for i in range(count)],
+        "postnatal_care": [{
+            "pnc_visits": "[]",
+            "mother_health": "Stable",
+            "baby_health": "Healthy",
+            "counselling": "Breastfeeding",
+            "mother_name": f"Budget Patient {i}",
+            "delivery_date": (now - timedelta(days=i % 40)).isoformat(),
+        } for i in range(count)],
+        "leprosy_reports": [{
+            "patient_name": f"Budget Leprosy {i}",
+            "leprosy_type": "Paucibacillary",
+            "treatment": "MDT",
+            "follow_ups": "[]",
+            "household_contacts": "2",
+        } for i in range(count)],
+    }
+
+
+async def disconnected(self):
+    return True
+
+
+@pytest.fixture
+def metered(client, monkeypatch):
+    """Turns metering on and records X-Query-Stats per budgeted route"""
+    monkeypatch.setattr(server, "QUERY_STATS_HEADER", True)
+    monkeypatch.setattr(server, "ARCHIVE_STORAGE_URI", tempfile.mkdtemp())
+    # Ends the alert stream after its first event, as TestClient reads whole responses
+    monkeypatch.setattr(server.Request, "is_disconnected", disconnected)
+    seen = {}
+
+    def call(route, url=None, **kwargs):
+        method, path = route
+        response = client.request(method, url or path, **kwargs)
+        assert response.status_code < 400, (route, response.text)
+        seen.setdefault(route, []).append(response.headers["X-Query-Stats"])
+        return response
+    call.seen = seen
+    return call
+
+
+def over_budget(seen):
+    over = {}
+    for route, headers in seen.items():
+        for header in headers:
+            for part in header.split(", "):
+                used, budget = part.split("=")[1].split("/")
+                if budget != "*" and int(used) > int(budget):
+                    over.setdefault(route, []).append(header)
+    return over
+
+
+@pytest.mark.parametrize("seed", [1, 600])
+def test_every_route_stays_within_its_budget(client, metered, monkeypatch, seed):
+    now = datetime.utcnow()
+    suffix = uuid.uuid4().int % 10 ** 8
+    username = metered(("POST", "/api/register"), json={
+        "name": f"Asha {suffix}", "phone_number": f"98{suffix:08d}", "place": "Bangalore Rural",
+        "aadhaar_number": f"1234{suffix:08d}", "password": "SecurePass123",
+    }).json()["username"]
+    token = metered(("POST", "/api/login"), json={"username": username, "password": "SecurePass123"}).json()["access_token"]
+    monkeypatch.setattr(server, "ADMIN_USERNAMES", {username})
+    headers = {"Authorization": f"Bearer {token}"}
+    with server.SessionLocal() as db:
+        worker_id = db.query(server.User.id).filter(server.User.username == username).scalar()
+
+    def call(method, path, url=None, **kwargs):
+        return metered((method, path), url, headers={**headers, **kwargs.pop("headers", {})}, **kwargs)
+
+    records = seed_records(seed, now)
+    call("POST", "/api/sync", json=records)
+    one = seed_records(1, now)
+    call("POST", "/api/family-surveys", json=one["family_surveys"][0])
+    call("POST", "/api/pregnancy-reports", json=one["pregnancy_reports"][0])
+    call("POST", "/api/child-vaccinations", json=one["child_vaccinations"][0])
+    call("POST", "/api/postnatal-care", json=one["postnatal_care"][0])
+    call("POST", "/api/leprosy-reports", json=one["leprosy_reports"][0])
+    call("POST", "/api/pregnancy-reports/score")
+    call("POST", "/api/child-vaccinations/refresh-schedule")
+    call("POST", "/api/beneficiaries/link")
+
+    # Archive half the pregnancies so the include_archived reads load Parquet too
+    with server.SessionLocal() as db:
+        old = now - timedelta(days=server.ARCHIVE_AFTER_DAYS + 1)
+        db.query(server.PregnancyReport).filter(
+            server.PregnancyReport.asha_worker_id == worker_id,
+            server.PregnancyReport.gravida % 2 == 0,
+        ).update({"created_at": old}, synchronize_session=False)
+        db.add_all([
+            server.Alert(title="Visit due", message="ANC visit due", alert_type="anc",
+                         patient_name=f"Budget Patient {i}", due_date=now, asha_worker_id=worker_id)
+            for i in range(5)
+        ])
+        db.commit()
+        if server.pyarrow is not None:
+            server.archive_cold_records(db)
+        beneficiary_id = db.query(server.Beneficiary.id).filter(server.Beneficiary.asha_worker_id == worker_id).first()[0]
+
+    household_id = records["family_surveys"][0]["household_id"]
+    call("GET", "/api/family-surveys")
+    call("GET", "/api/family-surveys/households/{household_id}", f"/api/family-surveys/households/{household_id}")
+    call("GET", "/api/family-surveys/households/{household_id}/history", f"/api/family-surveys/households/{household_id}/history")
+    call("GET", "/api/pregnancy-reports")
+    call("GET", "/api/pregnancy-reports", params={"include_archived": "true"})
+    call("GET", "/api/pregnancy-reports/high-risk")
+    call("GET", "/api/child-vaccinations/due")
+    call("GET", "/api/search", params={"q": "Budget Patient 1"})
+    timeline = f"/api/beneficiaries/{beneficiary_id}/timeline"
+    call("GET", "/api/beneficiaries/{beneficiary_id}/timeline", timeline)
+    call("GET", "/api/beneficiaries/{beneficiary_id}/timeline", timeline, params={"include_archived": "true"})
+    call("GET", "/api/dashboard")
+    call("GET", "/api/bootstrap")
+    call("GET", "/api/alerts/stream", params={"token": token})
+    alerts = call("GET", "/api/alerts").json()
+    call("GET", "/api/alerts", params={"since": (now - timedelta(days=1)).isoformat()})
+    call("PUT", "/api/alerts/{alert_id}/read", f"/api/alerts/{alerts[0]['id']}/read")
+    call("PUT", "/api/alerts/read", json={"alert_ids": [alert["id"] for alert in alerts[1:3]]})
+    call("PUT", "/api/alerts/read", json={"all": True})
+
+    call("GET", "/api/admin/audit", params={"worker_id": str(worker_id)})
+    call("GET", "/api/admin/audit", params={"beneficiary_id": str(beneficiary_id)})
+    call("GET", "/api/admin/trends")
+    call("POST", "/api/admin/trends/rebuild", params={"day": now.date().isoformat()})
+    call("GET", "/api/admin/places")
+    call("GET", "/api/jobs/stats")
+    profile_id = call("GET", "/api/admin/profiles", headers={"X-Profile": "1"}).headers["X-Profile-Id"]
+    call("GET", "/api/admin/profiles/{profile_id}", f"/api/admin/profiles/{profile_id}")
+    call("GET", "/api/admin/slow-queries")
+
+    assert set(metered.seen) == set(server.QUERY_BUDGETS)
+    assert over_budget(metered.seen) == {}
+
+
+def test_metering_is_off_by_default(client, auth_headers, monkeypatch):
+    metered = []
+    monkeypatch.setattr(server, "QueryUsage", lambda: metered.append(1))
+    response = client.get('/api/dashboard', headers=auth_headers)
+    assert response.status_code == 200
+    assert "X-Query-Stats" not in response.headers
+    assert metered == []
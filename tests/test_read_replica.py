@@ -0,0 +1,55 @@
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import server
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A second SQLite file standing in for a replica that has not caught up"""
+    replica_engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/replica.db")
+    server.Base.metadata.create_all(bind=replica_engine)
+    monkeypatch.setattr(server, "read_engine", replica_engine)
+    monkeypatch.setattr(server, "ReadSessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=replica_engine))
+    yield replica_engine
+    replica_engine.dispose()
+
+
+def create_survey(client, auth_headers):
+    household_id = f"HH_{uuid.uuid4().hex[:8]}"
+    response = client.post('/api/family-surveys', headers=auth_headers, json={
+        "household_id": household_id,
+        "members_list": "[]",
+        "sanitation": "Improved toilet facility",
+        "chronic_illnesses": "None",
+    })
+    assert response.status_code == 200, response.text
+    return household_id
+
+
+def listed_households(client, auth_headers):
+    return [survey["household_id"] for survey in client.get('/api/family-surveys', headers=auth_headers).json()]
+
+
+def test_reads_after_a_write_stay_on_the_primary(replica, client, auth_headers):
+    household_id = create_survey(client, auth_headers)
+    assert listed_households(client, auth_headers) == [household_id]
+
+
+def test_reads_go_to_the_replica_once_the_window_passes(replica, client, auth_headers, monkeypatch):
+    create_survey(client, auth_headers)
+    monkeypatch.setattr(server, "READ_AFTER_WRITE_WINDOW", 0)
+    # The replica file has not received the write
+    assert listed_households(client, auth_headers) == []
+
+
+def test_expired_writes_are_forgotten(monkeypatch):
+    monkeypatch.setattr(server, "last_write_at", server.OrderedDict())
+    monkeypatch.setattr(server, "READ_AFTER_WRITE_WINDOW", 0)
+    for username in ("asha1", "asha2", "asha3"):
+        server.note_write(username)
+    assert len(server.last_write_at) <= 1
@@ -0,0 +1,33 @@
+import uuid
+
+import server
+
+
+def register(client, name):
+    suffix = uuid.uuid4().int % 10 ** 8
+    response = client.post('/api/register', json={
+        "name": name,
+        "phone_number": f"97{suffix:08d}",
+        "place": "Bangalore Rural",
+        "aadhaar_number": f"5678{suffix:08d}",
+        "password": "SecurePass123",
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["username"]
+
+
+def test_registration_only_considers_numbered_usernames(client):
+    base = f"asha{uuid.uuid4().hex[:6]}"
+    assert register(client, f"{base} Worker") == f"{base}worker"
+    assert register(client, f"{base} Workers") == f"{base}workers"
+    assert register(client, f"{base} Worker") == f"{base}worker1"
+
+    with server.SessionLocal() as db:
+        taken, _, _ = server.registration_conflicts(db, f"{base}worker", "0", "0")
+    assert taken == {f"{base}worker", f"{base}worker1"}
+
+
+def test_username_prefix_is_matched_literally(client):
+    with server.SessionLocal() as db:
+        taken, _, _ = server.registration_conflicts(db, "a.%_", "0", "0")
+    assert taken == set()
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+import server
+
+
+@pytest.mark.parametrize("anc_checkups, expected", [
+    # The form's status select
+    ("completed", (None, 0)),
+    ("scheduled", (None, 0)),
+    ("pending", (None, 1)),
+    # Offline and older clients
+    (json.dumps([{"date": "2026-01-15", "bp": "120/80"}, {"date": "2026-02-15", "bp": "118/78"}]), (2, 0)),
+    (json.dumps([{"date": "2026-01-15", "status": "completed"}, {"date": "2026-03-15", "status": "pending"}]), (1, 0)),
+    ("3", (3, 0)),
+    ("", (None, 0)),
+    ("visited PHC twice", (None, 0)),
+])
+def test_count_anc_visits(anc_checkups, expected):
+    assert server.count_anc_visits(anc_checkups) == expected
+
+
+def score(weeks_pregnant, anc_checkups, gravida=2, para=1, risk_factors="", edd_in_days=30):
+    today = np.datetime64("2026-10-19")
+    lmp = np.array([today - np.timedelta64(weeks_pregnant * 7, "D")])
+    edd = np.array([today + np.timedelta64(edd_in_days, "D")])
+    visits = server.count_anc_visits(anc_checkups)
+    ga_weeks, missed, risk = server.compute_risk_scores(
+        lmp, edd, np.array([gravida]), np.array([para]),
+        np.array([np.nan if visits.completed is None else visits.completed]), np.array([visits.behind]),
+        np.array([server.count_risk_factors(risk_factors)]), today,
+    )
+    return int(ga_weeks[0]), int(missed[0]), int(risk[0])
+
+
+def test_pending_status_late_in_pregnancy_is_not_high_risk():
+    # 'pending' at 37 weeks is one visit behind, not all four
+    assert score(37, "pending") == (37, 1, 2)
+    assert score(37, "pending")[2] < server.HIGH_RISK_SCORE
+    assert score(37, "scheduled") == (37, 0, 0)
+
+
+def test_counted_visits_drive_missed_visits():
+    # Four visits expected by 36 weeks, one recorded
+    assert score(36, json.dumps([{"date": "2026-03-01"}])) == (36, 3, 6)
+    assert score(20, "completed") == (20, 0, 0)
+
+
+def test_high_risk_factors():
+    # Two listed risk factors on a grand multipara, past the EDD
+    _, _, risk = score(41, "completed", gravida=5, para=4, risk_factors="Anaemia, Previous C-section", edd_in_days=-3)
+    assert risk == 2 * 3 + 2 + 3
+    assert risk >= server.HIGH_RISK_SCORE
+    assert score(12, "completed", risk_factors="highrisk")[2] == 6
@@ -0,0 +1,33 @@
+import uuid
+from datetime import datetime
+
+import server
+from tests.test_audit import PREGNANCY, SURVEY
+
+
+def register(client, place):
+    suffix = uuid.uuid4().int % 10 ** 8
+    response = client.post('/api/register', json={
+        "name": f"Asha {suffix}", "phone_number": f"98{suffix:08d}", "place": place,
+        "aadhaar_number": f"1234{suffix:08d}", "password": "SecurePass123",
+    })
+    response = client.post('/api/login', json={"username": response.json()["username"], "password": "SecurePass123"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_household_race_keeps_the_batch_rollup_deltas(client, household_race):
+    place = f"Rollup Village {uuid.uuid4().hex[:6]}"
+    headers = register(client, place)
+    assert client.post('/api/family-surveys', headers=headers, json=SURVEY).status_code == 200
+    response = client.post('/api/sync', headers=headers, json={
+        "pregnancy_reports": [PREGNANCY],
+        "family_surveys": [{**SURVEY, "sanitation": "Open defecation"}],
+    })
+    assert response.status_code == 200, response.text
+
+    with server.SessionLocal() as db:
+        counts = dict(db.query(server.DailyRollup.metric, server.DailyRollup.count).filter(
+            server.DailyRollup.place == place,
+            server.DailyRollup.day == datetime.utcnow().date(),
+        ).all())
+    assert counts == {"surveys": 2, "pregnancies": 1}
@@ -0,0 +1,47 @@
+import pytest
+
+SURVEY = {
+    "household_id": "HH_SYNC",
+    "members_list": "[]",
+    "sanitation": "Improved toilet facility",
+    "chronic_illnesses": "None",
+}
+PREGNANCY = {
+    "lmp": "2026-05-01T00:00:00",
+    "edd": "2027-02-05T00:00:00",
+    "gravida": 1,
+    "para": 0,
+    "anc_checkups": "scheduled",
+    "risk_factors": "None",
+    "patient_name": "Meera Devi",
+    "patient_phone": "9876543210",
+}
+
+
+def test_client_keys_outside_the_schema_are_ignored(client, auth_headers):
+    record = {
+        **PREGNANCY,
+        "id": 5,
+        "created_at": "2020-01-01T00:00:00",
+        "risk_score": 0,
+        "beneficiary_id": "not-a-uuid",
+        "version": 99,
+    }
+    response = client.post('/api/sync', headers=auth_headers, json={"pregnancy_reports": [record]})
+    assert response.status_code == 200, response.text
+
+    reports = client.get('/api/pregnancy-reports', headers=auth_headers).json()
+    assert len(reports) == 1
+    assert reports[0]["id"] != 5
+    assert not reports[0]["created_at"].startswith("2020")
+
+
+@pytest.mark.parametrize("body", [
+    {"family_surveys": SURVEY},
+    {"family_surveys": "HH_SYNC"},
+    {"family_surveys": [["HH_SYNC"]]},
+    {"family_surveys": [{**SURVEY, "household_id": None}]},
+])
+def test_malformed_sync_bodies_are_rejected(client, auth_headers, body):
+    response = client.post('/api/sync', headers=auth_headers, json=body)
+    assert response.status_code == 400, response.text